@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import CategoryModel, RecurringPaymentGroup, SubscriptionSuggestion
+
+@admin.register(CategoryModel)
+class CategoryModelAdmin(admin.ModelAdmin):
+    list_display = ('id', 'training_samples', 'accuracy', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    exclude = ('parameters',)
+
+@admin.register(RecurringPaymentGroup)
+class RecurringPaymentGroupAdmin(admin.ModelAdmin):
+    list_display = ('description', 'user', 'occurrences', 'interval_mean', 'last_amount', 'last_seen')
+    search_fields = ('key', 'user__email')
+    raw_id_fields = ('user', 'account')
+
+@admin.register(SubscriptionSuggestion)
+class SubscriptionSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('service_name', 'user', 'amount', 'billing_cycle', 'occurrences', 'status', 'created_at')
+    list_filter = ('status', 'billing_cycle')
+    raw_id_fields = ('user', 'group', 'account', 'subscription')
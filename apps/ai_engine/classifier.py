@@ -0,0 +1,96 @@
+import io
+import numpy as np
+from .features import hash_features
+
+
+class LinearCategoryClassifier:
+    """
+    Multinomial logistic regression over hashed description features, in NumPy.
+
+    Inference for a batch is one gather of weight rows (nnz x classes) and one segmented
+    sum per row (np.add.reduceat), followed by a softmax: no Python loop per class or
+    per feature beyond hashing.
+    """
+
+    def __init__(self, categories, n_features, weights=None, bias=None):
+        self.categories = list(categories)
+        self.n_features = n_features
+        self.weights = weights if weights is not None else np.zeros((n_features, len(self.categories)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(self.categories), dtype=np.float32)
+
+    def _scores(self, indices, values, offsets):
+        gathered = self.weights[indices] * values[:, None]
+        return np.add.reduceat(gathered, offsets, axis=0) + self.bias
+
+    @staticmethod
+    def _softmax(scores):
+        scores = scores - scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict_proba(self, normalised_descriptions):
+        if not normalised_descriptions:
+            return np.zeros((0, len(self.categories)), dtype=np.float32)
+        return self._softmax(self._scores(*hash_features(normalised_descriptions, self.n_features)))
+
+    def predict(self, normalised_descriptions):
+        """
+        :return: list of (category, probability)
+        """
+        probabilities = self.predict_proba(normalised_descriptions)
+        best = probabilities.argmax(axis=1)
+        return [
+            (self.categories[label], float(probability))
+            for label, probability in zip(best, probabilities[np.arange(len(best)), best])
+        ]
+
+    def fit(self, normalised_descriptions, labels, epochs=5, batch_size=None, learning_rate=10.0, l2=1e-6, seed=0):
+        """
+        Mini-batch SGD on the softmax cross-entropy.
+
+        :param labels: category index per description
+        :param batch_size: defaults to about 200 steps per epoch, between 32 and 256 rows,
+                           so small training sets still get enough updates
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        batch_size = batch_size or min(256, max(32, len(labels) // 200))
+        rng = np.random.default_rng(seed)
+
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            order = rng.permutation(len(labels))
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                indices, values, offsets = hash_features([normalised_descriptions[i] for i in rows], self.n_features)
+                probabilities = self._softmax(self._scores(indices, values, offsets))
+
+                # d(loss)/d(scores) = p - onehot(label), averaged over the batch
+                gradient = probabilities
+                gradient[np.arange(len(rows)), labels[rows]] -= 1.0
+                gradient /= len(rows)
+
+                lengths = np.diff(np.append(offsets, len(indices)))
+                row_of_feature = np.repeat(np.arange(len(rows)), lengths)
+                if l2:
+                    touched = np.unique(indices)
+                    self.weights[touched] *= (1 - rate * l2)
+                np.add.at(self.weights, indices, -rate * values[:, None] * gradient[row_of_feature])
+                self.bias -= rate * gradient.sum(axis=0).astype(np.float32)
+        return self
+
+    def accuracy(self, normalised_descriptions, labels):
+        if not labels:
+            return None
+        probabilities = self.predict_proba(normalised_descriptions)
+        return float((probabilities.argmax(axis=1) == np.asarray(labels)).mean())
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, weights=self.weights, bias=self.bias)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, categories, n_features, data):
+        arrays = np.load(io.BytesIO(bytes(data)))
+        return cls(categories, n_features, arrays['weights'], arrays['bias'])
@@ -0,0 +1,57 @@
+"""
+Hashed text features for transaction descriptions.
+
+Descriptions are normalised (lower case, digits and punctuation dropped, so card numbers,
+store numbers and dates do not split one merchant into many) and turned into word
+unigrams, word bigrams and character trigrams. Each feature is hashed with CRC32 into
+one of `n_features` buckets, with a hash-derived sign so collisions tend to cancel out,
+and every row is L2-normalised. No vocabulary is stored: the same function serves
+training and inference in any process.
+"""
+import re
+import zlib
+import numpy as np
+
+_NON_LETTERS = re.compile(r'[^a-z ]+')
+EMPTY_TOKEN = '<empty>'
+
+
+def normalise_description(description):
+    text = _NON_LETTERS.sub(' ', (description or '').lower())
+    return ' '.join(word for word in text.split() if len(word) > 1)
+
+
+def _tokens(normalised):
+    words = normalised.split()
+    if not words:
+        return [EMPTY_TOKEN]
+    tokens = list(words)
+    tokens.extend(f"{first} {second}" for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        tokens.extend(f"3:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return tokens
+
+
+def hash_features(normalised_descriptions, n_features):
+    """
+    Hashes a batch of normalised descriptions into a sparse matrix in CSR-like form.
+
+    :return: (indices int64 [nnz], values float32 [nnz], offsets int64 [rows]) where row r
+             holds indices[offsets[r]:offsets[r + 1]]. Every row has at least one feature.
+    """
+    indices = []
+    signs = []
+    offsets = np.empty(len(normalised_descriptions), dtype=np.int64)
+    for row, text in enumerate(normalised_descriptions):
+        offsets[row] = len(indices)
+        for token in _tokens(text):
+            h = zlib.crc32(token.encode())
+            indices.append(h % n_features)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+
+    indices = np.asarray(indices, dtype=np.int64)
+    values = np.asarray(signs, dtype=np.float32)
+    lengths = np.diff(np.append(offsets, len(indices)))
+    values /= np.sqrt(np.repeat(lengths, lengths)).astype(np.float32)
+    return indices, values, offsets
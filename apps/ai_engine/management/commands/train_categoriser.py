@@ -0,0 +1,26 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai_engine.services import CategorisationService
+
+
+class Command(BaseCommand):
+    help = "Trains the transaction categoriser on labelled transactions and makes it the active model."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=5)
+        parser.add_argument('--limit', type=int, help="Overrides CATEGORISER_MAX_TRAINING_SAMPLES.")
+        parser.add_argument('--categorise', action='store_true', help="Then categorise all uncategorised transactions.")
+
+    def handle(self, *args, **options):
+        try:
+            model = CategorisationService.train(CategorisationService.training_data(options['limit']), epochs=options['epochs'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        accuracy = f"{model.accuracy:.1%}" if model.accuracy is not None else "n/a"
+        self.stdout.write(f"Trained model #{model.id} on {model.training_samples} transactions, {len(model.categories)} categories, held-out accuracy {accuracy}.")
+
+        if options['categorise']:
+            total = 0
+            while categorised := CategorisationService.categorise_pending():
+                total += categorised
+            self.stdout.write(f"Categorised {total} transactions.")
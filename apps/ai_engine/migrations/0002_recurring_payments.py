@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0001_initial'),
+        ('ledger', '0013_transaction_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringScanState',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('watermark_at', models.DateTimeField(blank=True, null=True)),
+                ('watermark_id', models.UUIDField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringPaymentGroup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=255)),
+                ('description', models.CharField(max_length=255)),
+                ('occurrences', models.PositiveIntegerField(default=0)),
+                ('last_amount', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('first_seen', models.DateField()),
+                ('last_seen', models.DateField()),
+                ('interval_mean', models.FloatField(default=0.0)),
+                ('interval_m2', models.FloatField(default=0.0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_payment_groups', to='ledger.ledgeraccount')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_payment_groups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('account', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionSuggestion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('service_name', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('billing_cycle', models.CharField(max_length=20)),
+                ('next_billing_date', models.DateField()),
+                ('occurrences', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('ACCEPTED', 'Accepted'), ('DISMISSED', 'Dismissed')], default='PENDING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_suggestions', to='ledger.ledgeraccount')),
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion', to='ai_engine.recurringpaymentgroup')),
+                ('subscription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ledger.subscription')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'status'], name='ai_engine_s_user_id_009ab7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+import uuid
+from django.db import models
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+
+class CategoryModel(models.Model):
+    """
+    A trained transaction categoriser. The newest active model is used for inference.
+    """
+    id = models.BigAutoField(primary_key=True)
+    categories = models.JSONField()
+    n_features = models.PositiveIntegerField()
+    # LinearCategoryClassifier.to_bytes(): compressed weight matrix and bias
+    parameters = models.BinaryField()
+    training_samples = models.PositiveIntegerField(default=0)
+    # Share of a held-out sample of the training data predicted correctly
+    accuracy = models.FloatField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Category model #{self.id} ({len(self.categories)} categories)"
+
+
+class RecurringPaymentGroup(models.Model):
+    """
+    Running statistics of one account's payments with the same normalised description
+    and amount band, updated incrementally by the recurring-payment scan.
+    Intervals are in days; their mean and variance are kept with Welford's algorithm.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recurring_payment_groups')
+    account = models.ForeignKey('ledger.LedgerAccount', on_delete=models.CASCADE, related_name='recurring_payment_groups')
+    # '<normalised description>|<amount band>'
+    key = models.CharField(max_length=255)
+    description = models.CharField(max_length=255)
+    occurrences = models.PositiveIntegerField(default=0)
+    last_amount = models.DecimalField(max_digits=20, decimal_places=4)
+    first_seen = models.DateField()
+    last_seen = models.DateField()
+    interval_mean = models.FloatField(default=0.0)
+    interval_m2 = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('account', 'key')
+
+    def __str__(self):
+        return f"{self.description} x{self.occurrences}"
+
+
+class RecurringScanState(models.Model):
+    """
+    Watermark of the recurring-payment scan: the (created_at, id) of the last journal
+    entry folded into the groups. One row.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    watermark_at = models.DateTimeField(null=True, blank=True)
+    watermark_id = models.UUIDField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SubscriptionSuggestion(models.Model):
+    """
+    A recurring charge the scan found, offered to the user as a Subscription.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        ACCEPTED = 'ACCEPTED', _('Accepted')
+        DISMISSED = 'DISMISSED', _('Dismissed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='subscription_suggestions')
+    group = models.OneToOneField(RecurringPaymentGroup, on_delete=models.CASCADE, related_name='suggestion')
+    account = models.ForeignKey('ledger.LedgerAccount', on_delete=models.CASCADE, related_name='subscription_suggestions')
+    service_name = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    billing_cycle = models.CharField(max_length=20)
+    next_billing_date = models.DateField()
+    occurrences = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    subscription = models.ForeignKey('ledger.Subscription', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.service_name} {self.amount} ({self.billing_cycle})"
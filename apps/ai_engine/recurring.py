@@ -0,0 +1,260 @@
+import math
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.ledger.billing import advance_billing_date
+from apps.ledger.models import LedgerAccount, JournalEntry, Subscription
+from apps.ledger.response_cache import bump_user_versions_on_commit
+from .features import normalise_description
+from .models import RecurringPaymentGroup, RecurringScanState, SubscriptionSuggestion
+
+# billing_cycle -> (expected interval in days, allowed deviation of the mean, minimum charges seen)
+CYCLES = {
+    'Weekly': (7, 1, 4),
+    'Monthly': (30.44, 3, 3),
+    'Quarterly': (91.31, 5, 3),
+    'Yearly': (365.25, 7, 2),
+}
+# Amounts within about 10% of each other share a band, so small price changes keep one group
+AMOUNT_BAND_RATIO = 1.1
+
+
+def amount_band(amount):
+    return round(math.log(float(amount)) / math.log(AMOUNT_BAND_RATIO))
+
+
+def payment_key(description, amount):
+    return f"{normalise_description(description)[:200]}|{amount_band(amount)}"
+
+
+class RecurringPaymentService:
+    @staticmethod
+    def classify(group):
+        """
+        The billing cycle whose period matches the group's interval statistics, or None.
+        The spread of the intervals must be within the cycle's allowed deviation too,
+        so a merchant paid irregularly about once a month is not mistaken for a subscription.
+        """
+        intervals = group.occurrences - 1
+        if intervals < 1:
+            return None
+        spread = math.sqrt(group.interval_m2 / (intervals - 1)) if intervals > 1 else 0.0
+        for cycle, (period, deviation, minimum) in CYCLES.items():
+            if group.occurrences >= minimum and abs(group.interval_mean - period) <= deviation and spread <= deviation:
+                return cycle
+        return None
+
+    @staticmethod
+    def _spends_after(watermark_at, watermark_id, until, limit):
+        """
+        The next `limit` outgoing entries (credits to users' asset and liability accounts) in
+        (created_at, id) order after the watermark. Walks the created_at index; the
+        app's own subscription charges are skipped. Each row also carries its transaction's
+        date, which differs from the entry's for imported statement rows.
+        """
+        entries = JournalEntry.objects.filter(
+            type=JournalEntry.EntryType.CREDIT,
+            created_at__lt=until,
+            account__user__isnull=False,
+            account__type__in=[LedgerAccount.Type.ASSET, LedgerAccount.Type.LIABILITY],
+        ).exclude(transaction__reference__startswith='SUB-')
+        if watermark_at is not None:
+            entries = entries.filter(
+                Q(created_at__gt=watermark_at) | Q(created_at=watermark_at, id__gt=watermark_id)
+            )
+        return list(
+            entries.order_by('created_at', 'id').values_list(
+                'id', 'created_at', 'account_id', 'account__user_id', 'amount', 'transaction__description',
+                'transaction__created_at'
+            )[:limit]
+        )
+
+    @staticmethod
+    def _fold(rows):
+        """
+        Folds a chunk of entries into their groups: entries are sorted by (account, key, date)
+        so each group's new charges are adjacent and in order, then every group is updated
+        in one pass. Groups are read with one query and written with one bulk_create and
+        one bulk_update, whatever the number of entries.
+
+        :return: the groups that changed
+        """
+        keyed = sorted(
+            ((account_id, payment_key(description, amount), timezone.localdate(charged_at), user_id, amount, description)
+             for _, _, account_id, user_id, amount, description, charged_at in rows if amount > 0),
+            key=lambda row: row[:3]
+        )
+        if not keyed:
+            return []
+
+        existing = {
+            (group.account_id, group.key): group
+            for group in RecurringPaymentGroup.objects.filter(
+                account_id__in={row[0] for row in keyed}, key__in={row[1] for row in keyed}
+            )
+        }
+        created, updated = [], {}
+        for (account_id, key), charges in groupby(keyed, key=lambda row: row[:2]):
+            group = existing.get((account_id, key))
+            for _, _, day, user_id, amount, description in charges:
+                if group is None:
+                    group = RecurringPaymentGroup(
+                        user_id=user_id, account_id=account_id, key=key, description=description[:255],
+                        occurrences=1, last_amount=amount, first_seen=day, last_seen=day
+                    )
+                    created.append(group)
+                    continue
+                if day <= group.last_seen:
+                    # Several charges on one day are one occurrence; a charge dated before the group's
+                    # latest (history imported afterwards) would break the running interval statistics
+                    continue
+
+                interval = (day - group.last_seen).days
+                group.occurrences += 1
+                delta = interval - group.interval_mean
+                group.interval_mean += delta / (group.occurrences - 1)
+                group.interval_m2 += delta * (interval - group.interval_mean)
+                group.last_seen = day
+                group.last_amount = amount
+                group.description = description[:255]
+                if group.pk:
+                    updated[group.pk] = group
+
+        RecurringPaymentGroup.objects.bulk_create(created, batch_size=1000)
+        RecurringPaymentGroup.objects.bulk_update(
+            updated.values(),
+            ['occurrences', 'last_amount', 'last_seen', 'interval_mean', 'interval_m2', 'description'],
+            batch_size=1000
+        )
+        return created + list(updated.values())
+
+    @staticmethod
+    def _suggest(groups):
+        """
+        Proposes a Subscription for each periodic group that has no suggestion yet and does
+        not match a subscription the user already has. Pending suggestions follow their
+        group's latest charge, so the amount and next billing date offered stay current.
+
+        :return: number of suggestions created
+        """
+        periodic = [(group, RecurringPaymentService.classify(group)) for group in groups]
+        periodic = [(group, cycle) for group, cycle in periodic if cycle]
+        if not periodic:
+            return 0
+
+        existing = {
+            suggestion.group_id: suggestion
+            for suggestion in SubscriptionSuggestion.objects.filter(group_id__in=[group.id for group, _ in periodic])
+        }
+        known = {
+            (user_id, normalise_description(name))
+            for user_id, name in Subscription.objects.filter(
+                user_id__in={group.user_id for group, _ in periodic}
+            ).values_list('user_id', 'service_name')
+        }
+
+        created, updated = [], []
+        for group, cycle in periodic:
+            suggestion = existing.get(group.id)
+            if suggestion is not None:
+                if suggestion.status == SubscriptionSuggestion.Status.PENDING:
+                    suggestion.amount = group.last_amount.quantize(Decimal('0.01'))
+                    suggestion.billing_cycle = cycle
+                    suggestion.next_billing_date = advance_billing_date(group.last_seen, cycle)
+                    suggestion.occurrences = group.occurrences
+                    updated.append(suggestion)
+                continue
+
+            name = group.key.rsplit('|', 1)[0]
+            if (group.user_id, name) in known:
+                continue
+            created.append(SubscriptionSuggestion(
+                user_id=group.user_id,
+                group=group,
+                account_id=group.account_id,
+                service_name=(name.title() or group.description)[:100],
+                amount=group.last_amount.quantize(Decimal('0.01')),
+                billing_cycle=cycle,
+                next_billing_date=advance_billing_date(group.last_seen, cycle),
+                occurrences=group.occurrences,
+            ))
+        SubscriptionSuggestion.objects.bulk_create(created, ignore_conflicts=True)
+        SubscriptionSuggestion.objects.bulk_update(
+            updated, ['amount', 'billing_cycle', 'next_billing_date', 'occurrences'], batch_size=1000
+        )
+        return len(created)
+
+    @staticmethod
+    def scan(chunk_size=None, time_budget=None):
+        """
+        Folds journal entries posted since the last scan into the recurring-payment groups
+        and proposes subscriptions, chunk by chunk, for about `time_budget` seconds.
+
+        Each chunk commits together with the watermark, under the scan state's row lock,
+        so concurrent scans never fold an entry twice and an interrupted scan resumes at
+        the last committed chunk. Entries younger than RECURRING_SCAN_LAG seconds are left
+        for the next run, so postings still committing are not skipped by the watermark.
+
+        :return: (entries scanned, suggestions created, whether entries remain)
+        """
+        chunk_size = chunk_size or settings.RECURRING_SCAN_CHUNK_SIZE
+        deadline = time.monotonic() + (time_budget or settings.RECURRING_SCAN_SLICE_SECONDS)
+        until = timezone.now() - timedelta(seconds=settings.RECURRING_SCAN_LAG)
+        RecurringScanState.objects.get_or_create(id=1)
+
+        scanned = suggested = 0
+        while time.monotonic() < deadline:
+            with transaction.atomic():
+                state = RecurringScanState.objects.select_for_update(skip_locked=True).filter(id=1).first()
+                if state is None:
+                    return scanned, suggested, False  # another scan is running
+
+                rows = RecurringPaymentService._spends_after(state.watermark_at, state.watermark_id, until, chunk_size)
+                if not rows:
+                    return scanned, suggested, False
+
+                groups = RecurringPaymentService._fold(rows)
+                suggested += RecurringPaymentService._suggest(groups)
+                state.watermark_id, state.watermark_at = rows[-1][0], rows[-1][1]
+                state.save()
+                scanned += len(rows)
+
+            if len(rows) < chunk_size:
+                return scanned, suggested, False
+        return scanned, suggested, True
+
+    @staticmethod
+    def accept(suggestion):
+        """
+        Turns a pending suggestion into a Subscription on the account it was charged to.
+        """
+        with transaction.atomic():
+            suggestion = SubscriptionSuggestion.objects.select_for_update().get(id=suggestion.id)
+            if suggestion.status != SubscriptionSuggestion.Status.PENDING:
+                raise ValidationError(f"Suggestion is already {suggestion.status.lower()}.")
+            suggestion.subscription = Subscription.objects.create(
+                user_id=suggestion.user_id,
+                service_name=suggestion.service_name,
+                amount=suggestion.amount,
+                billing_cycle=suggestion.billing_cycle,
+                next_billing_date=suggestion.next_billing_date,
+                account_id=suggestion.account_id,
+            )
+            suggestion.status = SubscriptionSuggestion.Status.ACCEPTED
+            suggestion.save(update_fields=['subscription', 'status'])
+            bump_user_versions_on_commit([suggestion.user_id])
+            return suggestion
+
+    @staticmethod
+    def dismiss(suggestion):
+        if suggestion.status != SubscriptionSuggestion.Status.PENDING:
+            raise ValidationError(f"Suggestion is already {suggestion.status.lower()}.")
+        suggestion.status = SubscriptionSuggestion.Status.DISMISSED
+        suggestion.save(update_fields=['status'])
+        return suggestion
@@ -0,0 +1,345 @@
+"""
+Risk scoring for postings and card spends.
+
+Every outgoing leg of a user-initiated posting is scored before the ledger takes its
+row locks, from per-account statistics that take constant space and are updated
+incrementally once the posting commits:
+
+- amount: running mean and variance of log(1 + amount) (Welford's algorithm)
+- velocity: an exponentially decayed count of recent spends
+- counterparties: a small Bloom filter of who the account has paid before
+
+Scoring has a fixed time budget (RISK_BUDGET_MS). When the state store cannot answer in
+time, or fails, the posting goes through or is refused according to RISK_FAIL_MODE.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+import redis
+from collections import namedtuple, OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.module_loading import import_string
+from apps.ledger.models import LedgerAccount, JournalEntry
+
+logger = logging.getLogger(__name__)
+
+# One outgoing leg: `amount` in account currency units, `counterparty` an opaque string
+RiskSignal = namedtuple('RiskSignal', ['account_id', 'amount', 'counterparty'])
+RiskAssessment = namedtuple('RiskAssessment', ['score', 'reasons'])
+# Per-account statistics as read from a state store, before the signal is applied
+AccountFeatures = namedtuple('AccountFeatures', ['count', 'mean', 'm2', 'rate', 'last_at', 'known_counterparty'])
+
+BLOOM_BITS = 1024
+BLOOM_HASHES = 3
+STATE_KEY = 'risk:account:{}'
+BLOOM_KEY = 'risk:account:{}:seen'
+# Statistics of accounts that stopped spending expire after this long
+STATE_TTL = 90 * 86400
+# Socket timeout (seconds) of the after-commit statistics writes, which no posting waits for
+OBSERVE_TIMEOUT = 1.0
+
+
+def bloom_positions(counterparty):
+    digest = hashlib.blake2b(counterparty.encode(), digest_size=8).digest()
+    return [int.from_bytes(digest[i * 2:i * 2 + 2], 'big') % BLOOM_BITS for i in range(BLOOM_HASHES)]
+
+
+def decayed_rate(rate, last_at, now):
+    if not last_at:
+        return 0.0
+    return rate * 0.5 ** (max(now - last_at, 0) / settings.RISK_VELOCITY_HALF_LIFE)
+
+
+class LocalRiskStateStore:
+    """
+    In-process statistics for development and tests, bounded to the most recently
+    active MAX_ACCOUNTS accounts. Only consistent within a single process.
+    """
+    MAX_ACCOUNTS = 100000
+
+    def __init__(self):
+        self._accounts = OrderedDict()  # account_id -> [count, mean, m2, rate, last_at, bloom bytearray]
+        self._lock = threading.Lock()
+
+    def fetch(self, signals):
+        features = []
+        with self._lock:
+            for signal in signals:
+                state = self._accounts.get(signal.account_id)
+                if state is None:
+                    features.append(AccountFeatures(0, 0.0, 0.0, 0.0, 0.0, False))
+                    continue
+                bloom = state[5]
+                known = all(bloom[position >> 3] & (1 << (position & 7)) for position in bloom_positions(signal.counterparty))
+                features.append(AccountFeatures(state[0], state[1], state[2], state[3], state[4], known))
+        return features
+
+    def observe(self, signals, now):
+        with self._lock:
+            for signal in signals:
+                state = self._accounts.get(signal.account_id)
+                if state is None:
+                    state = self._accounts[signal.account_id] = [0, 0.0, 0.0, 0.0, 0.0, bytearray(BLOOM_BITS // 8)]
+                self._accounts.move_to_end(signal.account_id)
+
+                x = math.log1p(signal.amount)
+                state[0] += 1
+                delta = x - state[1]
+                state[1] += delta / state[0]
+                state[2] += delta * (x - state[1])
+                state[3] = decayed_rate(state[3], state[4], now) + 1
+                state[4] = now
+                for position in bloom_positions(signal.counterparty):
+                    state[5][position >> 3] |= 1 << (position & 7)
+
+            while len(self._accounts) > self.MAX_ACCOUNTS:
+                self._accounts.popitem(last=False)
+
+
+# Applies one signal: Welford update of the log-amount statistics, decayed velocity and
+# the counterparty's Bloom filter bits, in one atomic step.
+# KEYS: state hash, bloom bitmap. ARGV: log1p(amount), now, half-life, ttl, bloom positions...
+OBSERVE_SCRIPT = """
+local x = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'count', 'mean', 'm2', 'rate', 'last_at')
+local count = tonumber(state[1] or '0') + 1
+local mean = tonumber(state[2] or '0')
+local m2 = tonumber(state[3] or '0')
+local rate = tonumber(state[4] or '0')
+local last_at = tonumber(state[5] or '0')
+local delta = x - mean
+mean = mean + delta / count
+m2 = m2 + delta * (x - mean)
+if last_at > 0 then
+    rate = rate * math.pow(0.5, math.max(now - last_at, 0) / tonumber(ARGV[3]))
+end
+redis.call('HSET', KEYS[1], 'count', count, 'mean', string.format('%.17g', mean),
+    'm2', string.format('%.17g', m2), 'rate', string.format('%.17g', rate + 1), 'last_at', ARGV[2])
+for i = 5, #ARGV do
+    redis.call('SETBIT', KEYS[2], tonumber(ARGV[i]), 1)
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[4]))
+return count
+"""
+
+
+class RedisRiskStateStore:
+    """
+    Statistics in Redis, shared by every web and worker process. Reading the features
+    of a posting is one pipelined round-trip; the client's socket timeout is the
+    scoring budget, so a slow Redis cannot hold a posting up for longer than that.
+    Observations run after commit, outside any budget, on `write_client` (with
+    ordinary timeouts) so they are not dropped whenever Redis takes a few ms.
+    """
+
+    def __init__(self, client, write_client=None):
+        self.client = client
+        self.write_client = write_client or client
+        self._observe = self.write_client.register_script(OBSERVE_SCRIPT)
+
+    def fetch(self, signals):
+        pipe = self.client.pipeline(transaction=False)
+        for signal in signals:
+            pipe.hmget(STATE_KEY.format(signal.account_id), 'count', 'mean', 'm2', 'rate', 'last_at')
+            for position in bloom_positions(signal.counterparty):
+                pipe.getbit(BLOOM_KEY.format(signal.account_id), position)
+        replies = pipe.execute()
+
+        features = []
+        step = 1 + BLOOM_HASHES
+        for i in range(len(signals)):
+            count, mean, m2, rate, last_at = replies[i * step]
+            features.append(AccountFeatures(
+                int(count or 0), float(mean or 0), float(m2 or 0), float(rate or 0), float(last_at or 0),
+                all(replies[i * step + 1:(i + 1) * step])
+            ))
+        return features
+
+    def observe(self, signals, now):
+        pipe = self.write_client.pipeline(transaction=False)
+        for signal in signals:
+            self._observe(
+                keys=[STATE_KEY.format(signal.account_id), BLOOM_KEY.format(signal.account_id)],
+                args=[repr(math.log1p(signal.amount)), now, settings.RISK_VELOCITY_HALF_LIFE, STATE_TTL]
+                     + bloom_positions(signal.counterparty),
+                client=pipe
+            )
+        pipe.execute()
+
+
+_store = None
+
+
+def get_risk_state_store():
+    global _store
+    if _store is None:
+        url = getattr(settings, 'REDIS_URL', '')
+        if url:
+            # Clients of their own: the reads' timeouts are the scoring budget, not the card store's;
+            # the writes' are ordinary ones
+            timeout = settings.RISK_BUDGET_MS / 1000
+            client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+            write_client = redis.Redis.from_url(url, socket_timeout=OBSERVE_TIMEOUT, socket_connect_timeout=OBSERVE_TIMEOUT)
+            _store = RedisRiskStateStore(client, write_client)
+        else:
+            _store = LocalRiskStateStore()
+    return _store
+
+
+class StatisticalRiskScorer:
+    """
+    Scores a spend from how far it departs from the account's own history:
+
+        score = sigmoid(BIAS + AMOUNT_WEIGHT * max(z, 0)
+                        + VELOCITY_WEIGHT * max(velocity - RISK_VELOCITY_LIMIT, 0)
+                        + COUNTERPARTY_WEIGHT * new_counterparty)
+
+    where z is the standard score of log(1 + amount). Accounts with fewer than
+    RISK_MIN_HISTORY spends only get the velocity term.
+    """
+    BIAS = -6.0
+    AMOUNT_WEIGHT = 1.5
+    VELOCITY_WEIGHT = 0.5
+    COUNTERPARTY_WEIGHT = 2.0
+
+    def __init__(self, store=None):
+        self.store = store or get_risk_state_store()
+
+    def score_features(self, signal, features, now):
+        logit = self.BIAS
+        reasons = []
+        if features.count >= settings.RISK_MIN_HISTORY:
+            variance = features.m2 / (features.count - 1)
+            z = (math.log1p(signal.amount) - features.mean) / math.sqrt(max(variance, 0.01))
+            if z > 0:
+                logit += self.AMOUNT_WEIGHT * z
+                if z > 3:
+                    reasons.append('unusual_amount')
+            if not features.known_counterparty:
+                logit += self.COUNTERPARTY_WEIGHT
+                reasons.append('new_counterparty')
+
+        velocity = decayed_rate(features.rate, features.last_at, now) + 1
+        if velocity > settings.RISK_VELOCITY_LIMIT:
+            logit += self.VELOCITY_WEIGHT * (velocity - settings.RISK_VELOCITY_LIMIT)
+            reasons.append('high_velocity')
+        return 1 / (1 + math.exp(-logit)), reasons
+
+    def assess(self, signals, now):
+        best = RiskAssessment(0.0, [])
+        for signal, features in zip(signals, self.store.fetch(signals)):
+            score, reasons = self.score_features(signal, features, now)
+            if score > best.score:
+                best = RiskAssessment(score, reasons)
+        return best
+
+    def observe(self, signals, now):
+        self.store.observe(signals, now)
+
+
+class RiskService:
+    _scorer = None
+    _accounts = {}  # account_id -> (user_id, type); neither ever changes, so entries never go stale
+    MAX_CACHED_ACCOUNTS = 100000
+    # Credits to these account types move money out (or run up debt)
+    SPENDING_TYPES = (LedgerAccount.Type.ASSET, LedgerAccount.Type.LIABILITY)
+
+    @staticmethod
+    def get_scorer():
+        """
+        The RISK_SCORER instance (a dotted path to a class with assess() and observe()),
+        or None when risk scoring is switched off.
+        """
+        if not settings.RISK_SCORER:
+            return None
+        if RiskService._scorer is None:
+            RiskService._scorer = import_string(settings.RISK_SCORER)()
+        return RiskService._scorer
+
+    @staticmethod
+    def posting_signals(user, entries_data):
+        """
+        The outgoing legs of a posting: credits to asset or liability accounts owned by the
+        user who initiated it. Their counterparty is the set of accounts the posting debits.
+        Account owners are cached per process, so this only queries on first sight of an account.
+        """
+        if user is None or RiskService.get_scorer() is None:
+            return []
+
+        account_ids = {str(entry['account_id']) for entry in entries_data}
+        missing = account_ids - RiskService._accounts.keys()
+        if missing:
+            if len(RiskService._accounts) > RiskService.MAX_CACHED_ACCOUNTS:
+                RiskService._accounts.clear()
+            RiskService._accounts.update(
+                (str(account_id), (user_id, account_type))
+                for account_id, user_id, account_type
+                in LedgerAccount.objects.filter(id__in=missing).values_list('id', 'user_id', 'type')
+            )
+
+        counterparty = ','.join(sorted(
+            str(entry['account_id']) for entry in entries_data if entry['type'] == JournalEntry.EntryType.DEBIT
+        ))
+        signals = []
+        for entry in entries_data:
+            owner, account_type = RiskService._accounts.get(str(entry['account_id']), (None, None))
+            if entry['type'] == JournalEntry.EntryType.CREDIT and owner == user.id and account_type in RiskService.SPENDING_TYPES:
+                signals.append(RiskSignal(str(entry['account_id']), float(entry['amount']), f"account:{counterparty}"))
+        return signals
+
+    @staticmethod
+    def check(signals):
+        """
+        Scores `signals` within RISK_BUDGET_MS and refuses the spend if the score reaches
+        RISK_BLOCK_THRESHOLD. Call before the ledger takes its locks. When scoring fails
+        or runs over budget the spend is allowed (RISK_FAIL_MODE 'open') or refused ('closed').
+
+        :raises ValidationError: code 'risk_declined' or 'risk_unavailable'
+        :return: the RiskAssessment, or None if nothing was scored
+        """
+        scorer = RiskService.get_scorer()
+        if scorer is None or not signals:
+            return None
+
+        start = time.perf_counter()
+        now = time.time()
+        try:
+            assessment = scorer.assess(signals, now)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > settings.RISK_BUDGET_MS:
+                raise TimeoutError(f"risk scoring took {elapsed_ms:.2f}ms")
+        except Exception as e:
+            if settings.RISK_FAIL_MODE == 'closed':
+                logger.warning(f"Risk scoring unavailable, refusing spend: {e}")
+                raise ValidationError("Risk checks are unavailable, try again later.", code='risk_unavailable')
+            logger.warning(f"Risk scoring unavailable, allowing spend: {e}")
+            return None
+
+        if assessment.score >= settings.RISK_BLOCK_THRESHOLD:
+            logger.info(f"Spend from {signals[0].account_id} declined, risk {assessment.score:.3f} {assessment.reasons}")
+            raise ValidationError("Declined by risk checks.", code='risk_declined')
+        return assessment
+
+    @staticmethod
+    def observe_on_commit(signals):
+        """
+        Folds `signals` into the account statistics once the surrounding transaction commits,
+        so refused or rolled back spends never become part of an account's normal.
+        """
+        scorer = RiskService.get_scorer()
+        if scorer is None or not signals:
+            return
+
+        def observe():
+            try:
+                scorer.observe(signals, time.time())
+            except Exception as e:
+                logger.warning(f"Risk statistics not updated: {e}")
+
+        transaction.on_commit(observe)
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from .models import SubscriptionSuggestion
+
+class SubscriptionSuggestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SubscriptionSuggestion
+        fields = [
+            'id', 'account', 'service_name', 'amount', 'billing_cycle', 'next_billing_date',
+            'occurrences', 'status', 'subscription', 'created_at'
+        ]
+        read_only_fields = fields
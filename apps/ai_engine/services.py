@@ -0,0 +1,168 @@
+import threading
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from apps.ledger.analytics import SpendingAnalyticsService
+from apps.ledger.models import Transaction
+from .classifier import LinearCategoryClassifier
+from .features import normalise_description
+from .models import CategoryModel
+
+# Stored for predictions below CATEGORISER_MIN_CONFIDENCE, so they are not picked up again
+UNCATEGORISED = 'Uncategorised'
+
+
+class CachedCategoriser:
+    """
+    A classifier plus an LRU cache of its predictions keyed by normalised description.
+    Most transactions come from a small set of merchants, so after warm-up the bulk of a
+    batch is served from the cache and only new descriptions reach the model.
+    """
+
+    def __init__(self, model_id, classifier, cache_size):
+        self.model_id = model_id
+        self.classifier = classifier
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # normalised description -> (category, confidence), least recently used first
+        self._lock = threading.Lock()
+
+    def categorise(self, descriptions):
+        """
+        :return: list of (category, confidence), one per description
+        """
+        keys = [normalise_description(description) for description in descriptions]
+        results = {}
+        with self._lock:
+            for key in keys:
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = hit
+
+        misses = [key for key in dict.fromkeys(keys) if key not in results]
+        if misses:
+            predicted = dict(zip(misses, self.classifier.predict(misses)))
+            results.update(predicted)
+            with self._lock:
+                self._cache.update(predicted)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [results[key] for key in keys]
+
+
+class CategorisationService:
+    _categoriser = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def training_data(limit=None):
+        """
+        (description, category) of the most recent transactions whose category was given
+        rather than predicted, so the model never trains on its own output.
+        """
+        limit = limit or settings.CATEGORISER_MAX_TRAINING_SAMPLES
+        return list(
+            Transaction.objects.filter(category_confidence__isnull=True)
+            .exclude(category__in=['', UNCATEGORISED])
+            .order_by('-created_at')
+            .values_list('description', 'category')[:limit]
+        )
+
+    @staticmethod
+    def train(samples=None, epochs=5, holdout=0.1):
+        """
+        Trains a classifier on `samples` (default: training_data()), scores it on a held-out
+        share and stores it as the active CategoryModel.
+
+        :param samples: list of (description, category)
+        """
+        samples = CategorisationService.training_data() if samples is None else samples
+        categories = sorted({category for _, category in samples})
+        if len(samples) < settings.CATEGORISER_MIN_TRAINING_SAMPLES or len(categories) < 2:
+            raise ValidationError(
+                f"Need at least {settings.CATEGORISER_MIN_TRAINING_SAMPLES} labelled transactions "
+                f"in 2 or more categories to train, got {len(samples)} in {len(categories)}."
+            )
+
+        label_of = {category: index for index, category in enumerate(categories)}
+        descriptions = [normalise_description(description) for description, _ in samples]
+        labels = [label_of[category] for _, category in samples]
+
+        # Every tenth sample is held out (samples come newest first, so this spreads over time)
+        step = max(int(1 / holdout), 2) if holdout else 0
+        train_rows = [i for i in range(len(samples)) if not step or i % step]
+        test_rows = [i for i in range(len(samples)) if step and not i % step]
+
+        classifier = LinearCategoryClassifier(categories, settings.CATEGORISER_FEATURES).fit(
+            [descriptions[i] for i in train_rows], [labels[i] for i in train_rows], epochs=epochs
+        )
+        accuracy = classifier.accuracy([descriptions[i] for i in test_rows], [labels[i] for i in test_rows])
+
+        model = CategoryModel.objects.create(
+            categories=categories,
+            n_features=classifier.n_features,
+            parameters=classifier.to_bytes(),
+            training_samples=len(train_rows),
+            accuracy=accuracy
+        )
+        CategoryModel.objects.filter(is_active=True).exclude(id=model.id).update(is_active=False)
+        return model
+
+    @staticmethod
+    def get_categoriser():
+        """
+        The categoriser for the newest active model, or None if none has been trained.
+        Costs one indexed query per call to notice a newly trained model; the weights are
+        only loaded when it changes.
+        """
+        model_id = CategoryModel.objects.filter(is_active=True).order_by('-id').values_list('id', flat=True).first()
+        if model_id is None:
+            return None
+
+        categoriser = CategorisationService._categoriser
+        if categoriser is None or categoriser.model_id != model_id:
+            with CategorisationService._lock:
+                categoriser = CategorisationService._categoriser
+                if categoriser is None or categoriser.model_id != model_id:
+                    model = CategoryModel.objects.get(id=model_id)
+                    classifier = LinearCategoryClassifier.from_bytes(model.categories, model.n_features, model.parameters)
+                    categoriser = CachedCategoriser(model_id, classifier, settings.CATEGORISER_CACHE_SIZE)
+                    CategorisationService._categoriser = categoriser
+        return categoriser
+
+    @staticmethod
+    def categorise_pending(batch_size=None):
+        """
+        Categorises the oldest uncategorised transactions, one batch.
+        Writes one UPDATE per (category, confidence) pair rather than one per transaction.
+
+        :return: number of transactions categorised
+        """
+        batch_size = batch_size or settings.CATEGORISER_BATCH_SIZE
+        categoriser = CategorisationService.get_categoriser()
+        if categoriser is None:
+            return 0
+
+        rows = list(
+            Transaction.objects.filter(category='').order_by('created_at').values_list('id', 'description')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        updates = defaultdict(list)
+        for (transaction_id, _), (category, confidence) in zip(rows, categoriser.categorise([description for _, description in rows])):
+            if confidence < settings.CATEGORISER_MIN_CONFIDENCE:
+                category = UNCATEGORISED
+            updates[(category, round(confidence, 2))].append(transaction_id)
+
+        for (category, confidence), transaction_ids in updates.items():
+            with transaction.atomic():
+                # category='' again: a category set by a user in the meantime wins
+                transaction_ids = list(
+                    Transaction.objects.select_for_update().filter(id__in=transaction_ids, category='').values_list('id', flat=True)
+                )
+                Transaction.objects.filter(id__in=transaction_ids).update(category=category, category_confidence=confidence)
+                SpendingAnalyticsService.recategorise(transaction_ids, '', category)
+        return len(rows)
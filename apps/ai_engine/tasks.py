@@ -0,0 +1,43 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from .recurring import RecurringPaymentService
+from .services import CategorisationService
+
+logger = logging.getLogger(__name__)
+
+# Routed to ledger.bulk (see CELERY_TASK_ROUTES).
+
+@shared_task(ignore_result=True)
+def categorise_transactions(batch_size=None):
+    """
+    Categorises new transactions in batches. Re-queues itself while full batches keep coming back.
+    """
+    batch_size = batch_size or settings.CATEGORISER_BATCH_SIZE
+    categorised = CategorisationService.categorise_pending(batch_size)
+    if categorised == batch_size:
+        categorise_transactions.delay(batch_size)
+    return categorised
+
+@shared_task(ignore_result=True)
+def train_category_model():
+    """
+    Retrains the categoriser on the labelled transactions, e.g. after users corrected categories.
+    """
+    try:
+        return CategorisationService.train().id
+    except ValidationError as e:
+        logger.info(f"Category model not retrained: {e.messages[0]}")
+
+@shared_task(ignore_result=True)
+def detect_recurring_payments():
+    """
+    Folds new spends into the recurring-payment groups and suggests subscriptions.
+    Runs one time slice and re-queues itself while entries remain; each chunk commits its
+    own watermark, so a restarted worker continues where the last chunk left off.
+    """
+    scanned, suggested, remaining = RecurringPaymentService.scan()
+    if remaining:
+        detect_recurring_payments.delay()
+    return scanned, suggested
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import SubscriptionSuggestionViewSet
+
+router = DefaultRouter()
+router.register(r'subscription-suggestions', SubscriptionSuggestionViewSet, basename='subscription-suggestion')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
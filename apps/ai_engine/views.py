@@ -0,0 +1,38 @@
+from django.core.exceptions import ValidationError
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .models import SubscriptionSuggestion
+from .recurring import RecurringPaymentService
+from .serializers import SubscriptionSuggestionSerializer
+
+class SubscriptionSuggestionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Recurring charges found in your transactions, offered as subscriptions.
+    Accept one to start tracking (and billing) it, or dismiss it.
+    """
+    serializer_class = SubscriptionSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = SubscriptionSuggestion.objects.filter(user=self.request.user).order_by('-created_at')
+        suggestion_status = self.request.query_params.get('status')
+        if suggestion_status:
+            queryset = queryset.filter(status=suggestion_status.upper())
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def accept(self, request, pk=None):
+        try:
+            suggestion = RecurringPaymentService.accept(self.get_object())
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(suggestion).data)
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        try:
+            suggestion = RecurringPaymentService.dismiss(self.get_object())
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(suggestion).data)
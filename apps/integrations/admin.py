@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import WebhookEndpoint, WebhookDelivery
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('url', 'user', 'is_active', 'max_concurrency', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('url', 'user__email')
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'event_id', 'endpoint', 'status', 'attempts', 'response_status', 'next_attempt_at')
+    list_filter = ('status', 'event_type')
@@ -0,0 +1,196 @@
+import asyncio
+import ipaddress
+import socket
+import ssl
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+
+class HTTPProtocolError(Exception):
+    """
+    The endpoint answered with something that is not a valid HTTP/1.1 response.
+    """
+
+
+class BlockedAddressError(OSError):
+    """
+    The endpoint resolves to an address deliveries may not go to (loopback, private,
+    link-local such as cloud metadata services, or otherwise not globally routable).
+    """
+
+
+# Exceptions a POST can fail with; the dispatcher records them against the delivery
+REQUEST_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HTTPProtocolError)
+
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%')[0])  # drop an IPv6 zone
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_addresses(host, addresses):
+    """
+    :raises BlockedAddressError: if any address `host` resolved to is not public
+    """
+    for address in addresses:
+        if not is_public_address(address):
+            raise BlockedAddressError(f"{host} resolves to {address}, which is not a public address.")
+
+
+def check_url(url, allow_private=False):
+    """
+    Checks a webhook URL before it is registered: an http(s) URL whose host resolves
+    only to public addresses. ConnectionPool checks the addresses again when it connects,
+    since DNS can answer differently later.
+
+    :raises HTTPProtocolError: for a URL the pool cannot POST to
+    :raises OSError: if the host does not resolve, or BlockedAddressError
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise HTTPProtocolError("Webhook URLs must be http:// or https:// URLs with a host.")
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    if not allow_private:
+        check_addresses(parts.hostname, [info[4][0] for info in infos])
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 client for webhook POSTs, built directly on asyncio streams.
+
+    Idle connections are kept per origin and reused, so steady traffic to an endpoint pays
+    for TCP and TLS setup once. At most `max_connections` requests are in flight at once;
+    further callers wait for a slot. Only what webhook delivery needs is supported: POST,
+    Content-Length or chunked response bodies (read and discarded), no redirects.
+    Unless `allow_private`, connections are only opened to public addresses.
+    """
+
+    def __init__(self, max_connections=500, timeout=5.0, allow_private=False):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = defaultdict(deque)  # (scheme, host, port) -> idle (reader, writer) pairs
+        self._idle_count = 0
+        self._ssl = ssl.create_default_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        for connections in self._idle.values():
+            while connections:
+                _, writer = connections.pop()
+                writer.close()
+        self._idle_count = 0
+
+    async def post(self, url, body, headers):
+        """
+        :return: the response status code
+        :raises: one of REQUEST_ERRORS
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise HTTPProtocolError(f"Unsupported URL scheme: {parts.scheme}")
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+        head = [f"POST {target} HTTP/1.1", f"Host: {parts.netloc}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        request = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+        async with self._slots, asyncio.timeout(self.timeout):
+            return await self._send(origin, request)
+
+    async def _send(self, origin, request):
+        reused = bool(self._idle[origin])
+        connection = self._take(origin) if reused else await self._connect(origin)
+        try:
+            status, keep_alive = await self._exchange(connection, request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            connection[1].close()
+            if not reused:
+                raise
+            # The endpoint closed the idle connection in the meantime: retry once on a fresh one
+            connection = await self._connect(origin)
+            try:
+                status, keep_alive = await self._exchange(connection, request)
+            except BaseException:
+                connection[1].close()
+                raise
+        except BaseException:
+            connection[1].close()
+            raise
+
+        if keep_alive and self._idle_count < self.max_connections:
+            self._idle[origin].append(connection)
+            self._idle_count += 1
+        else:
+            connection[1].close()
+        return status
+
+    def _take(self, origin):
+        self._idle_count -= 1
+        return self._idle[origin].pop()
+
+    async def _connect(self, origin):
+        scheme, host, port = origin
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = [info[4][0] for info in infos]
+        if not self.allow_private:
+            check_addresses(host, addresses)
+        # Connect to the addresses just checked rather than resolving the host again; TLS still
+        # verifies the certificate against the host name
+        tls = {'ssl': self._ssl, 'server_hostname': host} if scheme == 'https' else {}
+        error = None
+        for address in addresses:
+            try:
+                return await asyncio.open_connection(address, port, **tls)
+            except OSError as e:
+                error = e
+        raise error
+
+    async def _exchange(self, connection, request):
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        try:
+            version, status = status_line.split(None, 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise HTTPProtocolError(f"Malformed status line: {status_line[:100]!r}")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n'):
+                break
+            if not line:
+                raise asyncio.IncompleteReadError(b'', None)
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection') != 'close'
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif status not in (204, 304):
+            # Body runs until the endpoint closes the connection
+            await reader.read()
+            keep_alive = False
+        return status, keep_alive
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .client import ConnectionPool, REQUEST_ERRORS
+from .models import WebhookDelivery
+from .signing import encode_body, sign, SIGNATURE_HEADER, EVENT_HEADER, DELIVERY_HEADER
+from .webhooks import retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """
+    Delivers pending WebhookDeliveries over one keep-alive ConnectionPool.
+
+    Several lanes run concurrently; each claims a batch of due deliveries with SKIP LOCKED
+    (so lanes and other dispatcher processes never send the same delivery), sends the whole
+    batch concurrently, and records every result in one bulk update. Claimed deliveries are
+    leased: if the process dies mid-batch they become due again once the lease expires.
+    Requests to one endpoint are capped at its max_concurrency, so a batch can take far longer
+    than one lease; the lane renews the lease of its batch until the results are recorded.
+    The lease expiry (next_attempt_at) identifies the claim: results are only recorded on rows
+    still leased to it, so a batch that lost its lease never overwrites another lane's results.
+    """
+
+    def __init__(self, batch_size=None, lanes=None, max_connections=None, timeout=None, lease_seconds=60):
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.lanes = lanes or settings.WEBHOOK_DISPATCH_LANES
+        self.max_connections = max_connections or settings.WEBHOOK_MAX_CONNECTIONS
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self.lease = timedelta(seconds=lease_seconds)
+        self._semaphores = {}
+
+    def claim(self):
+        """
+        :return: (claimed deliveries, lease expiry)
+        """
+        now = timezone.now()
+        leased_until = now + self.lease
+        with transaction.atomic():
+            deliveries = list(
+                WebhookDelivery.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(status=WebhookDelivery.Status.PENDING, next_attempt_at__lte=now)
+                .select_related('endpoint')
+                .order_by('next_attempt_at')[:self.batch_size]
+            )
+            if deliveries:
+                WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in deliveries]).update(
+                    next_attempt_at=leased_until
+                )
+        return deliveries, leased_until
+
+    @staticmethod
+    def _leased(delivery_ids, leased_until):
+        return WebhookDelivery.objects.filter(
+            id__in=delivery_ids, status=WebhookDelivery.Status.PENDING, next_attempt_at=leased_until
+        )
+
+    def renew(self, delivery_ids, leased_until):
+        """
+        Extends the lease on those of `delivery_ids` still leased until `leased_until`.
+
+        :return: the new lease expiry
+        """
+        renewed_until = timezone.now() + self.lease
+        self._leased(delivery_ids, leased_until).update(next_attempt_at=renewed_until)
+        return renewed_until
+
+    def record(self, results, leased_until):
+        """
+        Successes (the bulk of any batch) are written with one UPDATE per response status;
+        only failed attempts, which each get their own backoff, go through bulk_update.
+        Deliveries whose lease ran out and was taken by another claim are left to it.
+
+        :param results: List of (delivery, HTTP status or None, error message or None)
+        """
+        now = timezone.now()
+        delivered = defaultdict(list)  # response status -> delivery ids
+        failed = []
+        for delivery, status_code, error in results:
+            if status_code is not None and 200 <= status_code < 300:
+                delivered[status_code].append(delivery.id)
+                continue
+
+            delivery.attempts += 1
+            delivery.response_status = status_code
+            delivery.last_error = error or f"HTTP {status_code}"
+            if delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                delivery.status = WebhookDelivery.Status.FAILED
+                logger.warning(f"Webhook delivery {delivery.id} to {delivery.endpoint.url} failed permanently: {delivery.last_error}")
+            else:
+                delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+            failed.append(delivery)
+
+        with transaction.atomic():
+            for status_code, delivery_ids in delivered.items():
+                self._leased(delivery_ids, leased_until).update(
+                    status=WebhookDelivery.Status.DELIVERED,
+                    attempts=F('attempts') + 1,
+                    response_status=status_code,
+                    last_error='',
+                    delivered_at=now
+                )
+            if failed:
+                # Locked while checked, so a claim cannot take them between the check and the update
+                owned = set(
+                    self._leased([delivery.id for delivery in failed], leased_until)
+                    .select_for_update().values_list('id', flat=True)
+                )
+                WebhookDelivery.objects.bulk_update(
+                    [delivery for delivery in failed if delivery.id in owned],
+                    ['status', 'attempts', 'response_status', 'last_error', 'next_attempt_at'], batch_size=1000
+                )
+
+    def _semaphore(self, endpoint):
+        key = (endpoint.id, endpoint.max_concurrency)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(max(endpoint.max_concurrency, 1))
+        return semaphore
+
+    async def send(self, client, delivery):
+        endpoint = delivery.endpoint
+        body = encode_body(delivery.event_id, delivery.event_type, delivery.payload)
+        headers = {
+            'Content-Type': 'application/json',
+            SIGNATURE_HEADER: sign(endpoint.secret, int(time.time()), body),
+            EVENT_HEADER: delivery.event_type,
+            DELIVERY_HEADER: str(delivery.event_id),
+        }
+        async with self._semaphore(endpoint):
+            try:
+                return delivery, await client.post(endpoint.url, body, headers), None
+            except REQUEST_ERRORS as e:
+                return delivery, None, f"{type(e).__name__}: {e}"[:500]
+
+    async def dispatch_batch(self, client):
+        """
+        :return: number of deliveries attempted
+        """
+        deliveries, leased_until = await sync_to_async(self.claim, thread_sensitive=False)()
+        if not deliveries:
+            return 0
+
+        delivery_ids = [delivery.id for delivery in deliveries]
+        sending = asyncio.ensure_future(asyncio.gather(*(self.send(client, delivery) for delivery in deliveries)))
+        # Renewed well before it runs out, for every claimed delivery until its result is recorded
+        renew_every = self.lease.total_seconds() / 3
+        while not sending.done():
+            await asyncio.wait([sending], timeout=renew_every)
+            if not sending.done():
+                leased_until = await sync_to_async(self.renew, thread_sensitive=False)(delivery_ids, leased_until)
+        results = sending.result()
+
+        await sync_to_async(self.record, thread_sensitive=False)(results, leased_until)
+        return len(deliveries)
+
+    def client(self):
+        return ConnectionPool(
+            max_connections=self.max_connections, timeout=self.timeout,
+            allow_private=settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES
+        )
+
+    async def _lane(self, client, stop, idle_sleep):
+        while not (stop and stop()):
+            try:
+                attempted = await self.dispatch_batch(client)
+            except Exception:
+                logger.exception("Webhook dispatch batch failed")
+                attempted = 0
+            if attempted < self.batch_size:
+                await asyncio.sleep(idle_sleep)
+
+    async def run(self, stop=None, idle_sleep=0.5):
+        """
+        Dispatches until `stop()` returns True.
+        """
+        async with self.client() as client:
+            await asyncio.gather(*(self._lane(client, stop, idle_sleep) for _ in range(self.lanes)))
@@ -0,0 +1,19 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from apps.integrations.dispatcher import WebhookDispatcher
+
+
+class Command(BaseCommand):
+    help = "Delivers pending webhook deliveries until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lanes', type=int, help="Overrides WEBHOOK_DISPATCH_LANES.")
+        parser.add_argument('--batch-size', type=int, help="Overrides WEBHOOK_BATCH_SIZE.")
+
+    def handle(self, *args, **options):
+        dispatcher = WebhookDispatcher(batch_size=options['batch_size'], lanes=options['lanes'])
+        self.stdout.write("Dispatching webhooks...")
+        try:
+            asyncio.run(dispatcher.run())
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,65 @@
+import secrets
+import uuid
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=500)
+    # Deliveries are signed with HMAC-SHA256 using this secret
+    secret = models.CharField(max_length=64, default=generate_secret, editable=False)
+    # Event types to deliver, e.g. ["ledger.posting"]; empty means all
+    event_types = models.JSONField(default=list, blank=True)
+    # Requests in flight to this endpoint at once, per dispatcher
+    max_concurrency = models.PositiveSmallIntegerField(default=10)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def accepts(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookDelivery(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        DELIVERED = 'DELIVERED', _('Delivered')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.BigAutoField(primary_key=True)
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    # Id of the ledger OutboxEvent, also sent to the endpoint for deduplication
+    event_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Webhook deliveries"
+        unique_together = ('endpoint', 'event_id')
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                name='integrations_delivery_due_idx',
+                condition=models.Q(status='PENDING')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.event_id} -> {self.endpoint} ({self.status})"
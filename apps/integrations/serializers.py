@@ -0,0 +1,43 @@
+import socket
+from django.conf import settings
+from rest_framework import serializers
+from apps.ledger.outbox import EVENT_TYPES
+from .client import HTTPProtocolError, check_url
+from .models import WebhookEndpoint, WebhookDelivery
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['id', 'url', 'secret', 'event_types', 'max_concurrency', 'is_active', 'created_at']
+        read_only_fields = ['secret', 'created_at']
+
+    def validate_url(self, url):
+        # Deliveries are signed POSTs from inside the network: they must not reach internal services
+        try:
+            check_url(url, allow_private=settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES)
+        except socket.gaierror:
+            raise serializers.ValidationError("The URL's host does not resolve.")
+        except (HTTPProtocolError, OSError, ValueError) as e:
+            raise serializers.ValidationError(str(e))
+        return url
+
+    def validate_event_types(self, event_types):
+        if not isinstance(event_types, list):
+            raise serializers.ValidationError("Expected a list of event types.")
+        unknown = sorted(set(event_types) - set(EVENT_TYPES))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown event types: {', '.join(unknown)}.")
+        return event_types
+
+    def validate_max_concurrency(self, value):
+        if not 1 <= value <= 100:
+            raise serializers.ValidationError("Must be between 1 and 100.")
+        return value
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            'id', 'event_id', 'event_type', 'status', 'attempts', 'next_attempt_at',
+            'response_status', 'last_error', 'created_at', 'delivered_at'
+        ]
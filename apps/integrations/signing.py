@@ -0,0 +1,36 @@
+import hashlib
+import hmac
+import json
+import time
+
+# Kept free of Django imports so receivers (and scripts/webhook_stub_server.py) can verify deliveries standalone
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+EVENT_HEADER = 'X-Webhook-Event'
+DELIVERY_HEADER = 'X-Webhook-Id'
+
+
+def encode_body(event_id, event_type, payload):
+    return json.dumps({'id': event_id, 'type': event_type, 'data': payload}, separators=(',', ':')).encode()
+
+
+def sign(secret, timestamp, body):
+    """
+    HMAC-SHA256 over "<timestamp>.<body>"; receivers recompute it with their secret and
+    reject stale timestamps to stop replays.
+
+    :return: header value "t=<timestamp>,v1=<hex digest>"
+    """
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify(secret, header, body, tolerance=300, now=None):
+    try:
+        parts = dict(part.split('=', 1) for part in header.split(','))
+        timestamp = int(parts['t'])
+    except (ValueError, KeyError):
+        return False
+    if abs((time.time() if now is None else now) - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), header)
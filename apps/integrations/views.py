@@ -0,0 +1,23 @@
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .models import WebhookEndpoint
+from .serializers import WebhookEndpointSerializer, WebhookDeliverySerializer
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def deliveries(self, request, pk=None):
+        """
+        The endpoint's 100 most recent deliveries.
+        """
+        deliveries = self.get_object().deliveries.order_by('-id')[:100]
+        return Response(WebhookDeliverySerializer(deliveries, many=True).data)
@@ -0,0 +1,42 @@
+import random
+from datetime import timedelta
+from django.conf import settings
+from .models import WebhookEndpoint, WebhookDelivery
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter: WEBHOOK_BACKOFF_BASE * 2^(attempts - 1), capped at
+    WEBHOOK_BACKOFF_MAX, scaled by a random factor in [0.5, 1) so failed endpoints are
+    not retried in lockstep.
+    """
+    delay = min(settings.WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1), settings.WEBHOOK_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class WebhookDeliverySink:
+    """
+    Outbox sink that queues one WebhookDelivery per subscribed endpoint and event.
+    Runs in the relay's transaction, so deliveries are created exactly when the events
+    are marked published; a republished batch hits the (endpoint, event_id) constraint.
+    """
+
+    def publish(self, messages):
+        user_ids = {message['user_id'] for message in messages if message['user_id'] is not None}
+        endpoints = {}
+        for endpoint in WebhookEndpoint.objects.filter(user_id__in=user_ids, is_active=True):
+            endpoints.setdefault(endpoint.user_id, []).append(endpoint)
+
+        deliveries = [
+            WebhookDelivery(
+                endpoint=endpoint,
+                event_id=message['id'],
+                event_type=message['type'],
+                payload=message['data']
+            )
+            for message in messages
+            for endpoint in endpoints.get(message['user_id'], [])
+            if endpoint.accepts(message['type'])
+        ]
+        WebhookDelivery.objects.bulk_create(deliveries, batch_size=1000, ignore_conflicts=True)
+        return len(messages)
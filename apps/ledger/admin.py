@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LedgerAccount, Transaction, JournalEntry
+from .models import LedgerAccount, Transaction, JournalEntry, FxRate
 
 class JournalEntryInline(admin.TabularInline):
     model = JournalEntry
@@ -22,3 +22,8 @@ class LedgerAccountAdmin(admin.ModelAdmin):
 class JournalEntryAdmin(admin.ModelAdmin):
     list_display = ('transaction', 'account', 'type', 'amount', 'created_at')
     list_filter = ('type', 'created_at')
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    list_display = ('base_currency', 'quote_currency', 'rate', 'effective_at')
+    list_filter = ('base_currency', 'quote_currency')
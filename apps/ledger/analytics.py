@@ -0,0 +1,288 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum, Exists, OuterRef
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from apps.ai_engine.features import normalise_description
+from .models import LedgerAccount, JournalEntry, DailySpend
+from .response_cache import user_version, bump_user_versions_on_commit
+
+# Reports are cached under the user's ledger version (see response_cache), bumped by every posting
+# and category change
+REPORT_KEY = 'ledger:analytics:{}:{}:{}'
+# Shown for transactions the categoriser has not reached yet (category '')
+UNCATEGORISED = 'Uncategorised'
+GROUPINGS = ('category', 'merchant', 'account', 'day', 'month')
+SPEND_ACCOUNT_TYPES = (LedgerAccount.Type.ASSET, LedgerAccount.Type.LIABILITY)
+
+ZERO = Decimal('0.0000')
+
+
+def merchant_key(description):
+    return normalise_description(description)[:100]
+
+
+class SpendingAnalyticsService:
+    """
+    Maintains the DailySpend cube and answers spending reports from it.
+
+    A spend is a credit to one of a user's own asset or liability accounts (money
+    leaving the account), the same legs the risk scorer treats as spends, unless the
+    money goes to another of the user's asset or liability accounts (a transfer to
+    savings, paying the card bill from checking): that is a transfer, not spending.
+    """
+
+    @staticmethod
+    def _spend_legs():
+        """
+        JournalEntry queryset of spends: credits to users' asset and liability accounts
+        whose transaction does not debit another such account of the same user.
+        """
+        own_transfer = JournalEntry.objects.filter(
+            transaction_id=OuterRef('transaction_id'),
+            type=JournalEntry.EntryType.DEBIT,
+            account__user_id=OuterRef('account__user_id'),
+            account__type__in=SPEND_ACCOUNT_TYPES,
+        )
+        return JournalEntry.objects.filter(
+            type=JournalEntry.EntryType.CREDIT,
+            account__user__isnull=False,
+            account__type__in=SPEND_ACCOUNT_TYPES,
+        ).exclude(Exists(own_transfer))
+
+    @staticmethod
+    def _upsert(cells):
+        """
+        Adds {(user_id, day, account_id, category, merchant, currency): [amount, count]} to
+        the cube in one INSERT .. ON CONFLICT statement. Cells are written in key order, so
+        two writers touching the same cells take their row locks in the same order.
+        """
+        cells = {key: value for key, value in cells.items() if value[1] or value[0]}
+        if not cells:
+            return
+        table = DailySpend._meta.db_table
+        columns = ['user_id', 'day', 'account_id', 'category', 'merchant', 'currency', 'amount', 'count']
+        fields = [DailySpend._meta.get_field(column) for column in columns]
+        rows, params = [], []
+        for key, (amount, count) in sorted(cells.items(), key=lambda item: str(item[0])):
+            rows.append(f"({', '.join(['%s'] * len(columns))})")
+            params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, key + (amount, count)))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES {', '.join(rows)} "
+                f"ON CONFLICT (user_id, day, account_id, category, merchant) DO UPDATE SET "
+                f"amount = {table}.amount + EXCLUDED.amount, count = {table}.count + EXCLUDED.count",
+                params
+            )
+
+    @staticmethod
+    def record_postings(entries, accounts):
+        """
+        Adds the spends among `entries` to the cube. Must run inside the posting's atomic
+        block, after the accounts were locked: cube rows belong to one account each, so
+        the account lock already serialises every posting that writes them. The posting
+        bumps the users' versions, which retires their cached reports.
+
+        :param entries: JournalEntry instances, with their transaction set
+        :param accounts: dict {account_id: locked LedgerAccount}
+        """
+        own = [
+            (entry, accounts[entry.account_id]) for entry in entries
+            if accounts[entry.account_id].user_id is not None and accounts[entry.account_id].type in SPEND_ACCOUNT_TYPES
+        ]
+        transfers = {
+            (entry.transaction_id, account.user_id) for entry, account in own
+            if entry.type == JournalEntry.EntryType.DEBIT
+        }
+        cells = defaultdict(lambda: [ZERO, 0])
+        for entry, account in own:
+            if entry.type != JournalEntry.EntryType.CREDIT or (entry.transaction_id, account.user_id) in transfers:
+                continue
+            txn = entry.transaction
+            cell = cells[(
+                account.user_id, timezone.localdate(txn.created_at), account.id,
+                txn.category, merchant_key(txn.description), account.currency
+            )]
+            cell[0] += entry.amount
+            cell[1] += 1
+
+        SpendingAnalyticsService._upsert(cells)
+
+    @staticmethod
+    def recategorise(transaction_ids, old_category, new_category):
+        """
+        Moves the spends of the given transactions from one category to another.
+        Call it in the same atomic block as the UPDATE of Transaction.category: it also
+        bumps the versions of every user owning one of their accounts, spends or not,
+        whose cached transaction lists show the category.
+        """
+        if old_category == new_category or not transaction_ids:
+            return
+        cells = defaultdict(lambda: [ZERO, 0])
+        for account_id, user_id, currency, amount, description, created_at in SpendingAnalyticsService._spend_legs().filter(
+            transaction_id__in=transaction_ids
+        ).values_list(
+            'account_id', 'account__user_id', 'account__currency', 'amount',
+            'transaction__description', 'transaction__created_at'
+        ):
+            day, merchant = timezone.localdate(created_at), merchant_key(description)
+            moved_out = cells[(user_id, day, account_id, old_category, merchant, currency)]
+            moved_out[0] -= amount
+            moved_out[1] -= 1
+            moved_in = cells[(user_id, day, account_id, new_category, merchant, currency)]
+            moved_in[0] += amount
+            moved_in[1] += 1
+
+        SpendingAnalyticsService._upsert(cells)
+        bump_user_versions_on_commit(set(
+            JournalEntry.objects.filter(transaction_id__in=transaction_ids, account__user__isnull=False)
+            .values_list('account__user_id', flat=True)
+        ))
+
+    @staticmethod
+    def rebuild(user_ids):
+        """
+        Recomputes the cube rows of the given users from their journal entries, e.g. to
+        backfill postings made before the cube existed. The users' accounts are locked
+        in primary key order, like a posting, so no spend lands between the read and the write.
+
+        :return: number of cube rows written
+        """
+        with transaction.atomic():
+            list(LedgerAccount.objects.select_for_update().filter(user_id__in=user_ids).order_by('id').values_list('id'))
+            DailySpend.objects.filter(user_id__in=user_ids).delete()
+
+            cells = defaultdict(lambda: [ZERO, 0])
+            for account_id, user_id, currency, amount, description, category, created_at in SpendingAnalyticsService._spend_legs().filter(
+                account__user_id__in=user_ids
+            ).values_list(
+                'account_id', 'account__user_id', 'account__currency', 'amount',
+                'transaction__description', 'transaction__category', 'transaction__created_at'
+            ).iterator(chunk_size=10000):
+                cell = cells[(user_id, timezone.localdate(created_at), account_id, category, merchant_key(description), currency)]
+                cell[0] += amount
+                cell[1] += 1
+
+            keys = sorted(cells, key=str)
+            for i in range(0, len(keys), 1000):
+                SpendingAnalyticsService._upsert({key: cells[key] for key in keys[i:i + 1000]})
+            bump_user_versions_on_commit(user_ids)
+            return len(cells)
+
+    @staticmethod
+    def _label(category):
+        return category or UNCATEGORISED
+
+    @staticmethod
+    def spending(user, start, end, group_by='category', limit=None):
+        """
+        Spending between `start` and `end` (inclusive) per currency, broken down by
+        category, merchant, account, day or month.
+        Reads only the user's day rows in the period, and is cached per (user, period,
+        grouping) until the user's next posting or category change.
+
+        :return: dict {'start', 'end', 'group_by', 'totals': [...], 'breakdown': [...]}
+        """
+        if group_by not in GROUPINGS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}.")
+        key = REPORT_KEY.format(user.id, user_version(user.id), f"{start.isoformat()}:{end.isoformat()}:{group_by}:{limit}")
+        report = cache.get(key)
+        if report is not None:
+            return report
+
+        cells = DailySpend.objects.filter(user=user, day__gte=start, day__lte=end)
+        if group_by == 'month':
+            cells = cells.annotate(month=TruncMonth('day'))
+        rows = cells.values(group_by if group_by != 'account' else 'account_id', 'currency').annotate(
+            total=Sum('amount'), transactions=Sum('count')
+        ).order_by()
+
+        breakdown = defaultdict(lambda: [ZERO, 0])
+        totals = defaultdict(lambda: [ZERO, 0])
+        for row in rows:
+            if not row['transactions']:
+                continue
+            value = row[group_by if group_by != 'account' else 'account_id']
+            if group_by == 'category':
+                value = SpendingAnalyticsService._label(value)
+            elif group_by in ('day', 'month'):
+                value = value.isoformat() if group_by == 'day' else value.strftime('%Y-%m')
+            else:
+                value = str(value)
+            for bucket in (breakdown[(value, row['currency'])], totals[row['currency']]):
+                bucket[0] += row['total']
+                bucket[1] += row['transactions']
+
+        if group_by in ('day', 'month'):
+            ordered = sorted(breakdown.items())
+        else:
+            ordered = sorted(breakdown.items(), key=lambda item: (item[0][1], -item[1][0], item[0][0]))
+        if limit:
+            ordered = ordered[:limit]
+
+        names = {}
+        if group_by == 'account':
+            names = {str(account_id): name for account_id, name in LedgerAccount.objects.filter(
+                id__in={value for (value, _), _ in ordered}
+            ).values_list('id', 'name')}
+
+        report = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'group_by': group_by,
+            'totals': [
+                {'currency': currency, 'amount': str(amount.quantize(ZERO)), 'count': count}
+                for currency, (amount, count) in sorted(totals.items())
+            ],
+            'breakdown': [
+                dict({'key': value, 'currency': currency, 'amount': str(amount.quantize(ZERO)), 'count': count},
+                     **({'name': names.get(value, '')} if group_by == 'account' else {}))
+                for (value, currency), (amount, count) in ordered
+            ],
+        }
+        cache.set(key, report, settings.ANALYTICS_CACHE_TTL)
+        return report
+
+    @staticmethod
+    def monthly_totals(user, months=12, currency=None):
+        """
+        Spending per month for the last `months` calendar months including this one,
+        in one currency (default: the currency of the user's default account).
+
+        :return: (currency, [(first day of month, amount), ...] oldest first, zero months included)
+        """
+        today = timezone.localdate()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        start = date(month_index // 12, month_index % 12 + 1, 1)
+        if currency is None:
+            currency = LedgerAccount.objects.filter(
+                user=user, type=LedgerAccount.Type.ASSET
+            ).order_by('created_at').values_list('currency', flat=True).first() or 'USD'
+
+        report = SpendingAnalyticsService.spending(user, start, today, group_by='month')
+        spent = {row['key']: Decimal(row['amount']) for row in report['breakdown'] if row['currency'] == currency}
+        series = []
+        for i in range(months):
+            month = date((month_index + i) // 12, (month_index + i) % 12 + 1, 1)
+            series.append((month, spent.get(month.strftime('%Y-%m'), ZERO)))
+        return currency, series
+
+    @staticmethod
+    def parse_period(start, end, default_days=30):
+        """
+        Period from ISO date strings; `end` defaults to today, `start` to `default_days` before `end`.
+
+        :raises ValueError: on malformed dates, start after end, or a period over ANALYTICS_MAX_PERIOD_DAYS
+        """
+        end = date.fromisoformat(end) if end else timezone.localdate()
+        start = date.fromisoformat(start) if start else end - timedelta(days=default_days - 1)
+        if start > end:
+            raise ValueError("start must not be after end.")
+        if (end - start).days >= settings.ANALYTICS_MAX_PERIOD_DAYS:
+            raise ValueError(f"Periods are limited to {settings.ANALYTICS_MAX_PERIOD_DAYS} days.")
+        return start, end
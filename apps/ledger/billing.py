@@ -0,0 +1,163 @@
+import calendar
+import logging
+import zlib
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from .models import LedgerAccount, Transaction, JournalEntry, Subscription
+from .money import to_minor_units
+from .outbox import OutboxService, SUBSCRIPTION_CHARGED_EVENT
+from .services import LedgerService
+from .response_cache import bump_user_versions_on_commit
+
+logger = logging.getLogger(__name__)
+
+BILLING_CYCLE_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'yearly': 12,
+    'annually': 12,
+}
+
+
+def add_months(day, months):
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def advance_billing_date(current, billing_cycle):
+    cycle = (billing_cycle or '').strip().lower()
+    if cycle == 'weekly':
+        return current + timedelta(weeks=1)
+    return add_months(current, BILLING_CYCLE_MONTHS.get(cycle, 1))
+
+
+class BillingService:
+    @staticmethod
+    def cycle_reference(subscription):
+        """
+        One reference per subscription per cycle: re-running a cycle finds it already posted.
+        """
+        return f"SUB-{subscription.id}-{subscription.next_billing_date.isoformat()}"
+
+    @staticmethod
+    def iter_due_chunks(run_date, chunk_size=500):
+        """
+        Yields lists of due subscription ids, walking the (is_active, next_billing_date)
+        index with keyset pagination so no chunk costs more than `chunk_size` rows.
+        """
+        due = Subscription.objects.filter(
+            is_active=True, next_billing_date__lte=run_date
+        ).order_by('next_billing_date', 'id')
+
+        last = None
+        while True:
+            page = due
+            if last is not None:
+                page = page.filter(
+                    Q(next_billing_date__gt=last[0]) | Q(next_billing_date=last[0], id__gt=last[1])
+                )
+            rows = list(page.values_list('next_billing_date', 'id')[:chunk_size])
+            if not rows:
+                return
+            yield [subscription_id for _, subscription_id in rows]
+            last = rows[-1]
+
+    @staticmethod
+    def _clearing_account(currency, shard_key):
+        # Charges are spread over a few clearing accounts so parallel chunks don't queue on one hot row
+        shards = getattr(settings, 'SUBSCRIPTION_CLEARING_SHARDS', 8)
+        shard = zlib.crc32(str(shard_key).encode()) % shards
+        return LedgerService.get_system_account(
+            f'Subscription Billing #{shard}', LedgerAccount.Type.EXPENSE, currency
+        )
+
+    @staticmethod
+    def bill_chunk(subscription_ids, run_date):
+        """
+        Charges one cycle for each subscription in `subscription_ids` that is still due on `run_date`.
+
+        Subscriptions are locked with SKIP LOCKED so overlapping runs never bill the same row twice.
+        Charges whose cycle reference already exists (e.g. a run that crashed after posting) are not
+        posted again; every charged or already-charged subscription has its next_billing_date advanced
+        in a single bulk update. A subscription whose amount the ledger would refuse is logged and left
+        due, so it cannot fail the batch for the rest of the chunk.
+
+        :return: number of charges posted
+        """
+        with transaction.atomic():
+            subscriptions = list(
+                Subscription.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(id__in=subscription_ids, is_active=True, next_billing_date__lte=run_date)
+                .select_related('account')
+            )
+            if not subscriptions:
+                return 0
+
+            # Default accounts for subscriptions without one, in one query (oldest asset account wins)
+            default_accounts = {}
+            user_ids = {sub.user_id for sub in subscriptions if sub.account_id is None}
+            for account in LedgerAccount.objects.filter(
+                user_id__in=user_ids, type=LedgerAccount.Type.ASSET
+            ).order_by('-created_at'):
+                default_accounts[account.user_id] = account
+
+            references = {sub.id: BillingService.cycle_reference(sub) for sub in subscriptions}
+            already_posted = set(
+                Transaction.objects.filter(reference__in=references.values()).values_list('reference', flat=True)
+            )
+
+            charges = []
+            charged = []
+            advanced = []
+            for sub in subscriptions:
+                account = sub.account or default_accounts.get(sub.user_id)
+                if account is None:
+                    logger.warning(f"Subscription {sub.id} has no account to charge; skipping.")
+                    continue
+
+                try:
+                    valid = to_minor_units(sub.amount, account.currency) > 0
+                except ValidationError:
+                    valid = False
+                if not valid:
+                    logger.warning(f"Subscription {sub.id} amount {sub.amount} cannot be charged in {account.currency}; skipping.")
+                    continue
+
+                reference = references[sub.id]
+                if reference not in already_posted:
+                    clearing = BillingService._clearing_account(account.currency, subscription_ids[0])
+                    charges.append({
+                        'description': f"{sub.service_name} ({sub.billing_cycle})",
+                        'reference': reference,
+                        'entries': [
+                            {'account_id': clearing.id, 'amount': sub.amount, 'type': JournalEntry.EntryType.DEBIT},
+                            {'account_id': account.id, 'amount': sub.amount, 'type': JournalEntry.EntryType.CREDIT},
+                        ]
+                    })
+                    charged.append((sub, account, reference))
+
+                sub.next_billing_date = advance_billing_date(sub.next_billing_date, sub.billing_cycle)
+                advanced.append(sub)
+
+            if charges:
+                txns = LedgerService.create_transactions_batch(charges)
+                OutboxService.record_events([
+                    (SUBSCRIPTION_CHARGED_EVENT, account.id, sub.user_id, {
+                        'subscription_id': str(sub.id),
+                        'service_name': sub.service_name,
+                        'amount': str(sub.amount),
+                        'currency': account.currency,
+                        'reference': reference,
+                        'transaction_id': str(txn.id),
+                        'next_billing_date': sub.next_billing_date.isoformat(),
+                    })
+                    for (sub, account, reference), txn in zip(charged, txns)
+                ])
+            Subscription.objects.bulk_update(advanced, ['next_billing_date'])
+            bump_user_versions_on_commit({sub.user_id for sub in advanced})
+
+            return len(charges)
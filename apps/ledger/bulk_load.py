@@ -0,0 +1,97 @@
+import csv
+import io
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from .models import LedgerAccount
+
+# Columns written for each row; rows are tuples in this order
+TRANSACTION_COLUMNS = ('id', 'reference', 'description', 'created_at', 'posted', 'category', 'category_confidence')
+ENTRY_COLUMNS = ('id', 'transaction', 'account', 'amount', 'type', 'created_at')
+
+
+def _table(model, fields):
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+    return quote(model._meta.db_table), columns
+
+
+class CopyWriter:
+    """
+    PostgreSQL: rows are written as CSV into an in-memory buffer and streamed with
+    COPY FROM STDIN, without building an INSERT statement or a model instance per row.
+    """
+
+    def write(self, model, fields, rows):
+        table, columns = _table(model, fields)
+        # In CSV an empty unquoted value is NULL; for NOT NULL text columns it means ''
+        quote = connection.ops.quote_name
+        texts = [
+            quote(field.column) for field in (model._meta.get_field(name) for name in fields)
+            if not field.null and field.get_internal_type() in ('CharField', 'TextField')
+        ]
+        options = f", FORCE_NOT_NULL ({', '.join(texts)})" if texts else ''
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv{options})", buffer)
+
+    def add_to_balances(self, deltas):
+        """
+        Adds {account_id: Decimal} to the accounts' balances in one set-based UPDATE. The
+        rows are locked in primary key order first, like a posting locks them, so this
+        cannot deadlock with concurrent postings.
+        """
+        if not deltas:
+            return
+        table = connection.ops.quote_name(LedgerAccount._meta.db_table)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(deltas.items())
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS ledger_balance_delta (account_id uuid, delta numeric) ON COMMIT DELETE ROWS")
+            cursor.execute("TRUNCATE ledger_balance_delta")
+            cursor.copy_expert("COPY ledger_balance_delta (account_id, delta) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"SELECT account.id FROM {table} AS account JOIN ledger_balance_delta AS d ON account.id = d.account_id "
+                f"ORDER BY account.id FOR UPDATE OF account"
+            )
+            cursor.execute(
+                f"UPDATE {table} AS account SET balance = account.balance + d.delta, "
+                f"version = account.version + 1, last_posted_at = %s "
+                f"FROM ledger_balance_delta AS d WHERE account.id = d.account_id",
+                [timezone.now()]
+            )
+
+
+class InsertWriter:
+    """
+    Other databases (SQLite in development): the same rows through executemany.
+    """
+
+    def write(self, model, fields, rows):
+        table, columns = _table(model, fields)
+        prepare = [model._meta.get_field(field).get_db_prep_save for field in fields]
+        values = [
+            [prep(value, connection) for prep, value in zip(prepare, row)]
+            for row in rows
+        ]
+        placeholders = ', '.join(['%s'] * len(fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values)
+
+    def add_to_balances(self, deltas):
+        now = timezone.now()
+        for account_id in sorted(deltas):
+            LedgerAccount.objects.filter(id=account_id).update(
+                balance=F('balance') + deltas[account_id], version=F('version') + 1, last_posted_at=now
+            )
+
+
+def get_writer():
+    """
+    The bulk writer for the default database: COPY on PostgreSQL, inserts elsewhere.
+    Call its methods inside an atomic block.
+    """
+    return CopyWriter() if connection.vendor == 'postgresql' else InsertWriter()
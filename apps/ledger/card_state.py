@@ -0,0 +1,303 @@
+import json
+import threading
+from core.redis_client import get_redis
+from .velocity import SPEND_WINDOWS, RingCounter
+
+# Result codes shared by both stores (and returned by the Lua script)
+AUTHORIZED = 1
+STATE_MISSING = -1
+CARD_FROZEN = -2
+LIMIT_EXCEEDED = -3
+INSUFFICIENT_FUNDS = -4
+# WINDOW_EXCEEDED - i: spend window SPEND_WINDOWS[i] would go over its limit
+WINDOW_EXCEEDED = -10
+
+# Hot state is rebuilt from Postgres at least this often
+STATE_TTL = 3600
+
+CARD_KEY = 'ledger:card:{}'
+ACCOUNT_KEY = 'ledger:account:{}:available'
+WINDOW_KEY = 'ledger:card:{}:window:{}'
+
+# Lua port of RingCounter._advance: rolls a window hash forward to `now_bucket`,
+# clearing the buckets that fell out, and returns the running total.
+_ADVANCE_WINDOW = """
+local function advance(key, now_bucket, size)
+    local epoch = tonumber(redis.call('HGET', key, 'epoch') or now_bucket)
+    local total = tonumber(redis.call('HGET', key, 'total') or '0')
+    if now_bucket > epoch then
+        for step = 1, math.min(now_bucket - epoch, size) do
+            local slot = tostring((epoch + step) % size)
+            total = total - tonumber(redis.call('HGET', key, slot) or '0')
+            redis.call('HDEL', key, slot)
+        end
+    end
+    redis.call('HSET', key, 'epoch', math.max(now_bucket, epoch), 'total', total)
+    return total
+end
+"""
+
+# Check-and-decrement in a single atomic step. All amounts are integer minor units.
+# KEYS: card, account, one key per spend window
+# ARGV: amount, now, then (bucket_seconds, size, limit or -1) per spend window
+AUTHORIZE_SCRIPT = _ADVANCE_WINDOW + """
+local card = KEYS[1]
+local account = KEYS[2]
+local amount = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+if redis.call('EXISTS', card) == 0 or redis.call('EXISTS', account) == 0 then
+    return -1
+end
+if redis.call('HGET', card, 'frozen') == '1' then
+    return -2
+end
+if tonumber(redis.call('HGET', card, 'limit_remaining')) < amount then
+    return -3
+end
+if tonumber(redis.call('GET', account)) < amount then
+    return -4
+end
+local windows = {}
+for i = 3, #KEYS do
+    local arg = 3 + (i - 3) * 3
+    local bucket_seconds = tonumber(ARGV[arg])
+    local size = tonumber(ARGV[arg + 1])
+    local limit = tonumber(ARGV[arg + 2])
+    local now_bucket = math.floor(now / bucket_seconds)
+    local total = advance(KEYS[i], now_bucket, size)
+    if limit >= 0 and total + amount > limit then
+        return -10 - (i - 3)
+    end
+    windows[#windows + 1] = {KEYS[i], tostring(now_bucket % size), bucket_seconds * size}
+end
+for _, window in ipairs(windows) do
+    redis.call('HINCRBY', window[1], window[2], amount)
+    redis.call('HINCRBY', window[1], 'total', amount)
+    redis.call('EXPIRE', window[1], window[3])
+end
+redis.call('HINCRBY', card, 'limit_remaining', -amount)
+redis.call('DECRBY', account, amount)
+return 1
+"""
+
+# Only seeds keys that are missing, so a racing authorization is never overwritten.
+# Spend windows are rebuilt together with the card hash (ARGV[5] is a JSON list of
+# [epoch, total, {slot: amount}] per window key).
+SEED_SCRIPT = """
+local ttl = tonumber(ARGV[4])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'frozen', ARGV[1], 'limit_remaining', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    local windows = cjson.decode(ARGV[5])
+    for i = 3, #KEYS do
+        local window = windows[i - 2]
+        redis.call('DEL', KEYS[i])
+        redis.call('HSET', KEYS[i], 'epoch', window[1], 'total', window[2])
+        for slot, amount in pairs(window[3]) do
+            redis.call('HSET', KEYS[i], slot, amount)
+        end
+        redis.call('EXPIRE', KEYS[i], tonumber(window[4]))
+    end
+end
+redis.call('SET', KEYS[2], ARGV[3], 'NX', 'EX', ttl)
+return 1
+"""
+
+# KEYS as AUTHORIZE_SCRIPT; ARGV: amount, now, then (bucket_seconds, size) per spend window
+RELEASE_SCRIPT = """
+local amount = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'limit_remaining', amount)
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('INCRBY', KEYS[2], amount)
+end
+for i = 3, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        local arg = 3 + (i - 3) * 2
+        local size = tonumber(ARGV[arg + 1])
+        local slot = tostring(math.floor(now / tonumber(ARGV[arg])) % size)
+        if tonumber(redis.call('HGET', KEYS[i], slot) or '0') >= amount then
+            redis.call('HINCRBY', KEYS[i], slot, -amount)
+            redis.call('HINCRBY', KEYS[i], 'total', -amount)
+        end
+    end
+end
+return 1
+"""
+
+
+# Adds a spend made outside card authorization (a transfer or payout from the card's account)
+# to the spend windows. Only applied while the card's state is loaded; a rebuild reads it from Postgres.
+# KEYS: card, one key per spend window
+# ARGV: amount, now, then (bucket_seconds, size) per spend window
+SPEND_SCRIPT = _ADVANCE_WINDOW + """
+local amount = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #KEYS do
+    local arg = 3 + (i - 2) * 2
+    local bucket_seconds = tonumber(ARGV[arg])
+    local size = tonumber(ARGV[arg + 1])
+    local bucket = math.floor(now / bucket_seconds)
+    advance(KEYS[i], bucket, size)
+    if bucket > tonumber(redis.call('HGET', KEYS[i], 'epoch')) - size then
+        redis.call('HINCRBY', KEYS[i], tostring(bucket % size), amount)
+        redis.call('HINCRBY', KEYS[i], 'total', amount)
+    end
+    redis.call('EXPIRE', KEYS[i], bucket_seconds * size)
+end
+return 1
+"""
+
+
+class RedisCardStateStore:
+    """
+    Card and account spend state kept in Redis, so authorizations never take
+    Postgres row locks. Each authorization, spend windows included, is one
+    EVALSHA round-trip.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._authorize = client.register_script(AUTHORIZE_SCRIPT)
+        self._seed = client.register_script(SEED_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._spend = client.register_script(SPEND_SCRIPT)
+
+    @staticmethod
+    def _keys(card_id, account_id):
+        return [CARD_KEY.format(card_id), ACCOUNT_KEY.format(account_id)] + [
+            WINDOW_KEY.format(card_id, window.name) for window in SPEND_WINDOWS
+        ]
+
+    def authorize(self, card_id, account_id, amount, window_limits, now):
+        args = [amount, int(now)]
+        for window, limit in zip(SPEND_WINDOWS, window_limits):
+            args += [window.bucket_seconds, window.size, -1 if limit is None else limit]
+        return int(self._authorize(keys=self._keys(card_id, account_id), args=args))
+
+    def seed(self, card_id, account_id, frozen, limit_remaining, available, windows):
+        encoded = []
+        for counter in windows:
+            epoch, total, slots = counter.snapshot()
+            encoded.append([epoch, total, {str(slot): amount for slot, amount in slots.items()}, counter.window.seconds])
+        self._seed(
+            keys=self._keys(card_id, account_id),
+            args=[int(frozen), limit_remaining, available, STATE_TTL, json.dumps(encoded)]
+        )
+
+    def release(self, card_id, account_id, amount, now):
+        args = [amount, int(now)]
+        for window in SPEND_WINDOWS:
+            args += [window.bucket_seconds, window.size]
+        self._release(keys=self._keys(card_id, account_id), args=args)
+
+    def record_spend(self, card_id, amount, now):
+        args = [amount, int(now)]
+        for window in SPEND_WINDOWS:
+            args += [window.bucket_seconds, window.size]
+        keys = [CARD_KEY.format(card_id)] + [WINDOW_KEY.format(card_id, window.name) for window in SPEND_WINDOWS]
+        self._spend(keys=keys, args=args)
+
+    def invalidate_card(self, card_id):
+        self.client.delete(CARD_KEY.format(card_id))
+
+    def invalidate_accounts(self, account_ids):
+        if account_ids:
+            self.client.delete(*[ACCOUNT_KEY.format(account_id) for account_id in account_ids])
+
+
+class LocalCardStateStore:
+    """
+    In-process equivalent of RedisCardStateStore for development and tests.
+    Only consistent within a single process.
+    """
+
+    def __init__(self):
+        self._cards = {}
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def authorize(self, card_id, account_id, amount, window_limits, now):
+        with self._lock:
+            card = self._cards.get(card_id)
+            if card is None or account_id not in self._accounts:
+                return STATE_MISSING
+            if card['frozen']:
+                return CARD_FROZEN
+            if card['limit_remaining'] < amount:
+                return LIMIT_EXCEEDED
+            if self._accounts[account_id] < amount:
+                return INSUFFICIENT_FUNDS
+            for i, (counter, limit) in enumerate(zip(card['windows'], window_limits)):
+                if limit is not None and counter.total_at(now) + amount > limit:
+                    return WINDOW_EXCEEDED - i
+            for counter in card['windows']:
+                counter.add(now, amount)
+            card['limit_remaining'] -= amount
+            self._accounts[account_id] -= amount
+            return AUTHORIZED
+
+    def seed(self, card_id, account_id, frozen, limit_remaining, available, windows):
+        with self._lock:
+            self._cards.setdefault(card_id, {
+                'frozen': bool(frozen),
+                'limit_remaining': limit_remaining,
+                'windows': list(windows),
+            })
+            self._accounts.setdefault(account_id, available)
+
+    def release(self, card_id, account_id, amount, now):
+        with self._lock:
+            card = self._cards.get(card_id)
+            if card is not None:
+                card['limit_remaining'] += amount
+                for counter in card['windows']:
+                    counter.add(now, -amount)
+            if account_id in self._accounts:
+                self._accounts[account_id] += amount
+
+    def record_spend(self, card_id, amount, now):
+        with self._lock:
+            card = self._cards.get(card_id)
+            if card is not None:
+                for counter in card['windows']:
+                    counter.add(now, amount)
+
+    def invalidate_card(self, card_id):
+        with self._lock:
+            self._cards.pop(card_id, None)
+
+    def invalidate_accounts(self, account_ids):
+        with self._lock:
+            for account_id in account_ids:
+                self._accounts.pop(account_id, None)
+
+
+_store = None
+
+
+def get_card_state_store():
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisCardStateStore(client) if client is not None else LocalCardStateStore()
+    return _store
+
+
+def build_spend_windows(spends, now):
+    """
+    Builds one RingCounter per spend window from (timestamp, minor amount) pairs,
+    rolled forward to `now`.
+    """
+    counters = [RingCounter(window) for window in SPEND_WINDOWS]
+    for timestamp, amount in sorted(spends):
+        for counter in counters:
+            counter.add(timestamp, amount)
+    for counter in counters:
+        counter.total_at(now)
+    return counters
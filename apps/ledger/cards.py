@@ -0,0 +1,203 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, F, Exists, OuterRef
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from apps.ai_engine.features import normalise_description
+from apps.ai_engine.risk import RiskService, RiskSignal
+from .models import Card, CardHold, LedgerAccount, JournalEntry
+from .money import to_minor_units
+from .outbox import OutboxService, CARD_AUTHORIZED_EVENT
+from .services import LedgerService
+from .velocity import SPEND_WINDOWS
+from . import card_state
+
+logger = logging.getLogger(__name__)
+
+# System account statement imports (apps.transactions) book against: imported rows are history, not spends
+STATEMENT_IMPORT_ACCOUNT = 'Statement Import'
+
+class CardAuthorizationService:
+    DECLINES = {
+        card_state.CARD_FROZEN: ('card_frozen', "Card is frozen."),
+        card_state.LIMIT_EXCEEDED: ('limit_exceeded', "Card spending limit exceeded."),
+        card_state.INSUFFICIENT_FUNDS: ('insufficient_funds', "Insufficient funds in the linked account."),
+        # The card's state could not be loaded into the store (e.g. evicted again at once): nothing
+        # was decided, so the client may simply retry
+        card_state.STATE_MISSING: ('try_again', "Card could not be checked right now; please retry."),
+    }
+
+    @staticmethod
+    def window_limits(card):
+        """
+        Rolling-window limits in minor units, aligned with SPEND_WINDOWS (None = unlimited).
+        """
+        limits = []
+        for window in SPEND_WINDOWS:
+            limit = getattr(card, f'{window.name}_limit')
+            limits.append(None if limit is None else to_minor_units(limit))
+        return limits
+
+    @staticmethod
+    def decline(result):
+        if result <= card_state.WINDOW_EXCEEDED:
+            window = SPEND_WINDOWS[card_state.WINDOW_EXCEEDED - result]
+            return f'{window.name}_limit_exceeded', f"Card {window.name} spending limit exceeded."
+        return CardAuthorizationService.DECLINES[result]
+
+    @staticmethod
+    def authorize(card, amount, merchant=''):
+        """
+        Authorizes a card spend and places a hold for it.
+
+        Frozen status, remaining spending limit, the daily/weekly/monthly spend
+        windows and the linked account's available balance (balance minus pending
+        holds) are checked and decremented atomically in the card state store in a
+        single round-trip; Postgres only sees the hold insert.
+
+        :raises ValidationError: with a decline code if the spend is refused
+        :return: CardHold instance
+        """
+        amount = Decimal(str(amount))
+        if amount <= 0:
+            raise ValidationError("Authorization amount must be positive.", code='invalid_amount')
+        minor = to_minor_units(amount)
+
+        risk_signals = [RiskSignal(str(card.account_id), float(amount), f"merchant:{normalise_description(merchant)}")]
+        RiskService.check(risk_signals)
+
+        limits = CardAuthorizationService.window_limits(card)
+        now = timezone.now().timestamp()
+
+        store = card_state.get_card_state_store()
+        result = store.authorize(card.id, card.account_id, minor, limits, now)
+        if result == card_state.STATE_MISSING:
+            CardAuthorizationService.load_state(card, store)
+            result = store.authorize(card.id, card.account_id, minor, limits, now)
+
+        if result != card_state.AUTHORIZED:
+            code, message = CardAuthorizationService.decline(result)
+            raise ValidationError(message, code=code)
+
+        try:
+            with transaction.atomic():
+                hold = CardHold.objects.create(card=card, amount=amount, merchant=merchant)
+                OutboxService.record_events([(CARD_AUTHORIZED_EVENT, card.account_id, card.user_id, {
+                    'hold_id': str(hold.id),
+                    'card_id': str(card.id),
+                    'last_4': card.last_4,
+                    'amount': str(amount),
+                    'merchant': merchant,
+                    'authorized_at': hold.created_at.isoformat(),
+                })])
+                RiskService.observe_on_commit(risk_signals)
+            return hold
+        except Exception:
+            store.release(card.id, card.account_id, minor, now)
+            raise
+
+    @staticmethod
+    def load_state(card, store=None):
+        """
+        Seeds the state store for a card and its account from Postgres (no row locks).
+        Spend windows are rebuilt from the card's pending and settled holds plus the
+        other money that left the card's account (transfers, payouts), as posted;
+        imported statement rows are history and left out.
+        """
+        store = store or card_state.get_card_state_store()
+        pending = CardHold.objects.filter(status=CardHold.Status.PENDING)
+        now = timezone.now()
+
+        horizon = now - timedelta(seconds=max(window.seconds for window in SPEND_WINDOWS))
+        spends = CardHold.objects.filter(card_id=card.id, created_at__gte=horizon).exclude(
+            status=CardHold.Status.RELEASED
+        ).values_list('created_at', 'amount')
+        # Settlement postings are left out: their holds are already counted above
+        imported = JournalEntry.objects.filter(
+            transaction_id=OuterRef('transaction_id'), account__user__isnull=True, account__name=STATEMENT_IMPORT_ACCOUNT
+        )
+        credits = JournalEntry.objects.filter(
+            account_id=card.account_id, type=JournalEntry.EntryType.CREDIT, created_at__gte=horizon,
+            account__user__isnull=False, account__type=LedgerAccount.Type.ASSET,
+        ).exclude(transaction__card_holds__isnull=False).exclude(Exists(imported)).values_list('created_at', 'amount')
+        windows = card_state.build_spend_windows(
+            [(created_at.timestamp(), to_minor_units(amount)) for created_at, amount in [*spends, *credits]],
+            now.timestamp()
+        )
+
+        card_pending = pending.filter(card_id=card.id).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        account_pending = pending.filter(card__account_id=card.account_id).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        balance = LedgerAccount.objects.values_list('balance', flat=True).get(id=card.account_id)
+        is_frozen, spending_limit, card_balance = Card.objects.values_list(
+            'is_frozen', 'spending_limit', 'balance'
+        ).get(id=card.id)
+
+        store.seed(
+            card.id,
+            card.account_id,
+            frozen=is_frozen,
+            limit_remaining=to_minor_units(spending_limit - card_balance - card_pending),
+            available=to_minor_units(balance - account_pending),
+            windows=windows
+        )
+
+    @staticmethod
+    def settle_pending_holds(batch_size=500):
+        """
+        Settles up to `batch_size` pending holds into the ledger.
+        Holds are grouped per card so each card gets a single posting
+        (credit the card's account, debit the 'Card Spend' clearing account).
+        Concurrent settlement runs skip each other's holds. Each card is settled in
+        its own savepoint: a card whose posting fails keeps its holds pending for the
+        next run without holding back the other cards.
+
+        :return: number of holds settled
+        """
+        with transaction.atomic():
+            holds = list(
+                CardHold.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(status=CardHold.Status.PENDING)
+                .select_related('card', 'card__account')
+                .order_by('created_at')[:batch_size]
+            )
+            if not holds:
+                return 0
+
+            by_card = defaultdict(list)
+            for hold in holds:
+                by_card[hold.card].append(hold)
+
+            now = timezone.now()
+            settled = 0
+            for card, card_holds in by_card.items():
+                total = sum((hold.amount for hold in card_holds), Decimal('0'))
+                try:
+                    with transaction.atomic():
+                        clearing = LedgerService.get_system_account(
+                            'Card Spend', LedgerAccount.Type.EXPENSE, card.account.currency
+                        )
+                        txn = LedgerService.create_transaction(
+                            user=card.user,
+                            description=f"Card settlement {card.name} ****{card.last_4} ({len(card_holds)} holds)",
+                            entries_data=[
+                                {'account_id': clearing.id, 'amount': total, 'type': JournalEntry.EntryType.DEBIT},
+                                {'account_id': card.account_id, 'amount': total, 'type': JournalEntry.EntryType.CREDIT},
+                            ],
+                            reference=f"CARD-SETTLE-{uuid.uuid4()}",
+                            # each spend was scored, and counted toward the spend windows, when it was authorized
+                            score_risk=False, record_card_spend=False
+                        )
+                        CardHold.objects.filter(id__in=[hold.id for hold in card_holds]).update(
+                            status=CardHold.Status.SETTLED, transaction=txn, settled_at=now
+                        )
+                        Card.objects.filter(id=card.id).update(balance=F('balance') + total)
+                except Exception:
+                    logger.exception(f"Settling {len(card_holds)} holds of card {card.id} failed; retrying next run")
+                    continue
+                settled += len(card_holds)
+
+            return settled
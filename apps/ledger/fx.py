@@ -0,0 +1,97 @@
+import time
+import threading
+from bisect import bisect_right
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+
+class FxRateCache:
+    """
+    In-memory, time-indexed FX rate table.
+
+    Each currency pair is loaded once into two parallel lists sorted by
+    `effective_at` (timestamps, rates). A lookup is a bisect on the timestamps,
+    so converting an amount never touches the database once the pair is warm.
+    Series are reloaded after `FX_RATE_CACHE_TTL` seconds so rates written by
+    other processes are picked up.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._series = {}  # (base, quote) -> (loaded_at, [timestamps], [rates])
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'FX_RATE_CACHE_TTL', 300)
+
+    def _load(self, base, quote):
+        from .models import FxRate
+
+        rows = FxRate.objects.filter(
+            base_currency=base, quote_currency=quote
+        ).order_by('effective_at').values_list('effective_at', 'rate')
+
+        timestamps = [effective_at for effective_at, _ in rows]
+        rates = [rate for _, rate in rows]
+        series = (time.monotonic(), timestamps, rates)
+        with self._lock:
+            self._series[(base, quote)] = series
+        return series
+
+    def _get_series(self, base, quote):
+        series = self._series.get((base, quote))
+        if series is None or time.monotonic() - series[0] > self.ttl:
+            series = self._load(base, quote)
+        return series
+
+    def _lookup(self, base, quote, at):
+        _, timestamps, rates = self._get_series(base, quote)
+        idx = bisect_right(timestamps, at) - 1
+        if idx < 0:
+            return None
+        return rates[idx]
+
+    def get_rate(self, base, quote, at=None):
+        """
+        Returns the rate converting one unit of `base` into `quote` at time `at`
+        (defaults to now). Falls back to the inverse pair if only that is stored.
+        """
+        if base == quote:
+            return Decimal('1')
+        at = at or timezone.now()
+
+        rate = self._lookup(base, quote, at)
+        if rate is not None:
+            return rate
+
+        inverse = self._lookup(quote, base, at)
+        if inverse:
+            return Decimal('1') / inverse
+
+        raise ValidationError(f"No FX rate available for {base}/{quote} at {at.isoformat()}.")
+
+    def get_rates(self, currencies, quote, at=None):
+        """
+        Returns {currency: rate into `quote`} for every currency in `currencies`.
+        """
+        at = at or timezone.now()
+        return {currency: self.get_rate(currency, quote, at) for currency in set(currencies)}
+
+    def convert(self, amount, base, quote, at=None):
+        return amount * self.get_rate(base, quote, at)
+
+    def invalidate(self, base=None, quote=None):
+        with self._lock:
+            if base is None:
+                self._series.clear()
+                return
+            self._series.pop((base, quote), None)
+            self._series.pop((quote, base), None)
+
+
+fx_rates = FxRateCache()
@@ -0,0 +1,135 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import FinancialGoal, LedgerAccount
+
+# account id -> ids of the goals tracking it ([] is cached too, so accounts without goals cost one cache hit)
+INDEX_KEY = 'ledger:goals:account:{}'
+INDEX_TTL = 24 * 3600
+
+class GoalService:
+    @staticmethod
+    def goals_for_accounts(account_ids):
+        """
+        Reverse index lookup: returns {account_id: [goal_id, ...]} using one cache
+        round-trip, falling back to a single query for the accounts not cached yet.
+        """
+        keys = {INDEX_KEY.format(account_id): account_id for account_id in account_ids}
+        if not keys:
+            return {}
+        cached = cache.get_many(keys)
+        index = {keys[key]: goal_ids for key, goal_ids in cached.items()}
+
+        missing = [account_id for key, account_id in keys.items() if key not in cached]
+        if missing:
+            loaded = {account_id: [] for account_id in missing}
+            links = FinancialGoal.accounts.through.objects.filter(
+                ledgeraccount_id__in=missing
+            ).values_list('ledgeraccount_id', 'financialgoal_id')
+            for account_id, goal_id in links:
+                loaded[account_id].append(goal_id)
+            cache.set_many({INDEX_KEY.format(account_id): goal_ids for account_id, goal_ids in loaded.items()}, INDEX_TTL)
+            index.update(loaded)
+        return index
+
+    @staticmethod
+    def invalidate_index(account_ids):
+        cache.delete_many([INDEX_KEY.format(account_id) for account_id in account_ids])
+
+    @staticmethod
+    def apply_balance_deltas(deltas, at=None):
+        """
+        Moves every goal tracking one of the accounts in `deltas` ({account_id: balance change})
+        by the same amount and folds the change into its contribution rate.
+        Must run inside the posting's atomic block.
+        """
+        index = GoalService.goals_for_accounts([account_id for account_id, delta in deltas.items() if delta])
+
+        goal_deltas = defaultdict(Decimal)
+        for account_id, goal_ids in index.items():
+            for goal_id in goal_ids:
+                goal_deltas[goal_id] += deltas[account_id]
+        goal_deltas = {goal_id: delta for goal_id, delta in goal_deltas.items() if delta}
+        if not goal_deltas:
+            return
+
+        at = at or timezone.now()
+        goals = list(FinancialGoal.objects.select_for_update().filter(id__in=goal_deltas).order_by('id'))
+        for goal in goals:
+            delta = goal_deltas[goal.id]
+            goal.current_amount += delta
+            goal.contribution_sum = (GoalService._decayed_sum(goal, at) + delta).quantize(Decimal('0.0001'))
+            goal.contribution_updated_at = at
+        FinancialGoal.objects.bulk_update(goals, ['current_amount', 'contribution_sum', 'contribution_updated_at'])
+
+    @staticmethod
+    def set_accounts(goal, accounts):
+        """
+        Links exactly `accounts` to the goal. current_amount moves by the balances of the
+        accounts added or removed, so it never has to be recomputed from entries.
+        """
+        with transaction.atomic():
+            current = {account.id: account for account in goal.accounts.all()}
+            wanted = {account.id: account for account in accounts}
+            added = [account for account_id, account in wanted.items() if account_id not in current]
+            removed = [account for account_id, account in current.items() if account_id not in wanted]
+            if not added and not removed:
+                return goal
+
+            # Locked in primary key order, as postings lock them: a posting to one of these accounts either
+            # lands before the balances are read or waits for the new links (and a fresh index)
+            changed = [account.id for account in added + removed]
+            balances = dict(LedgerAccount.objects.select_for_update().filter(
+                id__in=changed
+            ).order_by('id').values_list('id', 'balance'))
+
+            goal = FinancialGoal.objects.select_for_update().get(id=goal.id)
+            goal.current_amount += sum((balances[account.id] for account in added), Decimal('0'))
+            goal.current_amount -= sum((balances[account.id] for account in removed), Decimal('0'))
+            goal.save(update_fields=['current_amount'])
+            goal.accounts.set(list(wanted))
+
+            # Dropped now, so no index cached before this change outlives it, and again after the commit,
+            # in case a reader re-cached the old links in between
+            GoalService.invalidate_index(changed)
+            transaction.on_commit(lambda: GoalService.invalidate_index(changed))
+            return goal
+
+    @staticmethod
+    def _window_days():
+        return getattr(settings, 'GOAL_CONTRIBUTION_WINDOW_DAYS', 30)
+
+    @staticmethod
+    def _decayed_sum(goal, at):
+        if goal.contribution_updated_at is None:
+            return Decimal('0')
+        days = max((at - goal.contribution_updated_at).total_seconds(), 0) / 86400
+        return goal.contribution_sum * Decimal(math.exp(-days / GoalService._window_days()))
+
+    @staticmethod
+    def contribution_rate(goal, at=None):
+        """
+        Rolling contribution rate per day: the exponentially decayed contribution sum divided by
+        the averaging window. Needs only the two cached fields on the goal, no entry scan.
+        """
+        rate = GoalService._decayed_sum(goal, at or timezone.now()) / GoalService._window_days()
+        return rate.quantize(Decimal('0.0001'))
+
+    @staticmethod
+    def projected_completion_date(goal, at=None):
+        at = at or timezone.now()
+        remaining = goal.target_amount - goal.current_amount
+        if remaining <= 0:
+            return timezone.localdate(at)
+        rate = GoalService.contribution_rate(goal, at)
+        if rate <= 0:
+            return None
+        days = math.ceil(remaining / rate)
+        if days > 365 * 100:
+            return None
+        return timezone.localdate(at) + timedelta(days=days)
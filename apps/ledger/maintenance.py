@@ -0,0 +1,187 @@
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from django.utils import timezone
+from apps.integrations.models import WebhookDelivery
+from .models import LedgerAccount, JournalEntry, IdempotencyKey, CardHold, AccountDailyRollup, OutboxEvent
+from .services import LedgerService
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.0000')
+
+
+def signed_total(account_type, debits, credits):
+    """
+    Net effect of debits/credits on a balance, with the sign convention of LedgerService._apply_to_balance.
+    """
+    if account_type in (LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE):
+        return debits - credits
+    return credits - debits
+
+
+class LedgerMaintenanceService:
+    """
+    Background upkeep for the ledger: integrity checks, balance rebuilds, daily rollups
+    and archival. Every method works on an explicit chunk of account ids so the Celery
+    tasks can fan the work out over the whole ledger.
+    """
+
+    @staticmethod
+    def _entry_totals(account_ids, **filters):
+        """
+        :return: dict {account_id: (debits, credits, entry count)} from one grouped query
+        """
+        rows = JournalEntry.objects.filter(account_id__in=account_ids, **filters).values('account_id').annotate(
+            debits=Sum('amount', filter=Q(type=JournalEntry.EntryType.DEBIT)),
+            credits=Sum('amount', filter=Q(type=JournalEntry.EntryType.CREDIT)),
+            entry_count=Count('id'),
+        ).order_by()
+        return {
+            row['account_id']: (row['debits'] or ZERO, row['credits'] or ZERO, row['entry_count'])
+            for row in rows
+        }
+
+    @staticmethod
+    def check_balances(account_ids):
+        """
+        Compares each stored balance with the sum of the account's journal entries.
+        Read-only and lock-free; a posting that lands mid-check can show up as a
+        transient mismatch, which rebuild_balances re-verifies under lock.
+
+        :return: list of (account_id, stored balance, balance from entries)
+        """
+        totals = LedgerMaintenanceService._entry_totals(account_ids)
+        mismatches = []
+        for account_id, account_type, balance in LedgerAccount.objects.filter(
+            id__in=account_ids
+        ).values_list('id', 'type', 'balance'):
+            debits, credits, _ = totals.get(account_id, (ZERO, ZERO, 0))
+            expected = signed_total(account_type, debits, credits)
+            if balance != expected:
+                mismatches.append((account_id, balance, expected))
+        return mismatches
+
+    @staticmethod
+    def rebuild_balances(account_ids):
+        """
+        Recomputes balances from journal entries. The accounts are locked in primary key
+        order, like a posting, so no entry can land between the sum and the update.
+
+        :return: number of balances corrected
+        """
+        with transaction.atomic():
+            accounts = list(
+                LedgerAccount.objects.select_for_update().filter(id__in=account_ids).order_by('id')
+            )
+            totals = LedgerMaintenanceService._entry_totals([account.id for account in accounts])
+
+            corrected = []
+            balance_deltas = {}
+            for account in accounts:
+                debits, credits, _ = totals.get(account.id, (ZERO, ZERO, 0))
+                expected = signed_total(account.type, debits, credits)
+                if account.balance != expected:
+                    logger.warning(f"Rebuilding balance of account {account.id}: {account.balance} -> {expected}")
+                    balance_deltas[account.id] = expected - account.balance
+                    account.balance = expected
+                    corrected.append(account)
+
+            if corrected:
+                for account in corrected:
+                    account.version += 1
+                LedgerAccount.objects.bulk_update(corrected, ['balance', 'version'])
+                LedgerService._after_balances_changed(balance_deltas, accounts=corrected)
+            return len(corrected)
+
+    @staticmethod
+    def day_bounds(day):
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def rollup_day(account_ids, day):
+        """
+        Writes (or rewrites) the AccountDailyRollup row for `day` of each account. The closing
+        balance is the current balance less everything posted after the day ended, so only
+        entries from `day` onwards are read. The accounts are locked in primary key order,
+        like a posting, so the balances and the entries are read from the same state.
+
+        :return: number of rollup rows written
+        """
+        start, end = LedgerMaintenanceService.day_bounds(day)
+        with transaction.atomic():
+            accounts = list(
+                LedgerAccount.objects.select_for_update().filter(id__in=account_ids).order_by('id')
+                .values_list('id', 'type', 'balance')
+            )
+            during = LedgerMaintenanceService._entry_totals(account_ids, created_at__gte=start, created_at__lt=end)
+            after = LedgerMaintenanceService._entry_totals(account_ids, created_at__gte=end)
+
+            rollups = []
+            for account_id, account_type, balance in accounts:
+                debits, credits, entry_count = during.get(account_id, (ZERO, ZERO, 0))
+                later_debits, later_credits, _ = after.get(account_id, (ZERO, ZERO, 0))
+                rollups.append(AccountDailyRollup(
+                    account_id=account_id,
+                    day=day,
+                    debits=debits,
+                    credits=credits,
+                    entry_count=entry_count,
+                    closing_balance=balance - signed_total(account_type, later_debits, later_credits),
+                ))
+
+            AccountDailyRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=['account', 'day'],
+                update_fields=['debits', 'credits', 'entry_count', 'closing_balance', 'updated_at'],
+            )
+            return len(rollups)
+
+    @staticmethod
+    def active_account_ids(day):
+        """
+        Accounts with at least one entry on `day`, in primary key order.
+        """
+        start, end = LedgerMaintenanceService.day_bounds(day)
+        return list(
+            JournalEntry.objects.filter(created_at__gte=start, created_at__lt=end)
+            .values_list('account_id', flat=True).distinct().order_by('account_id')
+        )
+
+    @staticmethod
+    def archive(before, batch_size=5000):
+        """
+        Deletes records that are only kept for a while: idempotency keys, card holds
+        that were settled (the posting is the record) or released, outbox events
+        published before `before`, and the webhook deliveries fanned out from them
+        once delivered or given up on.
+        Works in batches so no single delete holds locks for long.
+
+        :return: dict {record kind: rows deleted}
+        """
+        querysets = {
+            'idempotency_keys': IdempotencyKey.objects.filter(created_at__lt=before),
+            'card_holds': CardHold.objects.filter(
+                created_at__lt=before,
+                status__in=[CardHold.Status.SETTLED, CardHold.Status.RELEASED]
+            ),
+            'outbox_events': OutboxEvent.objects.filter(published_at__lt=before),
+            'webhook_deliveries': WebhookDelivery.objects.filter(
+                Q(status=WebhookDelivery.Status.DELIVERED, delivered_at__lt=before)
+                | Q(status=WebhookDelivery.Status.FAILED, created_at__lt=before)
+            ),
+        }
+        deleted = {}
+        for kind, queryset in querysets.items():
+            deleted[kind] = 0
+            while True:
+                ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                count, _ = queryset.model.objects.filter(pk__in=ids).delete()
+                deleted[kind] += count
+        return deleted
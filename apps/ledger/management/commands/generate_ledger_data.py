@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.ledger.synthetic import SyntheticLedgerGenerator
+from apps.ledger.analytics import SpendingAnalyticsService
+
+
+class Command(BaseCommand):
+    help = "Writes a synthetic ledger (Zipfian activity, daily cycles, merchant mix) for load tests and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=500_000, help="Transactions to write (two entries each).")
+        parser.add_argument('--users', type=int, help="Users to create (default: one per 100 transactions, at least 10).")
+        parser.add_argument('--days', type=int, default=365, help="Days of history, ending today.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--zipf', type=float, default=1.1, help="Skew of user and merchant activity.")
+        parser.add_argument('--prefix', default='synthetic', help="Prefix of the generated users, accounts and references.")
+        parser.add_argument('--chunk-size', type=int, default=50_000, help="Transactions per COPY and commit.")
+        parser.add_argument('--replace', action='store_true', help="First delete what an earlier run with this prefix wrote.")
+        parser.add_argument('--rebuild-cube', action='store_true', help="Then rebuild the spending analytics of the new users.")
+
+    def handle(self, *args, **options):
+        if options['replace']:
+            SyntheticLedgerGenerator.clear(options['prefix'])
+        try:
+            generator = SyntheticLedgerGenerator(
+                options['transactions'], users=options['users'], days=options['days'], seed=options['seed'],
+                prefix=options['prefix'], zipf=options['zipf'], chunk_size=options['chunk_size'],
+                progress=lambda message: self.stdout.write(f"  {message}"),
+            )
+            stats = generator.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        rate = stats['entries'] / stats['seconds'] * 60
+        self.stdout.write(
+            f"Wrote {stats['transactions']:,} transactions ({stats['entries']:,} entries) for {stats['users']:,} users "
+            f"in {stats['seconds']:.1f}s, {rate:,.0f} entries/minute."
+        )
+        if options['rebuild_cube']:
+            rows = SpendingAnalyticsService.rebuild(generator.user_ids)
+            self.stdout.write(f"Rebuilt {rows} spending cube rows.")
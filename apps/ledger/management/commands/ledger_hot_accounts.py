@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.ledger.models import LedgerAccount
+from apps.ledger.tracing import get_ring_buffer, hot_accounts, phase_totals
+
+
+class Command(BaseCommand):
+    help = "Reports the accounts whose row locks postings waited on most, from the recent posting spans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help="Accounts to list.")
+        parser.add_argument('--since', type=int, default=0, help="Only spans from the last N seconds (0 = all buffered).")
+
+    def handle(self, *args, **options):
+        buffer = get_ring_buffer()
+        if buffer is None:
+            raise CommandError("LEDGER_TRACE_EXPORTERS has no 'ring' exporter; no spans are kept to report on.")
+        spans = buffer.recent()
+        if options['since']:
+            cutoff = time.time() - options['since']
+            spans = [span for span in spans if span['started_at'] >= cutoff]
+        if not spans:
+            self.stdout.write("No posting spans recorded.")
+            return
+
+        total = sum(span['duration'] for span in spans)
+        self.stdout.write(f"{len(spans)} postings, {total * 1000:.1f}ms in total")
+        for phase, seconds in sorted(phase_totals(spans).items(), key=lambda item: item[1], reverse=True):
+            self.stdout.write(f"  {phase:<16} {seconds * 1000:10.1f}ms  {seconds / total:6.1%}")
+
+        report = hot_accounts(spans, options['top'])
+        names = {
+            str(account_id): name
+            for account_id, name in LedgerAccount.objects.filter(id__in=[entry['account_id'] for entry in report]).values_list('id', 'name')
+        }
+        self.stdout.write("")
+        self.stdout.write(f"{'account':<38} {'name':<24} {'postings':>8} {'lock wait':>11} {'p95':>9} {'max':>9} {'errors':>6}")
+        for entry in report:
+            name = names.get(entry['account_id'], '?')
+            self.stdout.write(
+                f"{entry['account_id']:<38} {name[:24]:<24} {entry['postings']:>8} "
+                f"{entry['lock_wait'] * 1000:>9.1f}ms {entry['p95_lock_wait'] * 1000:>7.1f}ms "
+                f"{entry['max_lock_wait'] * 1000:>7.1f}ms {entry['errors']:>6}"
+            )
+
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from apps.ledger.analytics import SpendingAnalyticsService
+
+
+class Command(BaseCommand):
+    help = "Recomputes the spending cube (DailySpend) from journal entries, e.g. to backfill existing postings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only this user id (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Users rebuilt per database transaction.")
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or list(get_user_model().objects.order_by('id').values_list('id', flat=True))
+        rows = 0
+        for i in range(0, len(user_ids), options['chunk_size']):
+            rows += SpendingAnalyticsService.rebuild(user_ids[i:i + options['chunk_size']])
+        self.stdout.write(f"Rebuilt {rows} cube rows for {len(user_ids)} users.")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.ledger.outbox import OutboxService, OutboxRelay, get_sink
+
+
+class Command(BaseCommand):
+    help = "Publishes pending ledger outbox events to the configured sink until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', help="Overrides OUTBOX_SINK (comma-separated sink names or dotted paths).")
+        parser.add_argument('--batch-size', type=int, help="Overrides OUTBOX_BATCH_SIZE.")
+        parser.add_argument('--max-partitions', type=int, help="Partitions served per pass (default: all).")
+        parser.add_argument('--once', action='store_true', help="Relay a single batch and exit.")
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(sink=get_sink(options['sink']), batch_size=options['batch_size'], max_partitions=options['max_partitions'])
+
+        if options['once']:
+            OutboxService.ensure_partitions()
+            self.stdout.write(f"Published {relay.relay_batch()} events.")
+            return
+
+        self.stdout.write("Relaying outbox events...")
+        try:
+            relay.run()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,421 @@
+import uuid
+from array import array
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from .money import to_minor_units, from_minor_units, currency_scale
+
+ASSET, LIABILITY, EQUITY, INCOME, EXPENSE = 'ASSET', 'LIABILITY', 'EQUITY', 'INCOME', 'EXPENSE'
+DEBIT, CREDIT = 'DEBIT', 'CREDIT'
+ACCOUNT_TYPES = (ASSET, LIABILITY, EQUITY, INCOME, EXPENSE)
+
+
+class MemoryAccount:
+    __slots__ = ('index', 'id', 'name', 'type', 'currency', 'user_id', 'increases_on_debit', 'scale')
+
+    def __init__(self, index, id, name, type, currency, user_id, scale):
+        self.index = index
+        self.id = id
+        self.name = name
+        self.type = type
+        self.currency = currency
+        self.user_id = user_id
+        self.increases_on_debit = type in (ASSET, EXPENSE)
+        self.scale = scale
+
+
+class MemoryEntry:
+    __slots__ = ('account', 'amount', 'type')
+
+    def __init__(self, account, amount, type):
+        self.account = account
+        self.amount = amount
+        self.type = type
+
+
+class MemoryTransaction:
+    __slots__ = ('index', 'reference', 'description', 'created_at', 'posted', 'entries')
+
+    def __init__(self, index, reference, description, created_at, entries):
+        self.index = index
+        self.reference = reference
+        self.description = description
+        self.created_at = created_at
+        self.posted = True
+        self.entries = entries
+
+
+class InMemoryLedger:
+    """
+    The LedgerService posting interface over process memory, for what-if analysis
+    and replaying traffic without a database.
+
+    Posting rules and validation errors are those of LedgerService (checked against
+    it by scripts/test_ledger_conformance.py). Amounts are integer minor units of the
+    account's currency (apps.ledger.money) in `array('q')` columns and accounts are referred to internally by index:
+
+    - per account: total debits, total credits and opening balance; the balance is
+      derived from them, so a posting adds to two counters and never branches on
+      the account type;
+    - per entry (the journal, optional): transaction, account, amount and side.
+
+    Transactions are applied all-or-nothing. Only the ledger itself is simulated:
+    risk checks, the outbox, goals, analytics and caches are not.
+    """
+
+    def __init__(self, fx_rates=None, fx_tolerance=None, journal=True):
+        """
+        :param fx_rates: object with get_rates(currencies, quote, at) (e.g. apps.ledger.fx.fx_rates),
+                         needed only for cross-currency transactions
+        :param fx_tolerance: as FX_RATE_TOLERANCE (allowed on top of one minor unit per currency); read from settings when None
+        :param journal: keep the entries, not only the per-account totals
+        """
+        self.fx_rates = fx_rates
+        self.fx_tolerance = fx_tolerance
+        self.journal = journal
+        self.accounts = []
+        self._index = {}  # account id -> index
+        self._system = {}  # (name, currency) -> index of a user-less account
+        self._currencies = {}  # currency -> small int, for the replay currency check
+        # currency -> decimal places, fixed when the first account in it opens, so stored minor units keep their meaning
+        self._scales = {}
+        self._currency_ids = array('q')
+        self._debits = array('q')
+        self._credits = array('q')
+        self._opening = array('q')
+        self.entry_txn = array('q')
+        self.entry_account = array('q')
+        self.entry_amount = array('q')
+        self.entry_debit = array('b')
+        self.txn_first_entry = array('q')
+        self._txn_info = {}  # txn index -> (reference, description, created_at), for transactions posted one by one
+        self._references = {}  # reference -> txn index
+        self.transactions = 0
+
+    # --- Accounts ---
+
+    def open_account(self, name, account_type, currency='USD', user_id=None, balance=0, id=None):
+        """
+        :return: the new MemoryAccount; entries may refer to it by id or by index
+        """
+        if account_type not in ACCOUNT_TYPES:
+            raise ValidationError(f"Unknown account type {account_type}.")
+        scale = self._scales.setdefault(currency, currency_scale(currency))
+        account = MemoryAccount(len(self.accounts), id or uuid.uuid4(), name, account_type, currency, user_id, scale)
+        self.accounts.append(account)
+        self._index[account.id] = account.index
+        self._currency_ids.append(self._currencies.setdefault(currency, len(self._currencies)))
+        self._debits.append(0)
+        self._credits.append(0)
+        self._opening.append(to_minor_units(balance, scale=account.scale))
+        return account
+
+    @classmethod
+    def from_accounts(cls, accounts, **kwargs):
+        """
+        A ledger whose accounts are a snapshot of LedgerAccount rows (a queryset or
+        instances), opened at their current balances and keeping their ids.
+        """
+        ledger = cls(**kwargs)
+        for account in accounts:
+            opened = ledger.open_account(account.name, account.type, account.currency, account.user_id, account.balance, account.id)
+            if account.user_id is None:
+                ledger._system[(account.name, account.currency)] = opened.index
+        return ledger
+
+    def get_system_account(self, name, account_type, currency='USD'):
+        index = self._system.get((name, currency))
+        if index is None:
+            index = self._system[(name, currency)] = self.open_account(name, account_type, currency).index
+        return self.accounts[index]
+
+    def _resolve(self, account_id):
+        if type(account_id) is int:
+            if 0 <= account_id < len(self.accounts):
+                return account_id
+            raise ValidationError(f"Account {account_id} does not exist.")
+        index = self._index.get(account_id)
+        if index is None:
+            try:
+                index = self._index.get(uuid.UUID(str(account_id)))
+            except ValueError:
+                index = None
+            if index is None:
+                raise ValidationError(f"Account {account_id} does not exist.")
+        return index
+
+    def get_balance(self, account_id):
+        index = self._resolve(account_id)
+        return from_minor_units(self._balance(index), scale=self.accounts[index].scale)
+
+    def _amount(self, minor, currency):
+        return from_minor_units(minor, scale=self._scales[currency])
+
+    def _balance(self, index):
+        net = self._debits[index] - self._credits[index]
+        return self._opening[index] + (net if self.accounts[index].increases_on_debit else -net)
+
+    # --- Posting ---
+
+    def create_transaction(self, user, description, entries_data, reference=None, score_risk=True):
+        """
+        As LedgerService.create_transaction (`user` and `score_risk` are accepted for
+        compatibility; risk is not simulated).
+
+        :return: MemoryTransaction
+        """
+        if reference is not None and reference in self._references:
+            raise IntegrityError(f"Duplicate transaction reference {reference}.")
+        created_at = datetime.now(dt_timezone.utc)
+        legs = self._legs(entries_data)
+
+        # Per-currency [debits, credits]; cross-currency transactions are balanced through FX position accounts
+        totals = {}
+        for index, minor, is_debit in legs:
+            currency_totals = totals.setdefault(self.accounts[index].currency, [0, 0])
+            currency_totals[0 if is_debit else 1] += minor
+        if len(totals) > 1:
+            legs += self._fx_legs(totals, created_at)
+        for currency, (debits, credits) in totals.items():
+            if debits != credits:
+                raise ValidationError(
+                    f"Transaction unbalance ({currency}): "
+                    f"Debits {self._amount(debits, currency)} != Credits {self._amount(credits, currency)}"
+                )
+
+        txn_index = self._append(legs)
+        reference = reference or str(uuid.uuid4())
+        self._references[reference] = txn_index
+        self._txn_info[txn_index] = (reference, description, created_at)
+        return self._transaction(txn_index, legs)
+
+    def create_transactions_batch(self, transactions_data):
+        """
+        As LedgerService.create_transactions_batch: single-currency transactions, all
+        rejected if any is invalid.
+
+        :return: list of MemoryTransaction, in input order
+        """
+        created_at = datetime.now(dt_timezone.utc)
+        references = set()
+        validated = []
+        for data in transactions_data:
+            reference = data.get('reference') or str(uuid.uuid4())
+            if reference in self._references or reference in references:
+                raise IntegrityError(f"Duplicate transaction reference {reference}.")
+            references.add(reference)
+            legs = self._legs(data['entries'])
+            currencies = {self.accounts[index].currency for index, _, _ in legs}
+            if len(currencies) > 1:
+                raise ValidationError(f"Batched transaction {reference} spans several currencies; post it with create_transaction.")
+            debits = sum(minor for _, minor, is_debit in legs if is_debit)
+            credits = sum(minor for _, minor, is_debit in legs if not is_debit)
+            if debits != credits:
+                currency = currencies.pop()
+                raise ValidationError(
+                    f"Transaction {reference} unbalance ({currency}): "
+                    f"Debits {self._amount(debits, currency)} != Credits {self._amount(credits, currency)}"
+                )
+            validated.append((reference, data.get('description', ''), data.get('created_at') or created_at, legs))
+
+        txns = []
+        for reference, description, txn_created_at, legs in validated:
+            txn_index = self._append(legs)
+            self._references[reference] = txn_index
+            self._txn_info[txn_index] = (reference, description, txn_created_at)
+            txns.append(self._transaction(txn_index, legs))
+        return txns
+
+    def replay(self, debit_accounts, credit_accounts, amounts):
+        """
+        Posts transfers given as columns: transfer i moves amounts[i] minor units from
+        account index credit_accounts[i] to debit_accounts[i]. All are validated
+        (existing accounts, positive amounts, one currency per transfer) before any is
+        applied. This is the replay fast path: one loop of two additions per transfer,
+        the journal extended by slicing.
+
+        :param debit_accounts: array('q') of account indexes (other sequences are copied into one)
+        :param credit_accounts: array('q') of account indexes
+        :param amounts: array('q') of minor units
+        :return: number of transfers posted
+        """
+        debit_accounts, credit_accounts, amounts = (
+            column if isinstance(column, array) and column.typecode == 'q' else array('q', column)
+            for column in (debit_accounts, credit_accounts, amounts)
+        )
+        count = len(amounts)
+        if not count:
+            return 0
+        if len(debit_accounts) != count or len(credit_accounts) != count:
+            raise ValueError("replay() needs columns of equal length.")
+        if min(amounts) <= 0:
+            raise ValidationError("Amounts must be positive.")
+        for column in (debit_accounts, credit_accounts):
+            if min(column) < 0 or max(column) >= len(self.accounts):
+                raise ValidationError(f"Account {min(column) if min(column) < 0 else max(column)} does not exist.")
+        if len(self._currencies) > 1:
+            currency_ids = self._currency_ids
+            for debit, credit in zip(debit_accounts, credit_accounts):
+                if currency_ids[debit] != currency_ids[credit]:
+                    raise ValidationError(
+                        f"Transfer between {self.accounts[debit].currency} and {self.accounts[credit].currency} accounts; "
+                        f"post it with create_transaction."
+                    )
+
+        debits, credits = self._debits, self._credits
+        for debit, credit, amount in zip(debit_accounts, credit_accounts, amounts):
+            debits[debit] += amount
+            credits[credit] += amount
+
+        if self.journal:
+            first_txn, first_entry = self.transactions, len(self.entry_amount)
+            interleaved = array('q', bytes(16 * count))
+            interleaved[0::2] = interleaved[1::2] = array('q', range(first_txn, first_txn + count))
+            self.entry_txn.extend(interleaved)
+            interleaved[0::2], interleaved[1::2] = debit_accounts, credit_accounts
+            self.entry_account.extend(interleaved)
+            interleaved[0::2] = interleaved[1::2] = amounts
+            self.entry_amount.extend(interleaved)
+            self.entry_debit.extend(array('b', b'\x01\x00' * count))
+            self.txn_first_entry.extend(range(first_entry, first_entry + 2 * count, 2))
+        self.transactions += count
+        return count
+
+    def _legs(self, entries_data):
+        """
+        Validates entries into (account index, minor units, is debit) legs.
+        """
+        if len(entries_data) < 2:
+            raise ValidationError("A transaction needs at least two entries.")
+        legs = []
+        for entry in entries_data:
+            index = self._resolve(entry['account_id'])
+            minor = to_minor_units(entry['amount'], scale=self.accounts[index].scale)
+            if minor <= 0:
+                raise ValidationError(f"Amount for account {self.accounts[index].name} must be positive.")
+            entry_type = entry['type']
+            if entry_type not in (DEBIT, CREDIT):
+                raise ValidationError(f"Unknown entry type {entry_type}.")
+            legs.append((index, minor, entry_type == DEBIT))
+        return legs
+
+    def _fx_legs(self, totals, at):
+        """
+        One leg per currency against its 'FX Position' account, after checking the legs
+        offset at `fx_rates` within one minor unit per currency plus the tolerance, as
+        LedgerService._post_fx_legs does.
+        Updates `totals` in place.
+        """
+        if self.fx_rates is None:
+            raise ValidationError("Cross-currency transactions need FX rates; pass fx_rates to the ledger.")
+        pivot = next(iter(totals))
+        rates = self.fx_rates.get_rates(totals.keys(), pivot, at)
+        residual = gross = rounding = Decimal('0')
+        for currency, (debits, credits) in totals.items():
+            residual += self._amount(debits - credits, currency) * rates[currency]
+            gross += self._amount(debits, currency) * rates[currency]
+            rounding += self._amount(1, currency) * rates[currency]
+        tolerance = self.fx_tolerance
+        if tolerance is None:
+            from django.conf import settings
+            tolerance = getattr(settings, 'FX_RATE_TOLERANCE', '0')
+        if abs(residual) > rounding + gross * Decimal(str(tolerance)):
+            raise ValidationError(
+                f"Transaction legs do not offset at the current FX rates (residual {residual:.4f} {pivot})."
+            )
+
+        # Every currency's position account is resolved, not only those with a net amount, as
+        # LedgerService resolves and locks them all together with the posting's accounts
+        positions = {currency: self.get_system_account(f'FX Position {currency}', EQUITY, currency).index for currency in totals}
+        legs = []
+        for currency, currency_totals in totals.items():
+            net = currency_totals[0] - currency_totals[1]
+            if net == 0:
+                continue
+            position = positions[currency]
+            if net > 0:
+                legs.append((position, net, False))
+                currency_totals[1] += net
+            else:
+                legs.append((position, -net, True))
+                currency_totals[0] -= net
+        return legs
+
+    def _append(self, legs):
+        txn_index = self.transactions
+        self.transactions += 1
+        debits, credits = self._debits, self._credits
+        if self.journal:
+            self.txn_first_entry.append(len(self.entry_amount))
+        for index, minor, is_debit in legs:
+            if is_debit:
+                debits[index] += minor
+            else:
+                credits[index] += minor
+            if self.journal:
+                self.entry_txn.append(txn_index)
+                self.entry_account.append(index)
+                self.entry_amount.append(minor)
+                self.entry_debit.append(is_debit)
+        return txn_index
+
+    def _transaction(self, txn_index, legs):
+        reference, description, created_at = self._txn_info[txn_index]
+        entries = [
+            MemoryEntry(self.accounts[index], from_minor_units(minor, scale=self.accounts[index].scale), DEBIT if is_debit else CREDIT)
+            for index, minor, is_debit in legs
+        ]
+        return MemoryTransaction(txn_index, reference, description, created_at, entries)
+
+    # --- Reporting ---
+
+    def get_trial_balance(self, user_id, currency=None):
+        """
+        As LedgerService.get_trial_balance, with 'accounts' a list of dicts
+        {id, name, type, currency, total_debits, total_credits, net_balance}.
+        """
+        accounts = []
+        by_currency = {}
+        for account in self.accounts:
+            if account.user_id != user_id:
+                continue
+            index = account.index
+            debits, credits = self._debits[index], self._credits[index]
+            accounts.append({
+                'id': account.id,
+                'name': account.name,
+                'type': account.type,
+                'currency': account.currency,
+                'total_debits': from_minor_units(debits, scale=account.scale),
+                'total_credits': from_minor_units(credits, scale=account.scale),
+                'net_balance': from_minor_units(debits - credits if account.increases_on_debit else credits - debits, scale=account.scale),
+            })
+            row = by_currency.setdefault(account.currency, [0, 0])
+            row[0] += debits
+            row[1] += credits
+
+        rows = [
+            {'currency': code, 'debits': self._amount(debits, code), 'credits': self._amount(credits, code), 'is_balanced': debits == credits}
+            for code, (debits, credits) in sorted(by_currency.items())
+        ]
+        if currency:
+            rates = self.fx_rates.get_rates([row['currency'] for row in rows], currency)
+            for row in accounts:
+                rate = rates[row['currency']]
+                row['converted_debits'] = row['total_debits'] * rate
+                row['converted_credits'] = row['total_credits'] * rate
+                row['converted_balance'] = row['net_balance'] * rate
+            total_debits = sum((row['debits'] * rates[row['currency']] for row in rows), Decimal('0'))
+            total_credits = sum((row['credits'] * rates[row['currency']] for row in rows), Decimal('0'))
+        else:
+            total_debits = sum((row['debits'] for row in rows), Decimal('0'))
+            total_credits = sum((row['credits'] for row in rows), Decimal('0'))
+        return {
+            'is_balanced': all(row['is_balanced'] for row in rows),
+            'currencies': rows,
+            'currency': currency,
+            'total_debits': total_debits,
+            'total_credits': total_credits,
+            'accounts': accounts,
+        }
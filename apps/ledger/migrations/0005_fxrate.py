@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:58
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0004_card_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('base_currency', models.CharField(max_length=3)),
+                ('quote_currency', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20)),
+                ('effective_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['base_currency', 'quote_currency', 'effective_at'], name='ledger_fxra_base_cu_e9195b_idx')],
+                'unique_together': {('base_currency', 'quote_currency', 'effective_at')},
+            },
+        ),
+    ]
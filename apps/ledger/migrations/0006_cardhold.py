@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0005_fxrate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardHold',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('merchant', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SETTLED', 'Settled'), ('RELEASED', 'Released')], default='PENDING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('settled_at', models.DateTimeField(blank=True, null=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='ledger.card')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='card_holds', to='ledger.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='ledger_card_status_938170_idx'), models.Index(fields=['card', 'status'], name='ledger_card_card_id_e468e7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:04
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0008_subscription_billing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialgoal',
+            name='accounts',
+            field=models.ManyToManyField(blank=True, related_name='goals', to='ledger.ledgeraccount'),
+        ),
+        migrations.AddField(
+            model_name='financialgoal',
+            name='contribution_sum',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='financialgoal',
+            name='contribution_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0010_contact_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('debits', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=20)),
+                ('credits', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=20)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('closing_balance', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='idempotencykey',
+            index=models.Index(fields=['created_at'], name='ledger_idem_created_2ff487_idx'),
+        ),
+        migrations.AddField(
+            model_name='accountdailyrollup',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='ledger.ledgeraccount'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountdailyrollup',
+            unique_together={('account', 'day')},
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0011_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxPartition',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('last_published_id', models.BigIntegerField(default=0)),
+                ('relayed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=50)),
+                ('account_id', models.UUIDField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('partition', models.PositiveSmallIntegerField()),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('published_at__isnull', True)), fields=['partition', 'id'], name='ledger_outbox_pending_idx'), models.Index(fields=['published_at'], name='ledger_outb_publish_3d2019_idx')],
+            },
+        ),
+    ]
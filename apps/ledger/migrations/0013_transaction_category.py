@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0012_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='category',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='category_confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('category', '')), fields=['created_at'], name='ledger_txn_uncategorised_idx'),
+        ),
+    ]
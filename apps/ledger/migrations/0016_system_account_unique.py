@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0015_account_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ledgeraccount',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('name', 'currency'), name='ledger_ledgeraccount_system_uniq'),
+        ),
+    ]
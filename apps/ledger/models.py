@@ -1,6 +1,8 @@
 import uuid
 from decimal import Decimal
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -25,6 +27,9 @@ class LedgerAccount(models.Model):
         related_name='ledger_accounts'
     )
     balance = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
+    # Incremented by every posting to the account (under its row lock); the account's ETags derive from it
+    version = models.PositiveBigIntegerField(default=0)
+    last_posted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -32,6 +37,14 @@ class LedgerAccount(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            # One system account (no user) per name and currency: LedgerService.get_system_account relies on it
+            models.UniqueConstraint(
+                fields=['name', 'currency'],
+                condition=models.Q(user__isnull=True),
+                name='ledger_ledgeraccount_system_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.currency})"
@@ -42,6 +55,10 @@ class Transaction(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     posted = models.BooleanField(default=False)
+    # Spending category; empty until the categoriser (apps.ai_engine) or a user sets it
+    category = models.CharField(max_length=50, blank=True, default='')
+    # Set when the category was predicted; null for categories given by a person or an import
+    category_confidence = models.FloatField(null=True, blank=True)
 
     def save(self, *args, **kwargs):
         if not self.reference:
@@ -52,6 +69,11 @@ class Transaction(models.Model):
         indexes = [
             models.Index(fields=['created_at']),
             models.Index(fields=['reference']),
+            models.Index(
+                fields=['created_at'],
+                name='ledger_txn_uncategorised_idx',
+                condition=models.Q(category='')
+            ),
         ]
 
     def clean(self):
@@ -102,10 +124,131 @@ class IdempotencyKey(models.Model):
     response_status = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
     def __str__(self):
         return str(self.key)
 
+class AccountDailyRollup(models.Model):
+    """
+    Per-account totals for one day, written by the nightly rollup task.
+    closing_balance is the account balance at the end of `day`.
+    """
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    debits = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
+    credits = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
+    entry_count = models.PositiveIntegerField(default=0)
+    closing_balance = models.DecimalField(max_digits=20, decimal_places=4)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('account', 'day')
 
+    def __str__(self):
+        return f"{self.account.name} {self.day}: {self.closing_balance}"
+
+class DailySpend(models.Model):
+    """
+    Spending cube: a user's outgoing payments on one day, per account, category and merchant.
+    Kept up to date by the postings themselves (see apps.ledger.analytics), so a report over
+    any period only adds up day rows and never reads journal entries.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_spend')
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='daily_spend')
+    day = models.DateField()
+    # '' until the categoriser has run on the transaction
+    category = models.CharField(max_length=50, blank=True, default='')
+    # Normalised transaction description
+    merchant = models.CharField(max_length=100, blank=True, default='')
+    currency = models.CharField(max_length=3)
+    amount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Leads with (user, day): also the index every period query ranges over
+            models.UniqueConstraint(
+                fields=['user', 'day', 'account', 'category', 'merchant'],
+                name='ledger_dailyspend_cell_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category or '-'} {self.merchant}: {self.amount} {self.currency}"
+
+
+
+
+class OutboxEvent(models.Model):
+    """
+    A ledger event recorded in the same database transaction as the posting that caused it,
+    and published afterwards by the outbox relay (at least once, in id order per partition).
+    """
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=50)
+    account_id = models.UUIDField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    # Events of one account always share a partition; a partition is relayed by one process at a time
+    partition = models.PositiveSmallIntegerField()
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['partition', 'id'],
+                name='ledger_outbox_pending_idx',
+                condition=models.Q(published_at__isnull=True)
+            ),
+            models.Index(fields=['published_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+class OutboxPartition(models.Model):
+    """
+    Relay lease: a relay holds the row lock of every partition it is publishing.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True)
+    last_published_id = models.BigIntegerField(default=0)
+    # When a relay last took the partition; relays take the longest-waiting partitions first
+    relayed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Outbox partition {self.id}"
+
+class FxRate(models.Model):
+    """
+    Exchange rate from `base_currency` to `quote_currency` (1 base = rate quote),
+    valid from `effective_at` until the next rate for the same pair.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    base_currency = models.CharField(max_length=3)
+    quote_currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    effective_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('base_currency', 'quote_currency', 'effective_at')
+        indexes = [
+            models.Index(fields=['base_currency', 'quote_currency', 'effective_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Drop the cached series for this pair so the next lookup reloads it
+        from .fx import fx_rates
+        fx_rates.invalidate(self.base_currency, self.quote_currency)
+
+    def __str__(self):
+        return f"{self.base_currency}/{self.quote_currency} {self.rate} @ {self.effective_at}"
 
 class Card(models.Model):
     class CardType(models.TextChoices):
@@ -120,12 +263,43 @@ class Card(models.Model):
     type = models.CharField(choices=CardType.choices, max_length=10)
     is_frozen = models.BooleanField(default=False)
     spending_limit = models.DecimalField(max_digits=12, decimal_places=2, default=1000.00)
+    # Rolling spend windows (last 24h / 7 days / 30 days); null means no window limit
+    daily_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    weekly_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    monthly_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.name} ({self.last_4})"
 
+class CardHold(models.Model):
+    """
+    Funds reserved by a card authorization, settled into the ledger later in batches.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        SETTLED = 'SETTLED', _('Settled')
+        RELEASED = 'RELEASED', _('Released')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name='holds')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    merchant = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='card_holds')
+    created_at = models.DateTimeField(auto_now_add=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['card', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.card} {self.amount} ({self.status})"
+
 class Subscription(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='subscriptions')
@@ -133,10 +307,17 @@ class Subscription(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     billing_cycle = models.CharField(max_length=20, default='Monthly')
     next_billing_date = models.DateField()
+    # Account charged on each cycle; the user's default account if not set
+    account = models.ForeignKey(LedgerAccount, on_delete=models.SET_NULL, null=True, blank=True, related_name='subscriptions')
     logo_url = models.URLField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'next_billing_date']),
+        ]
+
     def __str__(self):
         return self.service_name
 class FinancialGoal(models.Model):
@@ -146,6 +327,11 @@ class FinancialGoal(models.Model):
     target_amount = models.DecimalField(max_digits=20, decimal_places=4)
     current_amount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
     deadline = models.DateField(null=True, blank=True)
+    # Accounts whose balances count towards the goal; current_amount is kept in step by the posting path
+    accounts = models.ManyToManyField(LedgerAccount, related_name='goals', blank=True)
+    # Exponentially decayed sum of contributions as of contribution_updated_at (see GoalService)
+    contribution_sum = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0.0000'))
+    contribution_updated_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -161,6 +347,14 @@ class Contact(models.Model):
 
     class Meta:
         unique_together = ('user', 'email')
+        indexes = [
+            # Trigram indexes over UPPER(...) serve both case-insensitive prefix (ILIKE 'q%')
+            # and fuzzy (%) contact search
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='ledger_contact_name_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='ledger_contact_email_trgm'),
+            # The contact list's cursor order, within one user
+            models.Index(fields=['user', 'name', 'id'], name='ledger_contact_user_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,118 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Ledger amounts carry 4 decimal places (JournalEntry.amount), so one minor unit is 0.0001
+MINOR_UNIT_EXPONENT = 4
+# Digits of JournalEntry.amount: larger amounts cannot be stored
+AMOUNT_DIGITS = 20
+
+# 10^scale and the first out-of-range count of minor units, for every scale a currency can have
+_POWERS = tuple(10 ** scale for scale in range(MINOR_UNIT_EXPONENT + 1))
+_LIMITS = tuple(10 ** (AMOUNT_DIGITS - MINOR_UNIT_EXPONENT + scale) for scale in range(MINOR_UNIT_EXPONENT + 1))
+# The minor unit (10^-scale) and its inverse as Decimals, for the Decimal fast path
+_UNITS = tuple(Decimal(1).scaleb(-scale) for scale in range(MINOR_UNIT_EXPONENT + 1))
+_SHIFTS = tuple(Decimal(1).scaleb(scale) for scale in range(MINOR_UNIT_EXPONENT + 1))
+
+_scales = None
+
+
+def currency_scales():
+    """
+    {currency: decimal places} from LEDGER_CURRENCY_SCALES ('JPY:0,KWD:3'); other
+    currencies use MINOR_UNIT_EXPONENT. A scale cannot exceed what the ledger stores.
+    """
+    global _scales
+    if _scales is None:
+        scales = {}
+        for item in filter(None, (item.strip() for item in settings.LEDGER_CURRENCY_SCALES.split(','))):
+            currency, _, scale = item.partition(':')
+            if not scale.isdigit() or int(scale) > MINOR_UNIT_EXPONENT:
+                raise ImproperlyConfigured(f"LEDGER_CURRENCY_SCALES: '{item}' needs a scale from 0 to {MINOR_UNIT_EXPONENT}.")
+            scales[currency.strip().upper()] = int(scale)
+        _scales = scales
+    return _scales
+
+
+@receiver(setting_changed)
+def _reset_currency_scales(setting, **kwargs):
+    global _scales
+    if setting == 'LEDGER_CURRENCY_SCALES':
+        _scales = None
+
+
+def currency_scale(currency=None):
+    """
+    Decimal places of `currency`: the size of its minor unit is 10^-scale.
+    """
+    if currency is None:
+        return MINOR_UNIT_EXPONENT
+    return (_scales if _scales is not None else currency_scales()).get(currency, MINOR_UNIT_EXPONENT)
+
+
+def to_minor_units(amount, currency=None, scale=None):
+    """
+    Converts a Decimal/str/int amount into an integer count of minor units of
+    `currency` (of the ledger, 0.0001, when None), or of 10^-scale if `scale` is given.
+    The conversion is exact: ValidationError is raised for an amount that is not a
+    finite number, has more precision than the currency allows or is too large to store.
+    """
+    if scale is None:
+        scale = MINOR_UNIT_EXPONENT if currency is None else (_scales if _scales is not None else currency_scales()).get(currency, MINOR_UNIT_EXPONENT)
+    kind = type(amount)
+    minor = None
+    if kind is Decimal:
+        # What serializers deliver: a zero remainder means the amount fits the scale, and then
+        # shifting it by the scale is exact (an amount too large for the remainder is too large to store)
+        try:
+            if not amount % _UNITS[scale]:
+                minor = int(amount * _SHIFTS[scale])
+        except (ArithmeticError, ValueError):
+            pass  # infinity, NaN: the checks below decide
+    elif kind is int:
+        minor = amount * _POWERS[scale]
+    elif kind is str or kind is float:
+        # Plain decimal strings (what JSON bodies carry) are read with int(), without a Decimal;
+        # a float is read from its shortest repr, as Decimal(str(amount)) would
+        text = amount.strip() if kind is str else repr(amount)
+        whole, _, fraction = text.partition('.')
+        sign = whole[:1]
+        if sign == '-' or sign == '+':
+            whole = whole[1:]
+        digits = whole + fraction
+        # Only digits around the point: anything else (an exponent, inner whitespace, '_') goes to Decimal
+        if len(fraction) <= scale and digits.isdecimal():
+            minor = int(digits) * _POWERS[scale - len(fraction)]
+            if sign == '-':
+                minor = -minor
+    if minor is None:
+        try:
+            value = amount if kind is Decimal else Decimal(str(amount))
+            # Magnitude first, so an exponent like 1E+999999 never becomes a huge integer below
+            magnitude = value.adjusted()
+            if value and magnitude >= AMOUNT_DIGITS - MINOR_UNIT_EXPONENT:
+                raise ValidationError(f"Amount {amount} is too large.")
+            if value and magnitude < -scale:
+                raise ValidationError(f"Amount {amount} has more than {scale} decimal places.")
+            # An exact fraction: no digit of the amount is rounded away, however many it has
+            numerator, denominator = value.as_integer_ratio()
+        except (InvalidOperation, ValueError, OverflowError):
+            raise ValidationError(f"Amount {amount} is not a valid number.")
+        minor, remainder = divmod(numerator * _POWERS[scale], denominator)
+        if remainder:
+            raise ValidationError(f"Amount {amount} has more than {scale} decimal places.")
+    if not -_LIMITS[scale] < minor < _LIMITS[scale]:
+        raise ValidationError(f"Amount {amount} is too large.")
+    return minor
+
+
+def from_minor_units(minor, currency=None, scale=None):
+    """
+    The Decimal amount of `minor` units of `currency` (or of 10^-scale); exact, so
+    to_minor_units() of it gives `minor` back.
+    """
+    if scale is None:
+        scale = MINOR_UNIT_EXPONENT if currency is None else currency_scale(currency)
+    return Decimal(minor).scaleb(-scale)
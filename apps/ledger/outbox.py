@@ -0,0 +1,323 @@
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from core.redis_client import get_redis
+from .models import LedgerAccount, JournalEntry, OutboxEvent, OutboxPartition
+
+logger = logging.getLogger(__name__)
+
+POSTING_EVENT = 'ledger.posting'
+CARD_AUTHORIZED_EVENT = 'card.authorized'
+SUBSCRIPTION_CHARGED_EVENT = 'subscription.charged'
+EVENT_TYPES = (POSTING_EVENT, CARD_AUTHORIZED_EVENT, SUBSCRIPTION_CHARGED_EVENT)
+
+
+def partition_for(account_id):
+    return zlib.crc32(str(account_id).encode()) % settings.OUTBOX_PARTITIONS
+
+
+class OutboxService:
+    @staticmethod
+    def record_postings(entries, accounts, balances_before):
+        """
+        Writes one 'ledger.posting' event per (transaction, user account) for the given
+        journal entries. Must run inside the posting's atomic block, after the accounts
+        were locked: the lock orders the event ids of an account the same way as its postings.
+        System accounts (FX positions, clearing accounts) get no events.
+
+        :param entries: JournalEntry instances in posting order
+        :param accounts: dict {account_id: locked LedgerAccount}
+        :param balances_before: dict {account_id: balance before the first entry}
+        """
+        running = dict(balances_before)
+        changes = {}  # (transaction id, account id) -> [transaction, account, delta, balance after]
+        for entry in entries:
+            account = accounts[entry.account_id]
+            if account.user_id is None:
+                continue
+            sign = 1 if (entry.type == JournalEntry.EntryType.DEBIT) == (
+                account.type in (LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE)
+            ) else -1
+            running[account.id] += sign * entry.amount
+            change = changes.setdefault((entry.transaction_id, account.id), [entry.transaction, account, 0, None])
+            change[2] += sign * entry.amount
+            change[3] = running[account.id]
+
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(
+                event_type=POSTING_EVENT,
+                account_id=account.id,
+                user_id=account.user_id,
+                partition=partition_for(account.id),
+                payload={
+                    'transaction_id': str(txn.id),
+                    'reference': txn.reference,
+                    'description': txn.description,
+                    'account_id': str(account.id),
+                    'currency': account.currency,
+                    'amount': str(delta),
+                    'balance': str(balance),
+                    'posted_at': txn.created_at.isoformat() if txn.created_at else None,
+                }
+            )
+            for txn, account, delta, balance in changes.values()
+        ])
+
+    @staticmethod
+    def record_events(events):
+        """
+        Writes domain events (e.g. card authorizations) that are not account postings.
+        Like record_postings, call it inside the atomic block that makes the change.
+
+        :param events: List of (event_type, account_id, user_id, payload)
+        """
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(
+                event_type=event_type,
+                account_id=account_id,
+                user_id=user_id,
+                partition=partition_for(account_id),
+                payload=payload
+            )
+            for event_type, account_id, user_id, payload in events
+        ])
+
+    @staticmethod
+    def ensure_partitions():
+        OutboxPartition.objects.bulk_create(
+            [OutboxPartition(id=partition) for partition in range(settings.OUTBOX_PARTITIONS)],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def as_message(event):
+        return {
+            'id': event.id,
+            'type': event.event_type,
+            'account_id': str(event.account_id),
+            'user_id': event.user_id,
+            'created_at': event.created_at.isoformat(),
+            'data': event.payload,
+        }
+
+
+class Backpressure(Exception):
+    """
+    Raised by a sink whose consumers cannot take more events right now.
+    """
+
+
+class LocalBroker:
+    """
+    In-process stand-in for the Redis stream. Messages go straight to the subscribers;
+    without any, they are buffered for drain(). Only sees events relayed by the same process.
+    """
+
+    def __init__(self):
+        self.messages = deque()
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def backlog(self):
+        return len(self.messages)
+
+    def publish(self, messages):
+        if not self.subscribers:
+            with self._lock:
+                self.messages.extend(messages)
+        for callback in self.subscribers:
+            callback(messages)
+
+    def drain(self, count=None):
+        with self._lock:
+            count = len(self.messages) if count is None else min(count, len(self.messages))
+            return [self.messages.popleft() for _ in range(count)]
+
+
+local_broker = LocalBroker()
+
+
+class BrokerSink:
+    """
+    Publishes to the OUTBOX_STREAM Redis stream (one pipelined XADD per batch), or to the
+    in-process LocalBroker when Redis is not configured. Backlog is the largest pending
+    count among the stream's consumer groups.
+    """
+
+    def __init__(self, client=None, stream=None):
+        self.client = client if client is not None else get_redis()
+        self.stream = stream or settings.OUTBOX_STREAM
+
+    def backlog(self):
+        if self.client is None:
+            return local_broker.backlog()
+        try:
+            groups = self.client.xinfo_groups(self.stream)
+        except Exception:  # Stream not created yet
+            return 0
+        return max((group.get('lag') or group.get('pending') or 0 for group in groups), default=0)
+
+    def publish(self, messages):
+        if self.backlog() >= settings.OUTBOX_MAX_BACKLOG:
+            raise Backpressure(f"{self.stream} backlog at {settings.OUTBOX_MAX_BACKLOG}")
+        if self.client is None:
+            local_broker.publish(messages)
+            return len(messages)
+
+        pipe = self.client.pipeline(transaction=False)
+        for message in messages:
+            pipe.xadd(
+                self.stream,
+                {'id': message['id'], 'type': message['type'], 'account_id': message['account_id'], 'event': json.dumps(message)},
+                maxlen=settings.OUTBOX_MAX_BACKLOG * 10,
+                approximate=True
+            )
+        pipe.execute()
+        return len(messages)
+
+
+class WebhookSink:
+    """
+    POSTs each batch as {"events": [...]} to OUTBOX_WEBHOOK_URL. 429/503 responses are
+    treated as backpressure; the whole batch is retried on any failure.
+    """
+
+    def __init__(self, url=None, timeout=10):
+        self.url = url or settings.OUTBOX_WEBHOOK_URL
+        self.timeout = timeout
+
+    def publish(self, messages):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({'events': messages}).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                return len(messages)
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                raise Backpressure(f"Webhook sink answered {e.code}")
+            raise
+
+
+class FanoutSink:
+    """
+    Publishes each batch to several sinks in turn. If any of them fails the batch stays
+    pending and is published to all of them again.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def publish(self, messages):
+        for sink in self.sinks:
+            sink.publish(messages)
+        return len(messages)
+
+
+SINKS = {
+    'broker': BrokerSink,
+    'webhook': WebhookSink,
+}
+
+
+def get_sink(spec=None):
+    """
+    Builds the sink for a comma-separated OUTBOX_SINK: names from SINKS or dotted paths to sink classes.
+    """
+    sinks = [
+        SINKS[name]() if name in SINKS else import_string(name)()
+        for name in (name.strip() for name in (spec or settings.OUTBOX_SINK).split(','))
+        if name
+    ]
+    return sinks[0] if len(sinks) == 1 else FanoutSink(sinks)
+
+
+class OutboxRelay:
+    """
+    Publishes pending OutboxEvents in batches.
+
+    Each pass locks the partitions it will serve with SKIP LOCKED (longest-waiting first),
+    so parallel relays split the partitions between them and every account's events are
+    published by one relay at a time, in id order. Events are marked published in the same
+    transaction only after the sink accepted them: a crash in between republishes them
+    (at-least-once; consumers dedupe on the event id).
+    """
+
+    def __init__(self, sink=None, batch_size=None, max_partitions=None):
+        self.sink = sink or get_sink()
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_partitions = max_partitions or settings.OUTBOX_PARTITIONS
+
+    def relay_batch(self):
+        """
+        :raises Backpressure: when the sink is full; nothing is marked published
+        :return: number of events published
+        """
+        with transaction.atomic():
+            partitions = list(
+                OutboxPartition.objects.select_for_update(skip_locked=True)
+                .order_by(F('relayed_at').asc(nulls_first=True), 'id')[:self.max_partitions]
+            )
+            if not partitions:
+                return 0
+
+            now = timezone.now()
+            partition_ids = [partition.id for partition in partitions]
+            events = list(
+                OutboxEvent.objects.filter(partition__in=partition_ids, published_at__isnull=True)
+                .order_by('id')[:self.batch_size]
+            )
+            if events:
+                self.sink.publish([OutboxService.as_message(event) for event in events])
+                OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(published_at=now)
+
+            last_published = {}
+            for event in events:
+                last_published[event.partition] = event.id
+            for partition in partitions:
+                partition.relayed_at = now
+                partition.last_published_id = last_published.get(partition.id, partition.last_published_id)
+            OutboxPartition.objects.bulk_update(partitions, ['relayed_at', 'last_published_id'])
+            return len(events)
+
+    def run(self, idle_sleep=0.5, max_backoff=30.0, stop=None):
+        """
+        Relays until `stop()` returns True. Full batches are followed immediately by the next;
+        an empty pass sleeps `idle_sleep`; backpressure and sink errors back off exponentially.
+        """
+        OutboxService.ensure_partitions()
+        backoff = idle_sleep
+        while not (stop and stop()):
+            try:
+                published = self.relay_batch()
+            except Backpressure as e:
+                logger.info(f"Outbox relay paused: {e}")
+                published = None
+            except Exception:
+                logger.exception("Outbox relay failed to publish a batch")
+                published = None
+
+            if published is None:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+                continue
+
+            backoff = idle_sleep
+            if published < self.batch_size:
+                time.sleep(idle_sleep)
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import redis.asyncio as redis
+from collections import defaultdict
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.core import signing
+from core.redis_client import get_redis
+from .outbox import local_broker
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_PATH = '/api/ledger/events/stream/'
+TOKEN_SALT = 'ledger.events'
+# Queue items besides outbox messages
+PING = object()
+SYNC = object()
+CLOSE = object()
+
+
+def make_stream_token(user_id):
+    """
+    Signed, short-lived credential for opening an event stream. The stream itself never
+    touches the session or the database: connecting costs one signature check.
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user_id))
+
+
+def stream_url(user_id):
+    return f"{settings.REALTIME_STREAM_BASE_URL}{EVENT_STREAM_PATH}?token={make_stream_token(user_id)}"
+
+
+def read_stream_token(token):
+    """
+    :return: user id, or None if the token is invalid or older than REALTIME_TOKEN_MAX_AGE
+    """
+    try:
+        return int(signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.REALTIME_TOKEN_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def format_event(message):
+    """
+    One outbox message as an SSE frame; the outbox event id is the SSE id.
+    """
+    data = {key: value for key, value in message.items() if key != 'user_id'}
+    return f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class EventHub:
+    """
+    Fans ledger events out to the event-stream connections of one process.
+
+    The process holds a single upstream subscription: an XREAD loop on the OUTBOX_STREAM
+    Redis stream the outbox relay publishes to, or the in-process LocalBroker without
+    Redis. Each event is routed by its user id to that user's connection queues, so an
+    idle connection costs a queue and a parked coroutine, and a new event costs one dict
+    lookup however many connections are open. Keep-alive pings are sent by one loop
+    for all connections instead of a timer per connection.
+
+    A connection whose queue fills up (a client not reading) is closed; the client
+    reconnects and is told to resync. Clients are also told to resync whenever the
+    upstream subscription had a gap, since events may have been missed.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.REALTIME_QUEUE_SIZE
+        self.connections = defaultdict(set)  # user id -> set of asyncio.Queue
+        self.count = 0
+        self._loop = None
+        self._tasks = []
+
+    def connect(self, user_id):
+        self._ensure_started()
+        queue = asyncio.Queue(self.queue_size)
+        self.connections[user_id].add(queue)
+        self.count += 1
+        return queue
+
+    def disconnect(self, user_id, queue):
+        queues = self.connections.get(user_id)
+        if queues is not None and queue in queues:
+            queues.discard(queue)
+            self.count -= 1
+            if not queues:
+                del self.connections[user_id]
+
+    def dispatch(self, messages):
+        for message in messages:
+            for queue in tuple(self.connections.get(message.get('user_id'), ())):
+                self._offer(queue, message)
+
+    def broadcast(self, item):
+        for queues in tuple(self.connections.values()):
+            for queue in tuple(queues):
+                self._offer(queue, item)
+
+    def close(self, queue):
+        # Whatever is still queued is dropped, so CLOSE is the next item the connection reads
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(CLOSE)
+
+    def _offer(self, queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Slow reader: close it; it resyncs when it reconnects
+            self.close(queue)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._tasks = [loop.create_task(self._heartbeat())]
+        if get_redis() is None:
+            local_broker.subscribe(lambda messages: loop.call_soon_threadsafe(self.dispatch, messages))
+        else:
+            self._tasks.append(loop.create_task(self._follow_stream()))
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.REALTIME_HEARTBEAT_SECONDS)
+            self.broadcast(PING)
+
+    async def _follow_stream(self):
+        backoff = 0.5
+        while True:
+            client = redis.Redis.from_url(settings.REDIS_URL)
+            try:
+                last_id = '$'
+                while True:
+                    response = await client.xread({settings.OUTBOX_STREAM: last_id}, count=1000, block=5000)
+                    backoff = 0.5
+                    for _, entries in response or ():
+                        messages = []
+                        for entry_id, fields in entries:
+                            last_id = entry_id
+                            messages.append(json.loads(fields[b'event']))
+                        self.dispatch(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event stream lost its Redis subscription; reconnecting")
+                # Events published while we were away are gone for us: have clients resync
+                self.broadcast(SYNC)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                await client.aclose()
+
+
+hub = EventHub()
+
+
+async def event_stream(scope, receive, send):
+    """
+    ASGI app serving a user's ledger events as Server-Sent Events.
+    Authenticated by a ?token= from the event token endpoint (EventSource cannot send
+    headers). The first event is always `sync`: the client refetches whatever it shows
+    (cheap, thanks to the ETags on the read endpoints), then applies pushed events on top.
+    """
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+    user_id = read_stream_token(token)
+    if user_id is None or hub.count >= settings.REALTIME_MAX_CONNECTIONS:
+        status = 401 if user_id is None else 503
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Unauthorized' if status == 401 else b'Too many connections'})
+        return
+
+    queue = hub.connect(user_id)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        hub.close(queue)
+
+    watcher = asyncio.get_running_loop().create_task(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + ([(b'access-control-allow-origin', b'*')] if settings.CORS_ALLOW_ALL_ORIGINS else []),
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\nevent: sync\ndata: {}\n\n', 'more_body': True})
+        while True:
+            item = await queue.get()
+            if item is CLOSE:
+                break
+            if item is PING:
+                frame = b': ping\n\n'
+            elif item is SYNC:
+                frame = b'event: sync\ndata: {}\n\n'
+            else:
+                frame = format_event(item)
+            await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # client went away mid-write
+    finally:
+        watcher.cancel()
+        hub.disconnect(user_id, queue)
@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from .models import LedgerAccount
+
+# Per-user ledger version: bumped after every commit that changes what the user's read endpoints return
+VERSION_KEY = 'ledger:version:{}'
+RESPONSE_KEY = 'ledger:response:{}:{}:{}'
+
+
+def _initial_version():
+    # A lost counter (eviction, cache flush) restarts above any value it can have reached,
+    # so responses cached under an old version never become reachable again
+    return int(time.time() * 1000)
+
+
+def user_version(user_id):
+    """
+    The user's current ledger version: one cache read.
+    """
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_versions(user_ids):
+    """
+    Atomically increments the ledger version of each user (INCR on Redis), which makes
+    every response cached for them unreachable. O(1) per user, whatever was cached.
+    """
+    for user_id in user_ids:
+        key = VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def bump_user_versions_on_commit(user_ids):
+    """
+    Bumps after the surrounding transaction commits, so no request can cache the old
+    state under the new version. Called from inside a write's atomic block.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: bump_user_versions(user_ids))
+
+
+def _representation_digest(request):
+    # Same URL, different renderer (JSON vs the browsable API) is a different representation
+    renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    return hashlib.blake2b(f"{request.get_full_path()}|{renderer}".encode(), digest_size=16).hexdigest()
+
+
+def _validator_headers(etag, last_modified=None):
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    The 304 response for a conditional GET whose validators still match (If-None-Match,
+    or If-Modified-Since when no ETag was sent), or None if the resource must be sent.
+
+    :param last_modified: Unix timestamp, or None
+    """
+    current = HttpResponse(headers=_validator_headers(etag, last_modified))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified, response=current)
+    return None if response is current else response
+
+
+def conditional_response(request, etag, last_modified, build):
+    """
+    Answers a GET whose validators were computed without building the body: a 304 if
+    the client's copy is current, otherwise `build()` with ETag and Last-Modified set.
+    """
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        for header, value in _validator_headers(etag, last_modified).items():
+            response[header] = value
+    return response
+
+
+def account_validators(request, account_id):
+    """
+    (strong ETag, Last-Modified timestamp) of one of the user's accounts as shown at the
+    request URL, from a single primary key lookup; None if it is not the user's account.
+    The ETag changes with every posting to the account and with nothing else.
+    """
+    try:
+        row = LedgerAccount.objects.filter(id=account_id, user=request.user).values_list(
+            'version', 'last_posted_at', 'created_at'
+        ).first()
+    except ValidationError:
+        return None  # not a UUID
+    if row is None:
+        return None
+    version, last_posted_at, created_at = row
+    return f'"{account_id}-{version}-{_representation_digest(request)}"', int((last_posted_at or created_at).timestamp())
+
+
+def cached_response(request, build):
+    """
+    Serves a GET from the per-user response cache, building it with `build()` on a miss.
+
+    The ETag is derived from the user's version, the URL and the renderer, so a client
+    sending it back in If-None-Match gets a 304 after a single cache read, without the
+    view running at all. Only 200 responses are cached.
+    """
+    user_id = request.user.id
+    version = user_version(user_id)
+    digest = _representation_digest(request)
+    etag = f'"{user_id}-{version}-{digest}"'
+
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    key = RESPONSE_KEY.format(user_id, version, digest)
+    data = cache.get(key)
+    if data is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+    return Response(data, headers=_validator_headers(etag))
+
+
+def cache_per_user(view):
+    """
+    Decorator for function-based API views: caches their GET responses per user.
+    Apply it below @api_view.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+        return cached_response(request, lambda: view(request, *args, **kwargs))
+    return wrapper
+
+
+class UserCachedResponseMixin:
+    """
+    Viewset mixin: list and retrieve are served from the per-user response cache, and
+    any successful write through the viewset bumps the user's version.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(UserCachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(UserCachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            bump_user_versions_on_commit([request.user.id])
+        return super().finalize_response(request, response, *args, **kwargs)
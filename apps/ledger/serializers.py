@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
 from django.db import transaction
-from .models import LedgerAccount, Transaction, JournalEntry, FinancialGoal, Contact, Card, Subscription
+from .goals import GoalService
+from .models import LedgerAccount, Transaction, JournalEntry, FinancialGoal, Contact, Card, CardHold, Subscription
 
 class LedgerAccountSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,8 +20,11 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
-        fields = ['id', 'reference', 'description', 'created_at', 'posted', 'entries']
-        read_only_fields = ['created_at']
+        fields = ['id', 'reference', 'description', 'category', 'category_confidence', 'created_at', 'posted', 'entries']
+        read_only_fields = ['created_at', 'category', 'category_confidence']
+
+class TransactionCategorySerializer(serializers.Serializer):
+    category = serializers.CharField(max_length=50)
 
 # --- Input Serializers for API Layer ---
 
@@ -45,21 +49,54 @@ class TransactionCreateSerializer(serializers.Serializer):
         """
         return data
 
+class TransferSerializer(serializers.Serializer):
+    from_account_id = serializers.UUIDField(required=False)
+    email = serializers.EmailField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=4, min_value=Decimal('0.01'))
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    reference = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+class PayoutItemSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=4, min_value=Decimal('0.01'))
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+class PayoutSerializer(serializers.Serializer):
+    from_account_id = serializers.UUIDField(required=False)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    payouts = serializers.ListField(child=PayoutItemSerializer(), min_length=1, max_length=1000)
+
 # --- Reporting Serializers ---
 
 class TrialBalanceAccountSerializer(serializers.ModelSerializer):
     total_debits = serializers.DecimalField(max_digits=20, decimal_places=4)
     total_credits = serializers.DecimalField(max_digits=20, decimal_places=4)
     net_balance = serializers.DecimalField(max_digits=20, decimal_places=4)
+    # Only present when a reporting currency was requested
+    fx_rate = serializers.DecimalField(max_digits=30, decimal_places=10, required=False)
+    converted_debits = serializers.DecimalField(max_digits=20, decimal_places=4, required=False)
+    converted_credits = serializers.DecimalField(max_digits=20, decimal_places=4, required=False)
+    converted_balance = serializers.DecimalField(max_digits=20, decimal_places=4, required=False)
 
     class Meta:
         model = LedgerAccount
-        fields = ['id', 'name', 'type', 'currency', 'balance', 'total_debits', 'total_credits', 'net_balance']
+        fields = [
+            'id', 'name', 'type', 'currency', 'balance', 'total_debits', 'total_credits', 'net_balance',
+            'fx_rate', 'converted_debits', 'converted_credits', 'converted_balance'
+        ]
+
+class CurrencyTotalsSerializer(serializers.Serializer):
+    currency = serializers.CharField()
+    debits = serializers.DecimalField(max_digits=20, decimal_places=4)
+    credits = serializers.DecimalField(max_digits=20, decimal_places=4)
+    is_balanced = serializers.BooleanField()
 
 class TrialBalanceSerializer(serializers.Serializer):
     is_balanced = serializers.BooleanField()
+    currency = serializers.CharField(allow_null=True)
     total_debits = serializers.DecimalField(max_digits=20, decimal_places=4)
     total_credits = serializers.DecimalField(max_digits=20, decimal_places=4)
+    currencies = CurrencyTotalsSerializer(many=True)
     accounts = TrialBalanceAccountSerializer(many=True)
 
 class AccountStatementEntrySerializer(serializers.ModelSerializer):
@@ -72,11 +109,45 @@ class AccountStatementEntrySerializer(serializers.ModelSerializer):
         fields = ['id', 'amount', 'type', 'transaction_description', 'transaction_reference', 'transaction_date']
 
 class FinancialGoalSerializer(serializers.ModelSerializer):
+    account_ids = serializers.PrimaryKeyRelatedField(
+        source='accounts', many=True, required=False, queryset=LedgerAccount.objects.none()
+    )
+    contribution_rate = serializers.SerializerMethodField()
+    projected_completion_date = serializers.SerializerMethodField()
+
     class Meta:
         model = FinancialGoal
-        fields = ['id', 'name', 'target_amount', 'current_amount', 'deadline', 'created_at']
+        fields = [
+            'id', 'name', 'target_amount', 'current_amount', 'deadline', 'account_ids',
+            'contribution_rate', 'projected_completion_date', 'created_at'
+        ]
         read_only_fields = ['current_amount', 'created_at']
 
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None:
+            fields['account_ids'].child_relation.queryset = LedgerAccount.objects.filter(user=request.user)
+        return fields
+
+    def get_contribution_rate(self, obj):
+        return str(GoalService.contribution_rate(obj))
+
+    def get_projected_completion_date(self, obj):
+        return GoalService.projected_completion_date(obj)
+
+    def create(self, validated_data):
+        accounts = validated_data.pop('accounts', [])
+        goal = super().create(validated_data)
+        return GoalService.set_accounts(goal, accounts)
+
+    def update(self, instance, validated_data):
+        accounts = validated_data.pop('accounts', None)
+        goal = super().update(instance, validated_data)
+        if accounts is not None:
+            goal = GoalService.set_accounts(goal, accounts)
+        return goal
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -86,11 +157,30 @@ class ContactSerializer(serializers.ModelSerializer):
 class CardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Card
-        fields = ['id', 'user', 'account', 'name', 'last_4', 'type', 'is_frozen', 'spending_limit', 'balance', 'created_at']
+        fields = [
+            'id', 'user', 'account', 'name', 'last_4', 'type', 'is_frozen', 'spending_limit',
+            'daily_limit', 'weekly_limit', 'monthly_limit', 'balance', 'created_at'
+        ]
         read_only_fields = ['balance', 'created_at', 'user', 'account', 'name', 'last_4']
 
+class CardAuthorizationSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+    merchant = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+class CardHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CardHold
+        fields = ['id', 'card', 'amount', 'merchant', 'status', 'transaction', 'created_at', 'settled_at']
+        read_only_fields = fields
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
-        fields = ['id', 'user', 'service_name', 'amount', 'billing_cycle', 'next_billing_date', 'logo_url', 'is_active', 'created_at']
+        fields = ['id', 'user', 'service_name', 'amount', 'billing_cycle', 'next_billing_date', 'account', 'logo_url', 'is_active', 'created_at']
         read_only_fields = ['created_at', 'user']
+
+    def validate_account(self, account):
+        request = self.context.get('request')
+        if account and request and account.user_id != request.user.id:
+            raise serializers.ValidationError("Account not found.")
+        return account
@@ -1,13 +1,37 @@
+import time
+import uuid
+from collections import defaultdict
+from itertools import islice
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Sum, Q, F, Case, When
+from django.utils import timezone
+from django.db.models import Sum, Q, F, Case, When, Value, DecimalField
 from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
-from .models import LedgerAccount, Transaction, JournalEntry
+from .models import LedgerAccount, Transaction, JournalEntry, Card
+from .fx import fx_rates
+from .card_state import get_card_state_store
+from .goals import GoalService
+from .outbox import OutboxService
+from .analytics import SpendingAnalyticsService
+from .response_cache import bump_user_versions_on_commit
+from .money import to_minor_units, from_minor_units
+from .bulk_load import TRANSACTION_COLUMNS, ENTRY_COLUMNS, get_writer
+from .tracing import (
+    traced, current_span, NULL_SPAN, VALIDATE, LOCK_ACQUIRE, INSERT_ENTRIES, BALANCE_UPDATE, DERIVED_UPDATES, COMMIT,
+)
+from apps.ai_engine.risk import RiskService
+
+DEBIT, CREDIT = JournalEntry.EntryType.DEBIT, JournalEntry.EntryType.CREDIT
+# Account types whose balance grows with debits
+DEBIT_NORMAL_TYPES = (LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE)
 
 class LedgerService:
     @staticmethod
-    def create_transaction(user, description, entries_data, reference=None):
+    @traced('ledger.create_transaction')
+    def create_transaction(user, description, entries_data, reference=None, score_risk=True, record_card_spend=True,
+                           fx_tolerance=None):
         """
         Creates a transaction and its journal entries atomically.
         Updates account balances based on entry type and account type.
@@ -16,8 +40,23 @@ class LedgerService:
         :param description: Description of the transaction
         :param entries_data: List of dicts [{'account': instance, 'amount': logic, 'type': DEBIT/CREDIT}]
         :param reference: Unique reference ID (optional, generated if None)
+        :param score_risk: Risk-score the user's outgoing legs first (off for postings already
+                           scored upstream, e.g. card settlements)
+        :param record_card_spend: Count money leaving card-linked accounts toward the cards' spend
+                                  windows (off for card settlements, counted when each hold was authorized)
+        :param fx_tolerance: Relative residual allowed when netting cross-currency legs, in place of
+                             FX_RATE_TOLERANCE; only for internal callers posting at an agreed rate, never
+                             for legs a user supplied
         :return: Transaction instance
         """
+        if len(entries_data) < 2:
+            raise ValidationError("A transaction needs at least two entries.")
+        span = current_span()
+        # Scored before any lock is taken, so the scoring budget never extends lock hold times
+        risk_signals = RiskService.posting_signals(user, entries_data) if score_risk else []
+        RiskService.check(risk_signals)
+        span.lap(VALIDATE)
+
         with transaction.atomic():
             # Create Transaction
             txn = Transaction(
@@ -27,70 +66,535 @@ class LedgerService:
             if reference:
                 txn.reference = reference
             txn.save() # ID generated here if reference is None/UUID
+            span.lap(INSERT_ENTRIES)
 
-            debits = Decimal('0.00')
-            credits = Decimal('0.00')
+            # Lock every account up front, in primary key order. A cross-currency posting also books
+            # against each currency's FX position account: those are resolved first and locked in the
+            # same query, so postings converting in opposite directions cannot deadlock on them
+            account_ids = {LedgerService._as_uuid(entry['account_id']) for entry in entries_data}
+            positions = LedgerService._fx_position_ids(account_ids)
+            accounts = LedgerService._lock_accounts(account_ids | set(positions.values()))
+            span.lap(LOCK_ACQUIRE)
+
+            # Amounts are checked and summed as integer minor units of each account's currency,
+            # and turned back into Decimals only for the entries and the new balances.
+            # Per-currency running totals: {currency: [debits, credits]}
+            totals = defaultdict(lambda: [0, 0])
+            deltas = defaultdict(int)  # {account_id: balance change}
+            balances_before = {account_id: account.balance for account_id, account in accounts.items()}
+            entries = []
 
             for entry in entries_data:
-                account_id = entry['account_id']
-                amount = Decimal(str(entry['amount'])) # Ensure Decimal
+                account_id = LedgerService._as_uuid(entry['account_id'])
                 entry_type = entry['type']
 
-                # Lock the account row for update to prevent race conditions
-                try:
-                    locked_account = LedgerAccount.objects.select_for_update().get(id=account_id)
-                except LedgerAccount.DoesNotExist:
+                locked_account = accounts.get(account_id)
+                if locked_account is None:
                      raise ValidationError(f"Account {account_id} does not exist.")
 
-                if amount <= 0:
+                currency = locked_account.currency
+                amount = entry['amount']
+                minor = to_minor_units(amount, currency)
+                if minor <= 0:
                      raise ValidationError(f"Amount for account {locked_account.name} must be positive.")
 
-                # Create Journal Entry
-                JournalEntry.objects.create(
+                # A Decimal amount (what serializers deliver) is stored as given: to_minor_units() found it exact
+                entries.append(JournalEntry(
                     transaction=txn,
                     account=locked_account,
-                    amount=amount,
+                    amount=amount if type(amount) is Decimal else from_minor_units(minor, currency),
                     type=entry_type
+                ))
+
+                # Update Totals for Validation (debits and credits only offset within a currency)
+                if entry_type == DEBIT:
+                    totals[currency][0] += minor
+                elif entry_type == CREDIT:
+                    totals[currency][1] += minor
+
+                # Balance change (Asset/Expense: Debit (+), Credit (-); the others the reverse)
+                deltas[account_id] += minor if (entry_type == DEBIT) == (locked_account.type in DEBIT_NORMAL_TYPES) else -minor
+
+            if len(totals) > 1:
+                # Cross-currency: balance each currency through its FX position account
+                if not positions.keys() >= totals.keys():
+                    raise ValidationError("An account's currency changed while posting; please retry.")
+                LedgerService._post_fx_legs(
+                    txn, totals, {currency: accounts[positions[currency]] for currency in totals}, entries, deltas, fx_tolerance
                 )
-                
-                # Update Totals for Validation
-                if entry_type == JournalEntry.EntryType.DEBIT:
-                    debits += amount
-                elif entry_type == JournalEntry.EntryType.CREDIT:
-                    credits += amount
-
-                # Update Account Balance (Denormalization)
-                # Asset/Expense: Debit (+), Credit (-)
-                # Liability/Equity/Income: Debit (-), Credit (+)
-                
-                if locked_account.type in [LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE]:
-                    if entry_type == JournalEntry.EntryType.DEBIT:
-                        locked_account.balance += amount
-                    else:
-                        locked_account.balance -= amount
-                else: # Liability, Equity, Income
-                    if entry_type == JournalEntry.EntryType.DEBIT:
-                        locked_account.balance -= amount
-                    else:
-                        locked_account.balance += amount
-                
-                locked_account.save()
-
-            # Validate Double Entry
-            if debits != credits:
-                raise ValidationError(f"Transaction unbalance: Debits {debits} != Credits {credits}")
-            
-            return txn
+            balance_deltas = LedgerService._apply_deltas(accounts, deltas)
+            span.lap(VALIDATE)
+
+            JournalEntry.objects.bulk_create(entries)
+            span.entries = len(entries)
+            span.lap(INSERT_ENTRIES)
+            LedgerService._mark_posted(accounts.values(), txn.created_at)
+            LedgerAccount.objects.bulk_update(accounts.values(), ['balance', 'version', 'last_posted_at'])
+            span.lap(BALANCE_UPDATE)
+
+            # Validate Double Entry, per currency
+            for currency, (debits, credits) in totals.items():
+                if debits != credits:
+                    raise ValidationError(
+                        f"Transaction unbalance ({currency}): "
+                        f"Debits {from_minor_units(debits, currency)} != Credits {from_minor_units(credits, currency)}"
+                    )
+            span.lap(VALIDATE)
+
+            OutboxService.record_postings(entries, accounts, balances_before)
+            SpendingAnalyticsService.record_postings(entries, accounts)
+            LedgerService._after_balances_changed(balance_deltas, txn.created_at, accounts.values())
+            if record_card_spend:
+                LedgerService._record_card_spends(entries)
+            RiskService.observe_on_commit(risk_signals)
+            span.lap(DERIVED_UPDATES)
+
+        span.lap(COMMIT)
+        return txn
+
+    @staticmethod
+    @traced('ledger.create_transactions_batch')
+    def create_transactions_batch(transactions_data, record_card_spend=True):
+        """
+        Posts many single-currency transactions in one database transaction.
+
+        All accounts involved are locked once, in primary key order (so concurrent
+        batches cannot deadlock), transactions and entries are inserted with
+        bulk_create, and each account's balance is updated once with its net delta.
+        The whole batch is rejected if any transaction is invalid.
+
+        :param transactions_data: List of dicts {'description', 'reference' (optional), 'created_at' (optional),
+                                  'entries': [...]} with entries shaped as for create_transaction; `created_at`
+                                  dates a transaction that happened earlier (its entries keep the posting time)
+        :param record_card_spend: as for create_transaction (off for history, e.g. statement imports)
+        :return: List of Transaction instances, in input order
+        """
+        span = current_span()
+        account_ids = {LedgerService._as_uuid(entry['account_id']) for data in transactions_data for entry in data['entries']}
+
+        with transaction.atomic():
+            accounts = LedgerService._lock_accounts(account_ids)
+            span.lap(LOCK_ACQUIRE)
+
+            balances_before = {account_id: account.balance for account_id, account in accounts.items()}
+            deltas = defaultdict(int)
+            txns = []
+            entries = []
+            for data in transactions_data:
+                txn = Transaction(
+                    description=data.get('description', ''),
+                    reference=data.get('reference') or str(uuid.uuid4()),
+                    posted=True
+                )
+                totals = defaultdict(lambda: [0, 0])  # minor units, as in create_transaction
+                if len(data['entries']) < 2:
+                    raise ValidationError(f"Transaction {txn.reference} needs at least two entries.")
+
+                for entry in data['entries']:
+                    account = accounts.get(LedgerService._as_uuid(entry['account_id']))
+                    if account is None:
+                        raise ValidationError(f"Account {entry['account_id']} does not exist.")
+
+                    currency = account.currency
+                    amount = entry['amount']
+                    minor = to_minor_units(amount, currency)
+                    if minor <= 0:
+                        raise ValidationError(f"Amount for account {account.name} must be positive.")
+
+                    entry_type = entry['type']
+                    if entry_type == DEBIT:
+                        totals[currency][0] += minor
+                    elif entry_type == CREDIT:
+                        totals[currency][1] += minor
+
+                    entries.append(JournalEntry(
+                        transaction=txn, account=account, type=entry_type,
+                        amount=amount if type(amount) is Decimal else from_minor_units(minor, currency)
+                    ))
+                    deltas[account.id] += minor if (entry_type == DEBIT) == (account.type in DEBIT_NORMAL_TYPES) else -minor
+
+                if len(totals) > 1:
+                    raise ValidationError(f"Batched transaction {txn.reference} spans several currencies; post it with create_transaction.")
+                for currency, (debits, credits) in totals.items():
+                    if debits != credits:
+                        raise ValidationError(
+                            f"Transaction {txn.reference} unbalance ({currency}): "
+                            f"Debits {from_minor_units(debits, currency)} != Credits {from_minor_units(credits, currency)}"
+                        )
+                txns.append(txn)
+            balance_deltas = LedgerService._apply_deltas(accounts, deltas)
+            span.lap(VALIDATE)
+
+            Transaction.objects.bulk_create(txns)
+            posted_at = txns[-1].created_at if txns else None
+            # created_at is auto_now_add, so given dates are written over the insert time
+            dated = []
+            for txn, data in zip(txns, transactions_data):
+                if data.get('created_at'):
+                    txn.created_at = data['created_at']
+                    dated.append(txn)
+            Transaction.objects.bulk_update(dated, ['created_at'])
+            JournalEntry.objects.bulk_create(entries)
+            span.entries = len(entries)
+            span.lap(INSERT_ENTRIES)
+            LedgerService._mark_posted(accounts.values(), posted_at)
+            LedgerAccount.objects.bulk_update(accounts.values(), ['balance', 'version', 'last_posted_at'])
+            span.lap(BALANCE_UPDATE)
+
+            OutboxService.record_postings(entries, accounts, balances_before)
+            SpendingAnalyticsService.record_postings(entries, accounts)
+            LedgerService._after_balances_changed(balance_deltas, accounts=accounts.values())
+            if record_card_spend:
+                LedgerService._record_card_spends(entries)
+            span.lap(DERIVED_UPDATES)
+
+        span.lap(COMMIT)
+        return txns
+
+    @staticmethod
+    @traced('ledger.ingest_transactions')
+    def ingest_transactions(transactions_data, chunk_size=None, rebuild_analytics=True):
+        """
+        Bulk-loads already-posted history (backfills, migrations from legacy ledgers)
+        without going through the ORM per row.
+
+        Transactions are read in chunks of LEDGER_INGEST_CHUNK_SIZE. Each is validated as it
+        is read (accounts exist, positive amounts with at most 4 decimal places, a single
+        currency, debits equal credits) and its rows are streamed to the database with COPY
+        FROM STDIN (plain inserts on other databases), while each account's net change is
+        summed in minor units. At the end the accounts are locked in primary key order and
+        every balance moves by its net change in one set-based UPDATE, so balances are only
+        locked for that final statement.
+
+        Everything runs in one database transaction: any invalid transaction rejects the
+        whole load. Imported history emits no outbox events (subscribers are not told about
+        the past again); goals, cached responses and card states follow the new balances, and
+        the spending analytics of the affected users are rebuilt unless `rebuild_analytics`
+        is False.
+
+        :param transactions_data: Iterable of dicts {'description', 'reference' (optional), 'created_at' (optional),
+                                  'category' (optional), 'entries': [...]} with entries shaped as for create_transaction
+        :return: dict with the number of transactions, entries and accounts written
+        """
+        span = current_span()
+        chunk_size = chunk_size or settings.LEDGER_INGEST_CHUNK_SIZE
+        writer = get_writer()
+        accounts = {}  # account_id -> (increases on debit, currency, user_id)
+        deltas = defaultdict(int)  # account_id -> net change in minor units
+        stats = {'transactions': 0, 'entries': 0, 'accounts': 0}
+        data_iter = iter(transactions_data)
+
+        with transaction.atomic():
+            while True:
+                chunk = list(islice(data_iter, chunk_size))
+                if not chunk:
+                    break
+                missing = {
+                    LedgerService._as_uuid(entry['account_id']) for data in chunk for entry in data['entries']
+                }.difference(accounts)
+                for account_id, account_type, currency, user_id in LedgerAccount.objects.filter(
+                    id__in=missing
+                ).values_list('id', 'type', 'currency', 'user_id'):
+                    accounts[account_id] = (account_type in DEBIT_NORMAL_TYPES, currency, user_id)
+
+                now = timezone.now()
+                txn_rows = []
+                entry_rows = []
+                for data in chunk:
+                    txn_id = uuid.uuid4()
+                    reference = data.get('reference') or str(txn_id)
+                    created_at = data.get('created_at') or now
+                    currency = None
+                    debits = credits = 0
+                    if len(data['entries']) < 2:
+                        raise ValidationError(f"Transaction {reference} needs at least two entries.")
+
+                    for entry in data['entries']:
+                        account_id = LedgerService._as_uuid(entry['account_id'])
+                        account = accounts.get(account_id)
+                        if account is None:
+                            raise ValidationError(f"Transaction {reference}: account {entry['account_id']} does not exist.")
+                        if currency is None:
+                            currency = account[1]
+                        elif account[1] != currency:
+                            raise ValidationError(f"Transaction {reference} spans several currencies; post it with create_transaction.")
+
+                        amount = entry['amount']
+                        minor = to_minor_units(amount, currency)
+                        if minor <= 0:
+                            raise ValidationError(f"Transaction {reference}: amount for account {account_id} must be positive.")
+                        entry_type = entry['type']
+                        if entry_type == DEBIT:
+                            debits += minor
+                            deltas[account_id] += minor if account[0] else -minor
+                        elif entry_type == CREDIT:
+                            credits += minor
+                            deltas[account_id] += -minor if account[0] else minor
+                        else:
+                            raise ValidationError(f"Transaction {reference}: unknown entry type {entry_type}.")
+                        entry_rows.append((
+                            uuid.uuid4(), txn_id, account_id,
+                            amount if type(amount) is Decimal else from_minor_units(minor, currency), entry_type, created_at
+                        ))
+
+                    if debits != credits:
+                        raise ValidationError(
+                            f"Transaction {reference} unbalance ({currency}): "
+                            f"Debits {from_minor_units(debits, currency)} != Credits {from_minor_units(credits, currency)}"
+                        )
+                    txn_rows.append((txn_id, reference, data.get('description', ''), created_at, True, data.get('category', ''), None))
+                span.lap(VALIDATE)
+
+                writer.write(Transaction, TRANSACTION_COLUMNS, txn_rows)
+                writer.write(JournalEntry, ENTRY_COLUMNS, entry_rows)
+                stats['transactions'] += len(txn_rows)
+                stats['entries'] += len(entry_rows)
+                span.lap(INSERT_ENTRIES)
+
+            balance_deltas = {
+                account_id: from_minor_units(delta, accounts[account_id][1]) for account_id, delta in deltas.items() if delta
+            }
+            writer.add_to_balances(balance_deltas)
+            stats['accounts'] = len(deltas)
+            span.entries = stats['entries']
+            span.lap(BALANCE_UPDATE)
+
+            touched = LedgerAccount.objects.filter(id__in=list(deltas)).only('id', 'user_id')
+            LedgerService._after_balances_changed(balance_deltas, accounts=touched)
+            user_ids = {accounts[account_id][2] for account_id in deltas} - {None}
+            if rebuild_analytics and user_ids:
+                SpendingAnalyticsService.rebuild(user_ids)
+            span.lap(DERIVED_UPDATES)
+
+        span.lap(COMMIT)
+        return stats
+
+    @staticmethod
+    def _after_balances_changed(balance_deltas, at=None, accounts=()):
+        """
+        Keeps state derived from account balances in step with a posting.
+        Runs inside the posting's atomic block; `balance_deltas` is {account_id: change}
+        and `accounts` the LedgerAccount instances involved.
+        """
+        GoalService.apply_balance_deltas(balance_deltas, at)
+
+        # Responses cached for the account owners are stale once we commit
+        bump_user_versions_on_commit({account.user_id for account in accounts})
+
+        # Cached card availability for these accounts is stale once we commit
+        card_states = get_card_state_store()
+        touched_accounts = set(balance_deltas)
+        transaction.on_commit(lambda: card_states.invalidate_accounts(touched_accounts))
+
+    @staticmethod
+    def _record_card_spends(entries):
+        """
+        Feeds the spend windows of cards linked to a user's asset account with the credits
+        (money leaving it) among `entries`, so transfers and payouts count toward the card
+        limits like card spends do. Cards are looked up after the commit, off the lock path.
+        """
+        spends = [
+            (entry.account_id, to_minor_units(entry.amount), entry.created_at.timestamp())
+            for entry in entries
+            if entry.type == CREDIT and entry.account.user_id is not None and entry.account.type == LedgerAccount.Type.ASSET
+        ]
+        if not spends:
+            return
+
+        def record():
+            cards = defaultdict(list)
+            for card_id, account_id in Card.objects.filter(account_id__in={spend[0] for spend in spends}).values_list('id', 'account_id'):
+                cards[account_id].append(card_id)
+            if cards:
+                card_states = get_card_state_store()
+                for account_id, amount, at in spends:
+                    for card_id in cards[account_id]:
+                        card_states.record_spend(card_id, amount, at)
+        transaction.on_commit(record)
+
+    @staticmethod
+    def _fx_position_ids(account_ids):
+        """
+        :return: {currency: FX position account id} for each currency among the accounts when
+                 they span several currencies, else {} (read without locks, before locking)
+        """
+        if len(account_ids) < 2:
+            return {}
+        currencies = set(LedgerAccount.objects.filter(id__in=account_ids).values_list('currency', flat=True))
+        if len(currencies) < 2:
+            return {}
+        return {
+            currency: LedgerService.get_system_account(f'FX Position {currency}', LedgerAccount.Type.EQUITY, currency).id
+            for currency in currencies
+        }
+
+    @staticmethod
+    def _lock_accounts(account_ids):
+        """
+        Locks the accounts (SELECT ... FOR UPDATE) in primary key order, so postings touching
+        the same accounts from opposite sides cannot deadlock, and records the lock wait on
+        the current span.
+
+        :return: {account_id: LedgerAccount} of the accounts that exist
+        """
+        span = current_span()
+        queryset = LedgerAccount.objects.select_for_update()
+        if settings.LEDGER_TRACE_ROW_LOCKS and span is not NULL_SPAN:
+            # One row per query, so the wait on each lock is known (a round trip per account)
+            accounts = {}
+            for account_id in sorted(account_ids):
+                start = time.perf_counter()
+                account = queryset.filter(id=account_id).first()
+                span.locked([account_id], time.perf_counter() - start)
+                if account is not None:
+                    accounts[account_id] = account
+            return accounts
+
+        # One query for all rows: its wait is charged to each account it locked
+        start = time.perf_counter()
+        accounts = {account.id: account for account in queryset.filter(id__in=account_ids).order_by('id')}
+        span.locked(accounts, time.perf_counter() - start)
+        return accounts
+
+    @staticmethod
+    def _apply_deltas(accounts, deltas):
+        """
+        Adds each account's balance change, summed in minor units, to its balance.
+
+        :param accounts: {account_id: locked LedgerAccount}
+        :param deltas: {account_id: change in minor units of the account's currency}
+        :return: {account_id: Decimal change} for every account, as _after_balances_changed takes it
+        """
+        balance_deltas = {}
+        for account_id, account in accounts.items():
+            delta = balance_deltas[account_id] = from_minor_units(deltas.get(account_id, 0), account.currency)
+            account.balance += delta
+        return balance_deltas
+
+    @staticmethod
+    def _mark_posted(accounts, at):
+        """
+        Advances the version of locked accounts about to be saved, so their ETags change.
+        """
+        at = at or timezone.now()
+        for account in accounts:
+            account.version += 1
+            account.last_posted_at = at
+
+    @staticmethod
+    def _as_uuid(value):
+        try:
+            return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except ValueError:
+            raise ValidationError(f"Account {value} does not exist.")
+
+    @staticmethod
+    def _apply_to_balance(account, entry_type, amount):
+        # Asset/Expense: Debit (+), Credit (-)
+        # Liability/Equity/Income: Debit (-), Credit (+)
+        if account.type in [LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE]:
+            if entry_type == JournalEntry.EntryType.DEBIT:
+                account.balance += amount
+            else:
+                account.balance -= amount
+        else: # Liability, Equity, Income
+            if entry_type == JournalEntry.EntryType.DEBIT:
+                account.balance -= amount
+            else:
+                account.balance += amount
+
+    @staticmethod
+    def get_system_account(name, account_type, currency='USD'):
+        """
+        Returns (creating on first use) a user-less account the ledger books against internally,
+        e.g. FX positions or settlement accounts.
+        """
+        # Concurrent first uses race to create it: the unique constraint on system accounts lets one
+        # insert win, and get_or_create then returns the winner's row instead of raising IntegrityError
+        account, _ = LedgerAccount.objects.get_or_create(
+            user=None,
+            name=name,
+            currency=currency,
+            defaults={'type': account_type}
+        )
+        return account
+
+    @staticmethod
+    def get_default_account(user):
+        """
+        The account a user pays from and receives into when none is specified: their oldest asset account.
+        """
+        return LedgerAccount.objects.filter(
+            user=user, type=LedgerAccount.Type.ASSET
+        ).order_by('created_at').first()
+
+    @staticmethod
+    def _post_fx_legs(txn, totals, positions, entries, deltas, tolerance=None):
+        """
+        Posts one FX leg per currency against that currency's 'FX Position' account,
+        so every currency balances on its own. Before doing so, checks that the legs
+        net out to zero once converted at the cached rate for the transaction timestamp:
+        within one minor unit of each currency (what rounding a converted amount can
+        lose), plus `tolerance` (FX_RATE_TOLERANCE when None) of the gross.
+
+        :param totals: {currency: [debits, credits]} in minor units; the legs are added to them
+        :param positions: {currency: locked FX position LedgerAccount}
+        :param entries: the posting's JournalEntry list; the legs are appended to it
+        :param deltas: {account_id: balance change in minor units}; the legs' changes are added to it
+        """
+        pivot = next(iter(totals))
+        rates = fx_rates.get_rates(totals.keys(), pivot, txn.created_at)
+
+        residual = Decimal('0')
+        gross = Decimal('0')
+        rounding = Decimal('0')
+        for currency, (debits, credits) in totals.items():
+            residual += from_minor_units(debits - credits, currency) * rates[currency]
+            gross += from_minor_units(debits, currency) * rates[currency]
+            rounding += from_minor_units(1, currency) * rates[currency]
+
+        if tolerance is None:
+            tolerance = getattr(settings, 'FX_RATE_TOLERANCE', '0')
+        if abs(residual) > rounding + gross * Decimal(str(tolerance)):
+            raise ValidationError(
+                f"Transaction legs do not offset at the current FX rates (residual {residual:.4f} {pivot})."
+            )
+
+        for currency, currency_totals in totals.items():
+            net = currency_totals[0] - currency_totals[1]
+            if net == 0:
+                continue
+
+            position = positions[currency]
+            if net > 0:
+                entry_type, minor = CREDIT, net
+                currency_totals[1] += minor
+            else:
+                entry_type, minor = DEBIT, -net
+                currency_totals[0] += minor
+
+            entries.append(JournalEntry(
+                transaction=txn,
+                account=position,
+                amount=from_minor_units(minor, currency),
+                type=entry_type
+            ))
+            deltas[position.id] += minor if (entry_type == DEBIT) == (position.type in DEBIT_NORMAL_TYPES) else -minor
 
     @staticmethod
     def get_balance(account_id):
         return LedgerAccount.objects.get(id=account_id).balance
 
     @staticmethod
-    def get_trial_balance(user):
+    def get_trial_balance(user, currency=None):
         """
         Calculates the trial balance for a user.
         Returns a dict with global totals and a queryset of accounts annotated with debit/credit sums.
+
+        Debits and credits are only comparable within a currency, so `is_balanced` is checked per
+        currency. If `currency` is given, every account is also converted into it in the same query:
+        the cached rate for each distinct currency is inlined as a CASE expression, so the database
+        converts all rows in one pass instead of a lookup per account.
         """
         accounts = LedgerAccount.objects.filter(user=user).annotate(
             total_debits=Coalesce(Sum('entries__amount', filter=Q(entries__type=JournalEntry.EntryType.DEBIT)), Decimal('0')),
@@ -101,14 +605,46 @@ class LedgerService:
                 default=F('total_credits') - F('total_debits')
             )
         )
-        
-        # Calculate global health check
-        global_debits = accounts.aggregate(sum=Sum('total_debits'))['sum'] or Decimal('0')
-        global_credits = accounts.aggregate(sum=Sum('total_credits'))['sum'] or Decimal('0')
-        
-        return {
-            'is_balanced': global_debits == global_credits,
+
+        # Calculate per-currency health check
+        by_currency = list(
+            accounts.order_by().values('currency').annotate(
+                debits=Coalesce(Sum('entries__amount', filter=Q(entries__type=JournalEntry.EntryType.DEBIT)), Decimal('0')),
+                credits=Coalesce(Sum('entries__amount', filter=Q(entries__type=JournalEntry.EntryType.CREDIT)), Decimal('0'))
+            ).order_by('currency')
+        )
+        for row in by_currency:
+            row['is_balanced'] = row['debits'] == row['credits']
+
+        result = {
+            'is_balanced': all(row['is_balanced'] for row in by_currency),
+            'currencies': by_currency,
+        }
+
+        if currency:
+            rates = fx_rates.get_rates([row['currency'] for row in by_currency], currency)
+            amount_field = DecimalField(max_digits=30, decimal_places=10)
+            accounts = accounts.annotate(
+                fx_rate=Case(
+                    *[When(currency=code, then=Value(rate)) for code, rate in rates.items()],
+                    default=Value(Decimal('1')),
+                    output_field=amount_field
+                )
+            ).annotate(
+                converted_debits=F('total_debits') * F('fx_rate'),
+                converted_credits=F('total_credits') * F('fx_rate'),
+                converted_balance=F('net_balance') * F('fx_rate'),
+            )
+            global_debits = sum((row['debits'] * rates[row['currency']] for row in by_currency), Decimal('0'))
+            global_credits = sum((row['credits'] * rates[row['currency']] for row in by_currency), Decimal('0'))
+        else:
+            global_debits = sum((row['debits'] for row in by_currency), Decimal('0'))
+            global_credits = sum((row['credits'] for row in by_currency), Decimal('0'))
+
+        result.update({
+            'currency': currency,
             'total_debits': global_debits,
             'total_credits': global_credits,
             'accounts': accounts
-        }
+        })
+        return result
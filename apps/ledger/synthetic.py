@@ -0,0 +1,240 @@
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from .models import LedgerAccount, Transaction, JournalEntry
+from .bulk_load import TRANSACTION_COLUMNS, ENTRY_COLUMNS, get_writer
+
+# Spend categories: (category, share of spends, merchants in popularity order, median amount in cents, log-normal sigma)
+SPEND_MIX = (
+    ('Groceries', 0.24, ('Whole Foods', 'Tesco', 'Aldi', 'Lidl', "Trader Joe's", 'Safeway'), 4500, 0.6),
+    ('Dining', 0.20, ('Starbucks', 'McDonalds', 'Chipotle', 'Pret A Manger', 'Deliveroo', 'Uber Eats'), 1400, 0.5),
+    ('Transport', 0.15, ('Uber', 'Shell', 'Lyft', 'BP', 'TfL', 'Amtrak'), 2500, 0.7),
+    ('Shopping', 0.15, ('Amazon', 'Target', 'IKEA', 'Zara', 'eBay', 'Apple Store'), 6000, 1.0),
+    ('Entertainment', 0.08, ('Netflix', 'Spotify', 'Steam', 'Ticketmaster', 'Cinema City'), 1800, 0.6),
+    ('Utilities', 0.08, ('Comcast', 'Vodafone', 'British Gas', 'Thames Water'), 8000, 0.4),
+    ('Health', 0.05, ('CVS', 'Boots', 'Walgreens', 'PureGym'), 3000, 0.6),
+    ('Travel', 0.05, ('Airbnb', 'Ryanair', 'Booking.com', 'Hilton'), 25000, 0.8),
+)
+# Relative activity per hour of day (UTC) and per weekday (Monday first)
+HOUR_WEIGHTS = (2, 1, 1, 1, 1, 2, 4, 8, 12, 10, 9, 11, 16, 15, 10, 9, 10, 13, 16, 15, 12, 9, 6, 4)
+WEEKDAY_WEIGHTS = (10, 10, 10, 11, 13, 14, 11)
+TRANSFER_SHARE = 0.08  # of the non-salary transactions
+CARD_HOLDER_SHARE = 0.4
+CARD_SPEND_SHARE = 0.5  # of a card holder's spends
+SALARY_HEADROOM = 1.15  # salaries exceed expected spending by this factor, so balances drift up like real ones
+
+
+def _cumulative(weights):
+    total, cumulative = 0, []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+
+def _cents(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class SyntheticLedgerGenerator:
+    """
+    Writes a realistic synthetic ledger: users with Checking and Savings accounts (some
+    with a Credit Card), shared merchant accounts and a payroll account.
+
+    - Activity is Zipfian: the user of rank r posts in proportion to 1 / r^zipf, and
+      merchants within a category are Zipfian too, so a few accounts are hot.
+    - Postings follow daily and weekly cycles; every user is paid monthly.
+    - Spends pick a category from SPEND_MIX with log-normal amounts.
+
+    Rows are generated in chunks and streamed with COPY FROM STDIN (CSV) from in-memory
+    buffers on PostgreSQL; other databases get plain multi-row inserts. Each chunk is one
+    database transaction that also adds the chunk's net amount to every account it touched
+    (one set-based UPDATE), so balances equal the sum of entries at every commit.
+    The same arguments always produce the same rows.
+    """
+
+    def __init__(self, transactions, users=None, days=365, seed=0, prefix='synthetic', zipf=1.1, end=None,
+                 chunk_size=50_000, progress=None):
+        self.transactions = transactions
+        self.num_users = users or max(10, transactions // 100)
+        self.days = days
+        self.seed = seed
+        self.prefix = prefix
+        self.zipf = zipf
+        self.end = (end or datetime.now(dt_timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda message: None)
+        self.months = max(1, math.ceil(days / 30))
+        if self.num_users * self.months >= transactions:
+            raise ValueError(f"{transactions} transactions cannot cover monthly salaries of {self.num_users} users over {days} days.")
+
+    @staticmethod
+    def user_email(prefix, index):
+        """
+        Email of the generated user of activity rank `index` (0 is the most active).
+        """
+        return f"{prefix}-u{index}@synthetic.local"
+
+    @staticmethod
+    def clear(prefix):
+        """
+        Deletes what a generator with this prefix wrote: its transactions, accounts and users.
+        """
+        with transaction.atomic():
+            Transaction.objects.filter(reference__startswith=f"{prefix}-").delete()
+            LedgerAccount.objects.filter(
+                Q(user__email__startswith=f"{prefix}-", user__email__endswith='@synthetic.local') | Q(user=None, name__startswith=f"{prefix}: ")
+            ).delete()
+            get_user_model().objects.filter(email__startswith=f"{prefix}-", email__endswith='@synthetic.local').delete()
+
+    def run(self):
+        """
+        :return: dict with the number of users, transactions and entries written and the seconds taken
+        """
+        started = time.perf_counter()
+        # The prefix is part of the seed, so datasets with different prefixes get different row ids
+        self.rng = random.Random(f"{self.prefix}:{self.seed}")
+        self._create_accounts()
+
+        salaries = self.num_users * self.months
+        others = self.transactions - salaries
+        transfers = int(others * TRANSFER_SHARE)
+        plan = [('salary', salaries), ('transfer', transfers), ('spend', others - transfers)]
+        self._size_salaries(others - transfers)
+
+        writer = get_writer()
+        number = 0
+        for kind, count in plan:
+            done = 0
+            while done < count:
+                size = min(self.chunk_size, count - done)
+                txns, entries, deltas = getattr(self, f'_{kind}_rows')(number, size)
+                with transaction.atomic():
+                    writer.write(Transaction, TRANSACTION_COLUMNS, txns)
+                    writer.write(JournalEntry, ENTRY_COLUMNS, entries)
+                    writer.add_to_balances({self.account_ids[index]: Decimal(delta).scaleb(-2) for index, delta in deltas.items()})
+                done += size
+                number += size
+                self.progress(f"{number:,} / {self.transactions:,} transactions")
+        return {
+            'users': self.num_users,
+            'transactions': self.transactions,
+            'entries': self.transactions * 2,
+            'seconds': time.perf_counter() - started,
+        }
+
+    # --- Accounts ---
+
+    def _create_accounts(self):
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            [User(email=self.user_email(self.prefix, i), password='!') for i in range(self.num_users)], batch_size=5000
+        )
+        self.user_ids = [user.id for user in users]
+        rng = self.rng
+        accounts = []
+        self.checking, self.savings, self.card = [], [], []
+        for user in users:
+            self.checking.append(len(accounts))
+            accounts.append(LedgerAccount(id=self._new_id(), user=user, name='Checking', type=LedgerAccount.Type.ASSET))
+            self.savings.append(len(accounts))
+            accounts.append(LedgerAccount(id=self._new_id(), user=user, name='Savings', type=LedgerAccount.Type.ASSET))
+            if rng.random() < CARD_HOLDER_SHARE:
+                self.card.append(len(accounts))
+                accounts.append(LedgerAccount(id=self._new_id(), user=user, name='Credit Card', type=LedgerAccount.Type.LIABILITY))
+            else:
+                self.card.append(None)
+
+        # Merchant and payroll accounts belong to no user, like the ledger's other system accounts
+        self.merchants = []  # per category: (account indexes, cumulative Zipf weights)
+        for category, _, names, _, _ in SPEND_MIX:
+            indexes = []
+            for name in names:
+                indexes.append(len(accounts))
+                accounts.append(LedgerAccount(id=self._new_id(), user=None, name=f"{self.prefix}: {name}", type=LedgerAccount.Type.EXPENSE))
+            self.merchants.append((indexes, _cumulative(1 / (rank + 1) ** self.zipf for rank in range(len(names)))))
+        self.payroll = len(accounts)
+        accounts.append(LedgerAccount(id=self._new_id(), user=None, name=f"{self.prefix}: Payroll", type=LedgerAccount.Type.LIABILITY))
+
+        accounts = LedgerAccount.objects.bulk_create(accounts, batch_size=5000)
+        self.account_ids = [account.id for account in accounts]
+        self.increases_on_debit = [account.type in (LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE) for account in accounts]
+
+        self.user_weights = _cumulative(1 / (rank + 1) ** self.zipf for rank in range(self.num_users))
+        self.category_weights = _cumulative(share for _, share, _, _, _ in SPEND_MIX)
+        self.day_offsets = list(range(self.days))
+        self.day_weights = _cumulative(WEEKDAY_WEIGHTS[(self.start + timedelta(days=offset)).weekday()] for offset in self.day_offsets)
+        self.hour_weights = _cumulative(HOUR_WEIGHTS)
+
+    def _size_salaries(self, spends):
+        # Monthly pay proportional to the user's expected spending, so activity and income agree
+        mean_spend = sum(share * median * math.exp(sigma ** 2 / 2) for _, share, _, median, sigma in SPEND_MIX)
+        total_weight = self.user_weights[-1]
+        previous = 0.0
+        self.salaries = []
+        for cumulative in self.user_weights:
+            share = (cumulative - previous) / total_weight
+            previous = cumulative
+            monthly = share * spends * mean_spend / self.months * SALARY_HEADROOM
+            self.salaries.append(max(150_000, int(monthly)))
+
+    # --- Rows ---
+
+    def _timestamps(self, count):
+        rng = self.rng
+        days = rng.choices(self.day_offsets, cum_weights=self.day_weights, k=count)
+        hours = rng.choices(range(24), cum_weights=self.hour_weights, k=count)
+        start = self.start
+        return [start + timedelta(days=day, hours=hour, seconds=rng.randrange(3600)) for day, hour in zip(days, hours)]
+
+    def _new_id(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _post(self, number, description, category, at, debit, credit, cents, txns, entries, deltas):
+        txn_id = self._new_id()
+        txns.append((txn_id, f"{self.prefix}-{number}", description, at, True, category, None))
+        amount = _cents(cents)
+        entries.append((self._new_id(), txn_id, self.account_ids[debit], amount, 'DEBIT', at))
+        entries.append((self._new_id(), txn_id, self.account_ids[credit], amount, 'CREDIT', at))
+        deltas[debit] = deltas.get(debit, 0) + (cents if self.increases_on_debit[debit] else -cents)
+        deltas[credit] = deltas.get(credit, 0) + (-cents if self.increases_on_debit[credit] else cents)
+
+    def _salary_rows(self, first, count):
+        txns, entries, deltas = [], [], {}
+        for n in range(first, first + count):
+            user, month = divmod(n, self.months)
+            at = self.start + timedelta(days=month * 30 + 24, hours=9)
+            if at >= self.end:
+                at = self.end - timedelta(hours=15)
+            self._post(n, 'Salary Payroll', 'Income', at, self.checking[user], self.payroll, self.salaries[user], txns, entries, deltas)
+        return txns, entries, deltas
+
+    def _transfer_rows(self, first, count):
+        rng = self.rng
+        txns, entries, deltas = [], [], {}
+        users = rng.choices(range(self.num_users), cum_weights=self.user_weights, k=count)
+        for n, user, at in zip(range(first, first + count), users, self._timestamps(count)):
+            cents = rng.randrange(20, 500) * 100
+            self._post(n, 'Transfer to Savings', 'Transfers', at, self.savings[user], self.checking[user], cents, txns, entries, deltas)
+        return txns, entries, deltas
+
+    def _spend_rows(self, first, count):
+        rng = self.rng
+        txns, entries, deltas = [], [], {}
+        users = rng.choices(range(self.num_users), cum_weights=self.user_weights, k=count)
+        categories = rng.choices(range(len(SPEND_MIX)), cum_weights=self.category_weights, k=count)
+        for n, user, category, at in zip(range(first, first + count), users, categories, self._timestamps(count)):
+            name, _, merchants, median, sigma = SPEND_MIX[category]
+            indexes, weights = self.merchants[category]
+            merchant = rng.choices(range(len(indexes)), cum_weights=weights)[0]
+            cents = max(50, int(rng.lognormvariate(math.log(median), sigma)))
+            source = self.card[user] if self.card[user] is not None and rng.random() < CARD_SPEND_SHARE else self.checking[user]
+            self._post(n, merchants[merchant], name, at, indexes[merchant], source, cents, txns, entries, deltas)
+        return txns, entries, deltas
@@ -0,0 +1,105 @@
+import logging
+from datetime import date, timedelta
+from celery import shared_task, group
+from django.conf import settings
+from django.utils import timezone
+from .models import LedgerAccount
+from .cards import CardAuthorizationService
+from .billing import BillingService
+from .maintenance import LedgerMaintenanceService
+
+logger = logging.getLogger(__name__)
+
+# Queues (see CELERY_TASK_ROUTES): settlement runs on ledger.critical, billing on
+# ledger.default, and maintenance on ledger.bulk so a long rollup never delays a settlement.
+# Nothing here returns a result anyone waits for, so every task is fire-and-forget.
+
+def _iter_chunks(ids, chunk_size=None):
+    chunk_size = chunk_size or settings.LEDGER_MAINTENANCE_CHUNK_SIZE
+    chunk = []
+    for value in ids:
+        chunk.append(str(value))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _fan_out(task, ids, *args):
+    """
+    Publishes one `task(chunk, *args)` per chunk of `ids` as a single group.
+    Chunks are built lazily, so fanning out over every account never holds all the ids.
+    """
+    group(task.si(chunk, *args) for chunk in _iter_chunks(ids)).apply_async()
+
+def _all_account_ids():
+    return LedgerAccount.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=5000)
+
+@shared_task(ignore_result=True)
+def settle_card_holds(batch_size=500):
+    """
+    Settles pending card holds into ledger postings, one batch at a time.
+    Re-queues itself while full batches keep coming back.
+    """
+    settled = CardAuthorizationService.settle_pending_holds(batch_size)
+    if settled == batch_size:
+        settle_card_holds.delay(batch_size)
+    return settled
+
+@shared_task(ignore_result=True)
+def run_subscription_billing(run_date=None, chunk_size=500):
+    """
+    Fans the subscriptions due on `run_date` (ISO date, defaults to today) out to
+    bill_subscription_chunk tasks. Safe to re-run: billing is idempotent per cycle.
+    """
+    run_date = run_date or timezone.localdate().isoformat()
+    chunks = 0
+    for subscription_ids in BillingService.iter_due_chunks(date.fromisoformat(run_date), chunk_size):
+        bill_subscription_chunk.delay([str(subscription_id) for subscription_id in subscription_ids], run_date)
+        chunks += 1
+    return chunks
+
+@shared_task(ignore_result=True)
+def bill_subscription_chunk(subscription_ids, run_date):
+    return BillingService.bill_chunk(subscription_ids, date.fromisoformat(run_date))
+
+@shared_task(ignore_result=True)
+def check_ledger_integrity(repair=False):
+    """
+    Checks every account balance against its journal entries, fanned out in chunks.
+    With `repair`, mismatched accounts are queued for a rebuild.
+    """
+    _fan_out(check_account_balances, _all_account_ids(), repair)
+
+@shared_task(ignore_result=True)
+def check_account_balances(account_ids, repair=False):
+    mismatches = LedgerMaintenanceService.check_balances(account_ids)
+    for account_id, stored, expected in mismatches:
+        logger.error(f"Ledger integrity: account {account_id} balance {stored} != {expected} from entries")
+    if mismatches and repair:
+        rebuild_account_balances.delay([str(account_id) for account_id, _, _ in mismatches])
+    return len(mismatches)
+
+@shared_task(ignore_result=True, priority=0)
+def rebuild_account_balances(account_ids):
+    # Top priority on its queue: a wrong balance is served to users until this runs
+    return LedgerMaintenanceService.rebuild_balances(account_ids)
+
+@shared_task(ignore_result=True)
+def run_daily_rollup(day=None):
+    """
+    Rolls up `day` (ISO date, defaults to yesterday) for every account with activity on it.
+    """
+    day = date.fromisoformat(day) if day else timezone.localdate() - timedelta(days=1)
+    _fan_out(rollup_accounts, LedgerMaintenanceService.active_account_ids(day), day.isoformat())
+
+@shared_task(ignore_result=True)
+def rollup_accounts(account_ids, day):
+    return LedgerMaintenanceService.rollup_day(account_ids, date.fromisoformat(day))
+
+@shared_task(ignore_result=True)
+def archive_ledger_records():
+    before = timezone.now() - timedelta(days=settings.LEDGER_ARCHIVE_AFTER_DAYS)
+    deleted = LedgerMaintenanceService.archive(before)
+    logger.info(f"Ledger archival before {before:%Y-%m-%d}: {deleted}")
+    return deleted
@@ -0,0 +1,274 @@
+import contextvars
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Phases of a posting, in the order they run
+VALIDATE = 'validate'
+LOCK_ACQUIRE = 'lock_acquire'
+INSERT_ENTRIES = 'insert_entries'
+BALANCE_UPDATE = 'balance_update'
+DERIVED_UPDATES = 'derived_updates'  # outbox, spending cube, goals
+COMMIT = 'commit'
+
+# Shared copy of the ring buffers of every process, newest first
+SPANS_KEY = 'ledger:spans'
+
+_current = contextvars.ContextVar('ledger_trace', default=None)
+
+
+class PostingSpan:
+    """
+    Timing of one LedgerService posting call, split into phases.
+
+    Phases are timed as laps: lap(phase) charges the time since the previous lap to
+    `phase`, so a phase entered several times (validation before and after the
+    inserts) accumulates. `lock_waits` maps each locked account to the time spent
+    acquiring its row lock.
+    """
+    __slots__ = ('name', 'started_at', 'duration', 'phases', 'lock_waits', 'entries', 'nested', 'error', '_start', '_last')
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.phases = {}
+        self.lock_waits = {}
+        self.entries = 0
+        # Inside a caller's atomic block the 'commit' phase is a savepoint release; the real commit is the caller's
+        self.nested = transaction.get_connection().in_atomic_block
+        self.error = None
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def locked(self, account_ids, wait):
+        """
+        Records a lock acquisition that covered `account_ids` and took `wait` seconds.
+        """
+        for account_id in account_ids:
+            self.lock_waits[str(account_id)] = wait
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self._start
+        self.error = error
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration': self.duration,
+            'phases': self.phases,
+            'lock_waits': self.lock_waits,
+            'entries': self.entries,
+            'nested': self.nested,
+            'error': self.error,
+        }
+
+
+class NullSpan:
+    """
+    Stands in for a span when the posting is not sampled.
+    """
+    __slots__ = ()
+
+    def lap(self, phase):
+        pass
+
+    def locked(self, account_ids, wait):
+        pass
+
+    @property
+    def entries(self):
+        return 0
+
+    @entries.setter
+    def entries(self, value):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class RingBufferExporter:
+    """
+    Keeps the last LEDGER_TRACE_BUFFER_SIZE spans in process memory; nothing external
+    is needed. With Redis configured, spans are also pushed (every second, in one
+    pipeline) to a capped Redis list, so reports can be built from any process.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or settings.LEDGER_TRACE_BUFFER_SIZE
+        self.spans = deque(maxlen=self.capacity)
+        self._unshared = deque(maxlen=self.capacity)
+        self._shared_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        record = span.as_dict()
+        self.spans.append(record)
+        if get_redis() is not None:
+            self._unshared.append(record)
+            if time.monotonic() - self._shared_at >= 1.0:
+                self.share()
+
+    def share(self):
+        client = get_redis()
+        if client is None or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._shared_at = time.monotonic()
+            records = []
+            while self._unshared:
+                records.append(json.dumps(self._unshared.popleft()))
+            if records:
+                pipe = client.pipeline(transaction=False)
+                pipe.lpush(SPANS_KEY, *records)
+                pipe.ltrim(SPANS_KEY, 0, self.capacity - 1)
+                pipe.execute()
+        except Exception:
+            logger.warning("Could not share ledger spans through Redis", exc_info=True)
+        finally:
+            self._lock.release()
+
+    def recent(self):
+        """
+        :return: span dicts, newest first: the shared buffer if there is one, else this process's
+        """
+        client = get_redis()
+        if client is None:
+            return list(reversed(self.spans))
+        self.share()
+        return [json.loads(record) for record in client.lrange(SPANS_KEY, 0, -1)]
+
+
+class LogExporter:
+    """
+    One structured (JSON) log line per span, for log-based pipelines.
+    """
+
+    def export(self, span):
+        logger.info("ledger.span %s", json.dumps(span.as_dict()))
+
+
+EXPORTERS = {
+    'ring': RingBufferExporter,
+    'log': LogExporter,
+}
+
+_exporters = None
+
+
+def get_exporters():
+    """
+    The exporters of a comma-separated LEDGER_TRACE_EXPORTERS: names from EXPORTERS or
+    dotted paths to classes with export(span).
+    """
+    global _exporters
+    if _exporters is None:
+        _exporters = [
+            EXPORTERS[name]() if name in EXPORTERS else import_string(name)()
+            for name in (name.strip() for name in settings.LEDGER_TRACE_EXPORTERS.split(','))
+            if name
+        ]
+    return _exporters
+
+
+def get_ring_buffer():
+    for exporter in get_exporters():
+        if isinstance(exporter, RingBufferExporter):
+            return exporter
+    return None
+
+
+def current_span():
+    """
+    The span of the posting being traced, or NULL_SPAN.
+    """
+    return _current.get() or NULL_SPAN
+
+
+def traced(name):
+    """
+    Decorator tracing a posting method: a sampled call (LEDGER_TRACE_SAMPLE_RATE) gets
+    a PostingSpan, reachable through current_span(), which is exported when it returns
+    or raises. Place it below @staticmethod.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            rate = settings.LEDGER_TRACE_SAMPLE_RATE
+            if not rate or (rate < 1 and random.random() >= rate) or _current.get() is not None:
+                return method(*args, **kwargs)
+            span = PostingSpan(name)
+            token = _current.set(span)
+            error = None
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                _current.reset(token)
+                span.finish(error)
+                for exporter in get_exporters():
+                    try:
+                        exporter.export(span)
+                    except Exception:
+                        logger.warning("Ledger span exporter %s failed", type(exporter).__name__, exc_info=True)
+        return wrapper
+    return decorator
+
+
+def hot_accounts(spans, top=10):
+    """
+    Aggregates spans per account, hottest (most total lock wait) first.
+
+    :return: list of dicts {account_id, postings, lock_wait, max_lock_wait, p95_lock_wait, posting_time, errors}
+    """
+    stats = {}
+    for span in spans:
+        for account_id, wait in span['lock_waits'].items():
+            entry = stats.get(account_id)
+            if entry is None:
+                entry = stats[account_id] = {'account_id': account_id, 'waits': [], 'posting_time': 0.0, 'errors': 0}
+            entry['waits'].append(wait)
+            entry['posting_time'] += span['duration']
+            if span['error']:
+                entry['errors'] += 1
+    report = []
+    for entry in stats.values():
+        waits = sorted(entry.pop('waits'))
+        entry.update(
+            postings=len(waits),
+            lock_wait=sum(waits),
+            max_lock_wait=waits[-1],
+            p95_lock_wait=waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+        )
+        report.append(entry)
+    report.sort(key=lambda entry: entry['lock_wait'], reverse=True)
+    return report[:top]
+
+
+def phase_totals(spans):
+    """
+    :return: {phase: total seconds} over the spans, for the time breakdown of a report
+    """
+    totals = {}
+    for span in spans:
+        for phase, seconds in span['phases'].items():
+            totals[phase] = totals.get(phase, 0.0) + seconds
+    return totals
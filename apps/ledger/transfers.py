@@ -0,0 +1,127 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
+from .models import LedgerAccount, JournalEntry
+from .services import LedgerService
+
+# normalised email -> id of that user's default account
+RECIPIENT_KEY = 'ledger:transfers:recipient:{}'
+RECIPIENT_TTL = 3600
+
+class TransferService:
+    @staticmethod
+    def resolve_recipients(emails):
+        """
+        Resolves contact emails to the recipients' default LedgerAccount ids.
+        Served from the cached email->account index; misses are resolved together in two
+        queries and cached. Unknown emails are left out of the result.
+
+        :return: dict {normalised email: account_id}
+        """
+        emails = {email.strip().lower() for email in emails}
+        keys = {RECIPIENT_KEY.format(email): email for email in emails}
+        resolved = {keys[key]: account_id for key, account_id in cache.get_many(keys).items()}
+
+        missing = emails - set(resolved)
+        if missing:
+            User = get_user_model()
+            users = dict(
+                User.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=missing, is_active=True)
+                .values_list('id', 'email_lower')
+            )
+            # Oldest asset account per user wins, matching LedgerService.get_default_account
+            found = {}
+            for user_id, account_id in LedgerAccount.objects.filter(
+                user_id__in=users, type=LedgerAccount.Type.ASSET
+            ).order_by('-created_at').values_list('user_id', 'id'):
+                found[users[user_id]] = account_id
+
+            cache.set_many({RECIPIENT_KEY.format(email): account_id for email, account_id in found.items()}, RECIPIENT_TTL)
+            resolved.update(found)
+        return resolved
+
+    @staticmethod
+    def forget_recipients(emails):
+        cache.delete_many([RECIPIENT_KEY.format(email.strip().lower()) for email in emails])
+
+    @staticmethod
+    def _source_account(user, from_account_id=None):
+        if from_account_id is None:
+            account = LedgerService.get_default_account(user)
+        else:
+            account = LedgerAccount.objects.filter(id=from_account_id, user=user).first()
+        if account is None:
+            raise ValidationError("Source account not found.")
+        return account
+
+    @staticmethod
+    def _transfer_legs(source, recipient_account_id, amount):
+        return [
+            {'account_id': source.id, 'amount': amount, 'type': JournalEntry.EntryType.CREDIT},
+            {'account_id': recipient_account_id, 'amount': amount, 'type': JournalEntry.EntryType.DEBIT},
+        ]
+
+    @staticmethod
+    def _check_recipients(source, recipients, emails):
+        unknown = [email for email in emails if email.strip().lower() not in recipients]
+        if unknown:
+            raise ValidationError(f"No account found for {', '.join(unknown)}.")
+
+        currencies = dict(LedgerAccount.objects.filter(id__in=recipients.values()).values_list('id', 'currency'))
+        for email, account_id in recipients.items():
+            if account_id not in currencies:
+                # Account vanished since it was cached
+                TransferService.forget_recipients([email])
+                raise ValidationError(f"No account found for {email}.")
+            if account_id == source.id:
+                raise ValidationError("Cannot transfer to the source account.")
+            if currencies[account_id] != source.currency:
+                raise ValidationError(f"{email} cannot receive {source.currency}.")
+
+    @staticmethod
+    def transfer(user, email, amount, description='', from_account_id=None, reference=None):
+        """
+        Sends `amount` from one of the user's accounts (their default account if not given)
+        to the default account of the user registered under `email`, as a single two-leg
+        posting with both accounts locked in primary key order.
+
+        :return: Transaction instance
+        """
+        source = TransferService._source_account(user, from_account_id)
+        recipients = TransferService.resolve_recipients([email])
+        TransferService._check_recipients(source, recipients, [email])
+
+        return LedgerService.create_transaction(
+            user=user,
+            description=description or f"Transfer to {email}",
+            entries_data=TransferService._transfer_legs(source, recipients[email.strip().lower()], Decimal(str(amount))),
+            reference=reference
+        )
+
+    @staticmethod
+    def payout(user, payouts, description='', from_account_id=None):
+        """
+        Fans one source account out to many recipients in a single batched posting:
+        one transaction per payout, all accounts locked once.
+
+        :param payouts: List of dicts {'email', 'amount', 'description' (optional)}
+        :return: List of (payout, Transaction) pairs
+        """
+        source = TransferService._source_account(user, from_account_id)
+        emails = [payout['email'] for payout in payouts]
+        recipients = TransferService.resolve_recipients(emails)
+        TransferService._check_recipients(source, recipients, emails)
+
+        txns = LedgerService.create_transactions_batch([
+            {
+                'description': payout.get('description') or description or f"Payout to {payout['email']}",
+                'entries': TransferService._transfer_legs(
+                    source, recipients[payout['email'].strip().lower()], Decimal(str(payout['amount']))
+                ),
+            }
+            for payout in payouts
+        ])
+        return list(zip(payouts, txns))
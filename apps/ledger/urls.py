@@ -4,6 +4,8 @@ from .views import (
     LedgerAccountViewSet, TransactionViewSet, 
     CardViewSet, SubscriptionViewSet, 
     FinancialGoalViewSet, ContactViewSet,
+    TrialBalanceView, TransferView, PayoutView, SpendingAnalyticsView, AccountStatementView,
+    EventStreamTokenView,
     dashboard_stats  # <-- Import this
 )
 
@@ -16,6 +18,12 @@ router.register(r'goals', FinancialGoalViewSet, basename='goal')
 router.register(r'contacts', ContactViewSet, basename='contact')
 
 urlpatterns = [
+    path('accounts/<uuid:pk>/statement/', AccountStatementView.as_view(), name='account-statement'),
     path('', include(router.urls)),
     path('dashboard/data/', dashboard_stats, name='dashboard-stats'), # <-- Add this line
+    path('events/token/', EventStreamTokenView.as_view(), name='event-stream-token'),
+    path('analytics/spending/', SpendingAnalyticsView.as_view(), name='spending-analytics'),
+    path('trial-balance/', TrialBalanceView.as_view(), name='trial-balance'),
+    path('transfers/', TransferView.as_view(), name='transfer'),
+    path('transfers/batch/', PayoutView.as_view(), name='transfer-batch'),
 ]
@@ -0,0 +1,76 @@
+from array import array
+
+
+class SpendWindow:
+    __slots__ = ('name', 'bucket_seconds', 'size')
+
+    def __init__(self, name, bucket_seconds, size):
+        self.name = name
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+
+    @property
+    def seconds(self):
+        return self.bucket_seconds * self.size
+
+    def bucket(self, timestamp):
+        return int(timestamp) // self.bucket_seconds
+
+
+# Rolling windows checked on every card authorization; order matches the Card *_limit fields
+SPEND_WINDOWS = (
+    SpendWindow('daily', 3600, 24),     # 24 hourly buckets
+    SpendWindow('weekly', 86400, 7),    # 7 daily buckets
+    SpendWindow('monthly', 86400, 30),  # 30 daily buckets
+)
+
+
+class RingCounter:
+    """
+    Rolling sum over a fixed number of time buckets.
+
+    Buckets live in a ring (`array('q')` of minor units) and a running total is
+    kept alongside, so reading the window is O(1). Advancing the clock clears
+    only the buckets that fell out of the window, at most `size` of them.
+    The Redis store runs the same algorithm inside its Lua script.
+    """
+    __slots__ = ('window', 'buckets', 'epoch', 'total')
+
+    def __init__(self, window):
+        self.window = window
+        self.buckets = array('q', [0] * window.size)
+        self.epoch = None
+        self.total = 0
+
+    def _advance(self, timestamp):
+        now = self.window.bucket(timestamp)
+        if self.epoch is None:
+            self.epoch = now
+            return now
+        if now > self.epoch:
+            size = self.window.size
+            for step in range(1, min(now - self.epoch, size) + 1):
+                slot = (self.epoch + step) % size
+                self.total -= self.buckets[slot]
+                self.buckets[slot] = 0
+            self.epoch = now
+        return now
+
+    def total_at(self, timestamp):
+        self._advance(timestamp)
+        return self.total
+
+    def add(self, timestamp, amount):
+        bucket = self.window.bucket(timestamp)
+        self._advance(timestamp)
+        if bucket <= self.epoch - self.window.size:
+            return  # already outside the window
+        self.buckets[bucket % self.window.size] += amount
+        self.total += amount
+
+    def snapshot(self):
+        """
+        Returns (epoch, total, {slot: amount}) for the non-empty buckets.
+        """
+        slots = {slot: amount for slot, amount in enumerate(self.buckets) if amount}
+        return self.epoch, self.total, slots
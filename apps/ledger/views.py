@@ -2,17 +2,22 @@ import logging
 import json
 from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework import generics, viewsets
+from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework import generics, viewsets, mixins
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
 from .models import JournalEntry, IdempotencyKey, FinancialGoal, Contact, Transaction, LedgerAccount, Card, Subscription
 from .serializers import (
     TransactionCreateSerializer, 
     TransactionSerializer, 
+    TransactionCategorySerializer,
+    TransferSerializer,
+    PayoutSerializer,
     TrialBalanceSerializer,
     AccountStatementEntrySerializer,
     FinancialGoalSerializer,
@@ -21,9 +26,18 @@ from .serializers import (
     ContactSerializer,
     LedgerAccountSerializer,
     CardSerializer,
+    CardAuthorizationSerializer,
+    CardHoldSerializer,
     SubscriptionSerializer
 )
 from .services import LedgerService
+from .analytics import SpendingAnalyticsService
+from .response_cache import UserCachedResponseMixin, cache_per_user, account_validators, conditional_response
+from .cards import CardAuthorizationService
+from .transfers import TransferService
+from .contacts import ContactSearchService
+from .card_state import get_card_state_store
+from .realtime import stream_url
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +46,14 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class ContactCursorPagination(CursorPagination):
+    # Keyset pages stay constant-cost however deep a 100k-contact list is scrolled: the
+    # (user, name, id) index serves each page, and id makes the order total when names repeat
+    ordering = ('name', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 class TransactionCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -81,8 +103,7 @@ class TransactionCreateView(APIView):
             except ObjectDoesNotExist as e:
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
-                logger.error(f"Transaction creation failed: {str(e)}", exc_info=True)
-                print(f"DEBUG ERROR: {e}")
+                logger.exception("Transaction creation failed: %s", e)
                 return Response(
                     {"error": "An internal error occurred processing the transaction."}, 
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -90,14 +111,70 @@ class TransactionCreateView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TransferView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            txn = TransferService.transfer(
+                user=request.user,
+                email=data['email'],
+                amount=data['amount'],
+                description=data.get('description', ''),
+                from_account_id=data.get('from_account_id'),
+                reference=data.get('reference') or None
+            )
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(TransactionSerializer(txn).data, status=status.HTTP_201_CREATED)
+
+class PayoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = PayoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            results = TransferService.payout(
+                user=request.user,
+                payouts=data['payouts'],
+                description=data.get('description', ''),
+                from_account_id=data.get('from_account_id')
+            )
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "count": len(results),
+            "results": [
+                {
+                    "email": payout['email'],
+                    "amount": str(payout['amount']),
+                    "transaction_id": txn.id,
+                    "reference": txn.reference,
+                }
+                for payout, txn in results
+            ]
+        }, status=status.HTTP_201_CREATED)
+
 class TrialBalanceView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         try:
-            data = LedgerService.get_trial_balance(request.user)
+            currency = request.query_params.get('currency')
+            data = LedgerService.get_trial_balance(request.user, currency=currency.upper() if currency else None)
             serializer = TrialBalanceSerializer(data)
             return Response(serializer.data)
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Trial Balance Error: {str(e)}", exc_info=True)
             return Response(
@@ -110,6 +187,14 @@ class AccountStatementView(generics.ListAPIView):
     serializer_class = AccountStatementEntrySerializer
     pagination_class = StandardResultsSetPagination
 
+    def get(self, request, *args, **kwargs):
+        # ETag and Last-Modified come from the account row alone: an unchanged statement
+        # is answered with a 304 before any entry is read
+        validators = account_validators(request, kwargs['pk'])
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        return conditional_response(request, *validators, lambda: super(AccountStatementView, self).get(request, *args, **kwargs))
+
     def get_queryset(self):
         account_id = self.kwargs['pk']
         # Ensure user owns the account
@@ -136,18 +221,18 @@ class LedgerAccountListView(generics.ListAPIView):
     def get_queryset(self):
         return LedgerAccount.objects.filter(user=self.request.user)
 
-class FinancialGoalViewSet(viewsets.ModelViewSet):
+class FinancialGoalViewSet(UserCachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = FinancialGoalSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None 
 
     def get_queryset(self):
-        return FinancialGoal.objects.filter(user=self.request.user).order_by('deadline')
+        return FinancialGoal.objects.filter(user=self.request.user).prefetch_related('accounts').order_by('deadline')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(UserCachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
@@ -155,7 +240,23 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Transaction.objects.filter(entries__account__user=self.request.user).distinct().order_by('-created_at')
 
-class LedgerAccountViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=True, methods=['post'])
+    def category(self, request, pk=None):
+        """
+        Sets the category by hand. Hand-set categories are what the categoriser trains on.
+        """
+        serializer = TransactionCategorySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            txn = Transaction.objects.select_for_update().get(id=self.get_object().id)
+            previous = txn.category
+            txn.category = serializer.validated_data['category']
+            txn.category_confidence = None
+            txn.save(update_fields=['category', 'category_confidence'])
+            SpendingAnalyticsService.recategorise([txn.id], previous, txn.category)
+        return Response(TransactionSerializer(txn).data)
+
+class LedgerAccountViewSet(UserCachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = LedgerAccountSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None
@@ -163,18 +264,64 @@ class LedgerAccountViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return LedgerAccount.objects.filter(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        # Per-account validators: postings to the user's other accounts leave this ETag alone
+        validators = account_validators(request, kwargs['pk'])
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request, *validators, lambda: mixins.RetrieveModelMixin.retrieve(self, request, *args, **kwargs)
+        )
+
 class ContactViewSet(viewsets.ModelViewSet):
     serializer_class = ContactSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    pagination_class = ContactCursorPagination
 
     def get_queryset(self):
-        return Contact.objects.filter(user=self.request.user).order_by('name')
+        if self.action != 'list':
+            return Contact.objects.filter(user=self.request.user)
+        return ContactSearchService.search(
+            self.request.user,
+            self.request.query_params.get('search', ''),
+            fuzzy=self.request.query_params.get('fuzzy') in ('1', 'true')
+        )
+
+    def _contacts_changed(self):
+        user = self.request.user
+        transaction.on_commit(lambda: ContactSearchService.contacts_changed(user))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-
-class CardViewSet(viewsets.ModelViewSet):
+        self._contacts_changed()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self._contacts_changed()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        self._contacts_changed()
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Type-ahead: contacts whose name, any word of it, or email starts with ?q=.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not query:
+            return Response([])
+
+        return Response([
+            {'id': contact_id, 'name': name, 'email': email}
+            for contact_id, name, email in ContactSearchService.suggest(request.user, query, limit)
+        ])
+
+class CardViewSet(UserCachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = CardSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -206,7 +353,30 @@ class CardViewSet(viewsets.ModelViewSet):
             name=auto_name 
         )
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        card = serializer.save()
+        # Freeze/limit changes must reach the authorization hot path
+        store = get_card_state_store()
+        transaction.on_commit(lambda: store.invalidate_card(card.id))
+
+    @action(detail=True, methods=['post'])
+    def authorize(self, request, pk=None):
+        card = self.get_object()
+        serializer = CardAuthorizationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            hold = CardAuthorizationService.authorize(
+                card,
+                serializer.validated_data['amount'],
+                merchant=serializer.validated_data.get('merchant', '')
+            )
+        except ValidationError as e:
+            return Response({"error": e.messages, "code": e.code}, status=status.HTTP_402_PAYMENT_REQUIRED)
+
+        return Response(CardHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+class SubscriptionViewSet(UserCachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = SubscriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None
@@ -217,29 +387,64 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class EventStreamTokenView(APIView):
+    """
+    Credentials for the real-time event stream: open `stream_url` with an EventSource
+    within REALTIME_TOKEN_MAX_AGE seconds.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({"stream_url": stream_url(request.user.id)})
+
+class SpendingAnalyticsView(APIView):
+    """
+    Spending over a period (?start=&end=, ISO dates, default the last 30 days) broken down
+    by ?group_by=category|merchant|account|day|month, largest first (?limit= caps the rows, at most 100).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            start, end = SpendingAnalyticsService.parse_period(params.get('start'), params.get('end'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(params['limit']), 1), 100) if params.get('limit') else None
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = SpendingAnalyticsService.spending(request.user, start, end, params.get('group_by', 'category'), limit)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_per_user
 def dashboard_stats(request):
-    from django.db.models import Sum
-    # Calculate simple total spending (Sum of all negative transactions)
-    # Note: Using JournalEntry because Transaction doesn't have an amount field directly in this schema
-    total_spending = JournalEntry.objects.filter(
-        account__user=request.user, 
-        type=JournalEntry.EntryType.DEBIT
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    # Mock graph data so the frontend doesn't crash
-    chart_data = [
-        {"month": "Jan", "amount": 1200},
-        {"month": "Feb", "amount": 1900},
-        {"month": "Mar", "amount": 300},
-        {"month": "Apr", "amount": 500},
-        {"month": "May", "amount": 200},
-        {"month": "Jun", "amount": 3000},
-    ]
+    """
+    Monthly spending for the dashboard chart, from the spending cube.
+    ?period= is a number of months ('12 months' by default).
+    """
+    period = request.GET.get('period', '12 months')
+    try:
+        months = min(max(int(period.split()[0]), 1), 60)
+    except (ValueError, IndexError):
+        return Response({"error": "period must be a number of months, e.g. '12 months'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    currency, series = SpendingAnalyticsService.monthly_totals(request.user, months)
+    top_categories = SpendingAnalyticsService.spending(
+        request.user, series[0][0], timezone.localdate(), group_by='category', limit=5
+    )['breakdown']
 
     return Response({
-        "total_spending": float(total_spending),
-        "chart_data": chart_data,
-        "period": request.GET.get('period', '12 months')
+        "total_spending": float(sum(amount for _, amount in series)),
+        "currency": currency,
+        "chart_data": [{"month": month.strftime('%b'), "amount": float(amount)} for month, amount in series],
+        "top_categories": [
+            {"category": row['key'], "amount": float(row['amount'])} for row in top_categories if row['currency'] == currency
+        ],
+        "period": period
     })
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import StatementImport
+
+@admin.register(StatementImport)
+class StatementImportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'account', 'format', 'status', 'rows_processed', 'rows_imported', 'rows_skipped', 'rows_rejected', 'created_at')
+    list_filter = ('status', 'format')
+    search_fields = ('user__email',)
+    readonly_fields = ('checkpoint', 'checkpoint_state', 'errors')
@@ -0,0 +1,67 @@
+import uuid
+from django.db import models
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+
+class StatementImport(models.Model):
+    """
+    A bank statement file being posted to one ledger account.
+
+    The import runs in slices and commits after every batch of rows together with
+    `checkpoint`, the parser position just past the last row of that batch, so a
+    restarted import continues exactly where the last committed batch ended.
+    """
+    class Format(models.TextChoices):
+        CSV = 'CSV', _('CSV')
+        OFX = 'OFX', _('OFX')
+        CAMT = 'CAMT', _('CAMT.053')
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETED = 'COMPLETED', _('Completed')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='statement_imports')
+    account = models.ForeignKey('ledger.LedgerAccount', on_delete=models.CASCADE, related_name='statement_imports')
+    file = models.FileField(upload_to='statement_imports/%Y/%m/')
+    format = models.CharField(max_length=4, choices=Format.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+
+    # Parser position after the last committed batch: a byte offset (CSV, OFX) or an entry count (CAMT)
+    checkpoint = models.BigIntegerField(default=0)
+    # Duplicate-detection state carried across batches (see StatementImportService)
+    checkpoint_state = models.JSONField(default=dict, blank=True)
+    total_bytes = models.BigIntegerField(default=0)
+    rows_processed = models.PositiveBigIntegerField(default=0)
+    rows_imported = models.PositiveBigIntegerField(default=0)
+    # Rows already in the ledger (same reference), e.g. from an overlapping statement
+    rows_skipped = models.PositiveBigIntegerField(default=0)
+    rows_rejected = models.PositiveBigIntegerField(default=0)
+    # The first rejected rows and the reason, [{'position', 'error'}]
+    errors = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    @property
+    def progress(self):
+        """
+        Share of the file consumed, 0-1 (checkpoints are byte offsets in every format).
+        """
+        if self.status == self.Status.COMPLETED:
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.checkpoint / self.total_bytes, 1.0)
+
+    def __str__(self):
+        return f"{self.format} import into {self.account_id} ({self.status})"
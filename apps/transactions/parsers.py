@@ -0,0 +1,325 @@
+import csv
+import re
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# One statement line. amount is signed from the account holder's side: positive = money in.
+StatementRecord = namedtuple('StatementRecord', ['date', 'amount', 'description', 'reference', 'currency'])
+
+
+class StatementParseError(ValueError):
+    pass
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y%m%d', '%d/%m/%Y', '%d.%m.%Y')
+
+
+def parse_amount(value):
+    """
+    Accepts '1234.56', '1,234.56', '1.234,56' and '1234,56': with both separators present
+    the last one is the decimal point.
+    """
+    text = value.strip().replace(' ', '')
+    if ',' in text and '.' in text:
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        text = text.replace(',', '.')
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise StatementParseError(f"Invalid amount: {value!r}")
+
+
+def parse_date(value):
+    """
+    Accepts the DATE_FORMATS; trailing time parts (ISO 'T...', OFX 'HHMMSS[.XXX][TZ]') are ignored.
+    """
+    text = value.strip()
+    if text[:8].isdigit():
+        text = text[:8]
+    elif '-' in text[:10]:
+        text = text[:10]
+    else:
+        text = text.split(' ')[0]
+    for pattern in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, pattern).date()
+        except ValueError:
+            continue
+    raise StatementParseError(f"Invalid date: {value!r}")
+
+
+class StatementParser:
+    """
+    Streams StatementRecords out of a binary file object with bounded memory.
+
+    parse() yields (record, checkpoint) pairs. The checkpoint is an opaque integer: passing
+    the last one back as `start` resumes right after that record. Line-based formats use the
+    byte offset, so resuming is a seek. A row that cannot be read is yielded as its
+    StatementParseError in place of the record; a file that cannot be read at all raises.
+    """
+    format = None
+
+    def parse(self, stream, start=0):
+        raise NotImplementedError
+
+    @staticmethod
+    def _lines(stream, start):
+        """
+        Yields (decoded line, byte offset after it) from `start` on.
+        """
+        stream.seek(start)
+        offset = start
+        for raw in stream:
+            offset += len(raw)
+            yield raw.decode('utf-8-sig', errors='replace'), offset
+
+
+class CSVStatementParser(StatementParser):
+    """
+    CSV with a header row. Recognised columns (case-insensitive): date, amount, description,
+    reference (optional), currency (optional); or debit/credit columns instead of amount.
+    """
+    format = 'CSV'
+    COLUMNS = {
+        'date': ('date', 'booking date', 'posted', 'transaction date'),
+        'amount': ('amount', 'value'),
+        'debit': ('debit', 'withdrawal', 'paid out'),
+        'credit': ('credit', 'deposit', 'paid in'),
+        'description': ('description', 'details', 'narrative', 'memo', 'payee'),
+        'reference': ('reference', 'id', 'transaction id', 'fitid'),
+        'currency': ('currency', 'ccy'),
+    }
+
+    def _header(self, stream):
+        stream.seek(0)
+        first = stream.readline()
+        header_end = len(first)
+        text = first.decode('utf-8-sig', errors='replace')
+        if not text.strip():
+            raise StatementParseError("CSV file is empty")
+        try:
+            dialect = csv.Sniffer().sniff(text, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        names = [name.strip().lower() for name in next(csv.reader([text], dialect))]
+
+        columns = {}
+        for key, aliases in self.COLUMNS.items():
+            for index, name in enumerate(names):
+                if name in aliases:
+                    columns[key] = index
+                    break
+        if 'date' not in columns or not ('amount' in columns or {'debit', 'credit'} <= columns.keys()):
+            raise StatementParseError(f"CSV header must name a date and an amount (or debit/credit) column, got {names}")
+        return header_end, dialect, columns
+
+    def parse(self, stream, start=0):
+        header_end, dialect, columns = self._header(stream)
+        position = [max(start, header_end)]
+
+        def lines():
+            for line, offset in self._lines(stream, position[0]):
+                position[0] = offset
+                yield line
+
+        for row in csv.reader(lines(), dialect):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                yield self._record(row, columns), position[0]
+            except StatementParseError as e:
+                yield e, position[0]
+
+    @staticmethod
+    def _record(row, columns):
+        def cell(key):
+            return row[columns[key]].strip() if key in columns and columns[key] < len(row) else ''
+
+        if 'amount' in columns:
+            amount = parse_amount(cell('amount'))
+        else:
+            amount = (parse_amount(cell('credit')) if cell('credit') else 0) - (parse_amount(cell('debit')) if cell('debit') else 0)
+        return StatementRecord(
+            date=parse_date(cell('date')),
+            amount=amount,
+            description=cell('description'),
+            reference=cell('reference') or None,
+            currency=cell('currency').upper() or None,
+        )
+
+
+class OFXStatementParser(StatementParser):
+    """
+    OFX 1.x (SGML) and 2.x (XML): one record per <STMTTRN> block, read line by line.
+    """
+    format = 'OFX'
+    TAG = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+    def parse(self, stream, start=0):
+        currency = None
+        block = None
+        for line, offset in self._lines(stream, start):
+            upper = line.upper()
+            if '<CURDEF>' in upper:
+                currency = upper.split('<CURDEF>')[1][:3]
+            if '<STMTTRN>' in upper:
+                block = {}
+            if block is not None:
+                for tag, value in self.TAG.findall(line):
+                    if value.strip():
+                        block[tag.upper()] = value.strip()
+            if '</STMTTRN>' in upper and block is not None:
+                try:
+                    yield StatementRecord(
+                        date=parse_date(block.get('DTPOSTED', '')),
+                        amount=parse_amount(block.get('TRNAMT', '')),
+                        description=' '.join(filter(None, [block.get('NAME'), block.get('MEMO')])),
+                        reference=block.get('FITID'),
+                        currency=block.get('CURRENCY') or currency,
+                    ), offset
+                except StatementParseError as e:
+                    yield e, offset
+                block = None
+
+
+class CAMTStatementParser(StatementParser):
+    """
+    ISO 20022 camt.053 / camt.052: one record per <Ntry>, namespace-agnostic. The file is
+    fed to expat in chunks and only the entries are built as elements, one at a time, so
+    memory stays bounded whatever the file size.
+
+    The checkpoint is the byte offset of an entry's closing tag. XML cannot be resumed by
+    seeking alone, so a resumed parse first feeds the bytes up to the first entry's closing
+    tag (which opens every enclosing element, namespaces included) and then the file from
+    the checkpoint on; that first, replayed entry is skipped.
+    """
+    format = 'CAMT'
+    CHUNK_SIZE = 64 * 1024
+
+    @staticmethod
+    def _local(tag):
+        return tag.rsplit('}', 1)[-1]
+
+    def _find(self, element, *path):
+        for name in path:
+            element = next((child for child in element if self._local(child.tag) == name), None)
+            if element is None:
+                return None
+        return element
+
+    def _text(self, element, *path):
+        found = self._find(element, *path)
+        return found.text.strip() if found is not None and found.text else ''
+
+    def parse(self, stream, start=0):
+        skip = 0
+        if start:
+            stream.seek(0)
+            first_end = next((offset for _, offset in self._entries(stream, 0)), None)
+            if first_end is None:
+                return
+            stream.seek(0)
+            prologue = stream.read(first_end)
+            skip = 1
+            stream.seek(start)
+        else:
+            prologue = b''
+            stream.seek(0)
+
+        for entry, offset in self._entries(stream, start - len(prologue), prologue):
+            if skip:
+                skip -= 1
+                continue
+            try:
+                yield self._record(entry), offset
+            except StatementParseError as e:
+                yield e, offset
+
+    def _entries(self, stream, shift, prologue=b''):
+        """
+        Yields (Ntry element, file offset of its closing tag), reading `prologue` and then
+        `stream` from its current position. `shift` maps parser byte positions to file offsets.
+        """
+        parser = expat.ParserCreate(namespace_separator='}')
+        finished = []
+        builder = None
+
+        def start_element(tag, attributes):
+            nonlocal builder
+            if builder is None and self._local(tag) == 'Ntry':
+                builder = ET.TreeBuilder()
+            if builder is not None:
+                builder.start(tag, attributes)
+
+        def end_element(tag):
+            nonlocal builder
+            if builder is None:
+                return
+            builder.end(tag)
+            if self._local(tag) == 'Ntry':
+                finished.append((builder.close(), parser.CurrentByteIndex + shift))
+                builder = None
+
+        def character_data(text):
+            if builder is not None:
+                builder.data(text)
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+        try:
+            if prologue:
+                parser.Parse(prologue, False)
+            while True:
+                chunk = stream.read(self.CHUNK_SIZE)
+                parser.Parse(chunk, not chunk)
+                yield from finished
+                finished.clear()
+                if not chunk:
+                    break
+        except expat.ExpatError as e:
+            raise StatementParseError(f"Invalid XML: {e}")
+
+    def _record(self, entry):
+        amount_element = self._find(entry, 'Amt')
+        if amount_element is None:
+            raise StatementParseError("Entry has no Amt")
+        amount = parse_amount(amount_element.text or '')
+        if self._text(entry, 'CdtDbtInd') == 'DBIT':
+            amount = -amount
+        details = self._find(entry, 'NtryDtls', 'TxDtls')
+        description = (
+            (self._text(details, 'RmtInf', 'Ustrd') if details is not None else '')
+            or self._text(entry, 'AddtlNtryInf')
+        )
+        return StatementRecord(
+            date=parse_date(self._text(entry, 'BookgDt', 'Dt') or self._text(entry, 'BookgDt', 'DtTm')),
+            amount=amount,
+            description=description,
+            reference=self._text(entry, 'AcctSvcrRef') or self._text(entry, 'NtryRef') or None,
+            currency=amount_element.get('Ccy'),
+        )
+
+
+PARSERS = {parser.format: parser for parser in (CSVStatementParser, OFXStatementParser, CAMTStatementParser)}
+
+
+def detect_format(filename, head):
+    """
+    Picks the parser format from the file name, falling back to sniffing the first bytes.
+    """
+    name = (filename or '').lower()
+    if name.endswith(('.ofx', '.qfx')):
+        return 'OFX'
+    if name.endswith('.xml') or b'camt.05' in head:
+        return 'CAMT'
+    if b'OFXHEADER' in head or b'<OFX>' in head.upper():
+        return 'OFX'
+    return 'CSV'
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from apps.ledger.models import LedgerAccount
+from .models import StatementImport
+
+class StatementImportSerializer(serializers.ModelSerializer):
+    account = serializers.PrimaryKeyRelatedField(queryset=LedgerAccount.objects.none())
+    format = serializers.ChoiceField(choices=StatementImport.Format.choices, required=False)
+    file = serializers.FileField(write_only=True)
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = StatementImport
+        fields = [
+            'id', 'account', 'file', 'format', 'status', 'progress', 'checkpoint', 'total_bytes',
+            'rows_processed', 'rows_imported', 'rows_skipped', 'rows_rejected', 'errors',
+            'created_at', 'updated_at', 'completed_at'
+        ]
+        read_only_fields = [
+            'status', 'checkpoint', 'total_bytes', 'rows_processed', 'rows_imported',
+            'rows_skipped', 'rows_rejected', 'errors', 'created_at', 'updated_at', 'completed_at'
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None:
+            fields['account'].queryset = LedgerAccount.objects.filter(user=request.user)
+        return fields
@@ -0,0 +1,230 @@
+import hashlib
+import time
+from datetime import datetime, time as dt_time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from apps.ledger.cards import STATEMENT_IMPORT_ACCOUNT
+from apps.ledger.models import LedgerAccount, Transaction, JournalEntry
+from apps.ledger.money import to_minor_units
+from apps.ledger.services import LedgerService
+from .models import StatementImport
+from .parsers import PARSERS, StatementParseError, detect_format
+
+# Rejected rows kept on the import for display; the counter keeps counting past this
+MAX_RECORDED_ERRORS = 100
+# Days whose identical-row counts are kept while importing rows without a bank reference
+OCCURRENCE_DAYS = 7
+
+
+class StatementImportService:
+    @staticmethod
+    def create_import(user, account, uploaded_file, file_format=None):
+        """
+        Stores the uploaded statement and returns a pending StatementImport.
+        The format is detected from the file name and first bytes unless given.
+        """
+        if account.user_id != user.id:
+            raise ValidationError("Account not found.")
+        if file_format is None:
+            head = uploaded_file.read(4096)
+            uploaded_file.seek(0)
+            file_format = detect_format(uploaded_file.name, head)
+        return StatementImport.objects.create(
+            user=user,
+            account=account,
+            file=uploaded_file,
+            format=file_format,
+            total_bytes=uploaded_file.size or 0
+        )
+
+    @staticmethod
+    def reference_for(account_id, record, state):
+        """
+        Transaction.reference of an imported row, so a row already in the ledger is
+        recognised when the same or an overlapping statement is imported again.
+
+        The bank's own id is used when the file has one. Otherwise the reference is a
+        digest of the row plus its occurrence number among identical rows of that day
+        (two identical coffees on one day are two transactions). `state` holds the
+        occurrence counts of the most recently seen days (statements are date-ordered,
+        either way round) and is checkpointed with the import.
+        """
+        if record.reference:
+            key = record.reference
+        else:
+            day = record.date.isoformat()
+            digest = hashlib.sha1(f"{day}|{record.amount}|{record.description}".encode()).hexdigest()
+            days = state.setdefault('days', {})
+            seen = days.pop(day, {})
+            days[day] = seen  # most recently used day last
+            while len(days) > OCCURRENCE_DAYS:
+                del days[next(iter(days))]
+            occurrence = seen[digest] = seen.get(digest, 0) + 1
+            key = f"{digest}:{occurrence}"
+
+        reference = f"IMPORT:{account_id}:{key}"
+        if len(reference) > 255:
+            reference = f"IMPORT:{account_id}:{hashlib.sha1(key.encode()).hexdigest()}"
+        return reference
+
+    @staticmethod
+    def _post_batch(statement_import, contra_account, rows, checkpoint, state, final):
+        """
+        Posts one batch of parsed rows and advances the checkpoint in the same database
+        transaction, so a batch is either fully imported and checkpointed or not at all.
+
+        :param rows: List of (StatementRecord or StatementParseError, parser position)
+        :return: False if another worker advanced (or someone stopped) the import meanwhile
+        """
+        account = statement_import.account
+        with transaction.atomic():
+            current = StatementImport.objects.select_for_update().get(id=statement_import.id)
+            if current.checkpoint != statement_import.checkpoint or current.status != StatementImport.Status.RUNNING:
+                return False
+
+            rejected = []
+            candidates = []
+            for record, position in rows:
+                if isinstance(record, StatementParseError):
+                    rejected.append({'position': position, 'error': str(record)})
+                elif record.currency and record.currency != account.currency:
+                    rejected.append({'position': position, 'error': f"Currency {record.currency} does not match account currency {account.currency}"})
+                elif not record.amount:
+                    rejected.append({'position': position, 'error': "Zero amount"})
+                else:
+                    try:
+                        # Rows the ledger would refuse (more decimal places than the currency has, too large)
+                        # are rejected here, one by one, instead of failing the whole batch
+                        to_minor_units(abs(record.amount), account.currency)
+                    except ValidationError as e:
+                        rejected.append({'position': position, 'error': e.messages[0]})
+                        continue
+                    candidates.append((StatementImportService.reference_for(account.id, record, state), record))
+
+            # One existence probe for the whole batch (Transaction.reference is unique and indexed)
+            existing = set(
+                Transaction.objects.filter(reference__in=[reference for reference, _ in candidates])
+                .values_list('reference', flat=True)
+            )
+            to_post = {}
+            for reference, record in candidates:
+                if reference not in existing and reference not in to_post:
+                    to_post[reference] = record
+
+            if to_post:
+                # Money in debits the account (raises an asset, pays down a liability); money out credits it.
+                # The rows are history, dated on their booking day, and do not count toward the card spend windows
+                LedgerService.create_transactions_batch([
+                    {
+                        'description': record.description or f"Statement import {record.date.isoformat()}",
+                        'reference': reference,
+                        'created_at': timezone.make_aware(datetime.combine(record.date, dt_time.min)),
+                        'entries': [
+                            {'account_id': account.id, 'amount': abs(record.amount),
+                             'type': JournalEntry.EntryType.DEBIT if record.amount > 0 else JournalEntry.EntryType.CREDIT},
+                            {'account_id': contra_account.id, 'amount': abs(record.amount),
+                             'type': JournalEntry.EntryType.CREDIT if record.amount > 0 else JournalEntry.EntryType.DEBIT},
+                        ]
+                    }
+                    for reference, record in to_post.items()
+                ], record_card_spend=False)
+
+            current.checkpoint = checkpoint
+            current.checkpoint_state = state
+            current.rows_processed += len(rows)
+            current.rows_imported += len(to_post)
+            current.rows_skipped += len(candidates) - len(to_post)
+            current.rows_rejected += len(rejected)
+            current.errors = (current.errors + rejected)[:MAX_RECORDED_ERRORS]
+            if final:
+                current.status = StatementImport.Status.COMPLETED
+                current.completed_at = timezone.now()
+            current.save()
+
+        statement_import.checkpoint = checkpoint
+        return True
+
+    @staticmethod
+    def _fail(statement_import, error):
+        # Rows rejected by the batches of this run are on the row, not on `statement_import`
+        errors = StatementImport.objects.values_list('errors', flat=True).get(id=statement_import.id)
+        StatementImport.objects.filter(id=statement_import.id).update(
+            status=StatementImport.Status.FAILED,
+            errors=(errors + [{'position': statement_import.checkpoint, 'error': error}])[:MAX_RECORDED_ERRORS + 1],
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def run(import_id, time_budget=None, batch_size=None):
+        """
+        Imports from the last checkpoint for about `time_budget` seconds
+        (STATEMENT_IMPORT_SLICE_SECONDS), streaming the file so memory stays bounded
+        by one batch whatever its size.
+
+        :return: True if the import has more rows to process, False once it is finished
+                 (or was taken over by another worker)
+        """
+        batch_size = batch_size or settings.STATEMENT_IMPORT_BATCH_SIZE
+        deadline = time.monotonic() + (time_budget or settings.STATEMENT_IMPORT_SLICE_SECONDS)
+
+        statement_import = StatementImport.objects.select_related('account').get(id=import_id)
+        if statement_import.status in (StatementImport.Status.COMPLETED, StatementImport.Status.FAILED):
+            return False
+        StatementImport.objects.filter(id=import_id).update(status=StatementImport.Status.RUNNING, updated_at=timezone.now())
+
+        account = statement_import.account
+        contra_account = LedgerService.get_system_account(STATEMENT_IMPORT_ACCOUNT, LedgerAccount.Type.EQUITY, account.currency)
+        state = dict(statement_import.checkpoint_state)
+        parser = PARSERS[statement_import.format]()
+
+        try:
+            with statement_import.file.open('rb') as handle:
+                # Read through Django's File wrapper: its iterator rewinds to the start
+                stream = handle
+                while isinstance(stream, File):
+                    stream = stream.file
+
+                rows = []
+                position = statement_import.checkpoint
+                for record, position in parser.parse(stream, statement_import.checkpoint):
+                    rows.append((record, position))
+                    if len(rows) < batch_size:
+                        continue
+                    if not StatementImportService._post_batch(statement_import, contra_account, rows, position, state, final=False):
+                        return False
+                    rows = []
+                    if time.monotonic() >= deadline:
+                        return True
+
+                StatementImportService._post_batch(statement_import, contra_account, rows, position, state, final=True)
+                return False
+        except (StatementParseError, OSError) as e:
+            # The file itself is unreadable (no usable header, broken XML, missing upload)
+            StatementImportService._fail(statement_import, str(e))
+            return False
+        except ValidationError as e:
+            # The ledger refused a batch (e.g. the account was closed): stop where the last batch ended,
+            # rather than leaving the import running, so it can be resumed once fixed
+            StatementImportService._fail(statement_import, e.messages[0])
+            return False
+
+    @staticmethod
+    def resume(statement_import, stalled_after=None):
+        """
+        Makes a failed or stalled import runnable again from its last checkpoint.
+        An import counts as stalled when it has not advanced for two slices.
+        """
+        stalled_after = stalled_after or 2 * settings.STATEMENT_IMPORT_SLICE_SECONDS
+        if statement_import.status == StatementImport.Status.COMPLETED:
+            raise ValidationError("Import is already completed.")
+        if (statement_import.status != StatementImport.Status.FAILED
+                and (timezone.now() - statement_import.updated_at).total_seconds() < stalled_after):
+            raise ValidationError("Import is still running.")
+        statement_import.status = StatementImport.Status.PENDING
+        statement_import.completed_at = None
+        statement_import.save(update_fields=['status', 'completed_at', 'updated_at'])
+        return statement_import
@@ -0,0 +1,14 @@
+from celery import shared_task
+from .services import StatementImportService
+
+# Routed to ledger.bulk (see CELERY_TASK_ROUTES): imports never delay settlement or billing.
+
+@shared_task(ignore_result=True)
+def run_statement_import(import_id):
+    """
+    Runs one slice of a statement import and re-queues itself until the file is done.
+    Each slice resumes from the checkpoint the previous one committed, so a worker
+    restart or a redelivered task simply continues the import.
+    """
+    if StatementImportService.run(import_id):
+        run_statement_import.delay(import_id)
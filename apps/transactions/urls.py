@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import StatementImportViewSet
+
+router = DefaultRouter()
+router.register(r'imports', StatementImportViewSet, basename='statement-import')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
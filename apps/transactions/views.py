@@ -0,0 +1,54 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from .models import StatementImport
+from .serializers import StatementImportSerializer
+from .services import StatementImportService
+from .tasks import run_statement_import
+
+class StatementImportViewSet(mixins.CreateModelMixin,
+                             mixins.ListModelMixin,
+                             mixins.RetrieveModelMixin,
+                             viewsets.GenericViewSet):
+    """
+    Upload a bank statement (CSV, OFX or CAMT.053) to post it to one of your accounts.
+    The import runs in the background; poll the import for its progress.
+    """
+    serializer_class = StatementImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get_queryset(self):
+        return StatementImport.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            statement_import = StatementImportService.create_import(
+                request.user,
+                serializer.validated_data['account'],
+                serializer.validated_data['file'],
+                serializer.validated_data.get('format')
+            )
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        transaction.on_commit(lambda: run_statement_import.delay(str(statement_import.id)))
+        return Response(self.get_serializer(statement_import).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Restarts a failed or stalled import from its last checkpoint.
+        """
+        try:
+            statement_import = StatementImportService.resume(self.get_object())
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_409_CONFLICT)
+
+        transaction.on_commit(lambda: run_statement_import.delay(str(statement_import.id)))
+        return Response(self.get_serializer(statement_import).data, status=status.HTTP_202_ACCEPTED)
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from apps.ledger.realtime import EVENT_STREAM_PATH, event_stream  # noqa: E402
+
+# The event stream is served outside the Django request cycle: tens of thousands of long-lived,
+# mostly idle connections per process would otherwise each hold a request, middleware and a handler task
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENT_STREAM_PATH:
+        return await event_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,287 @@
+import bisect
+import hmac
+import logging
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.http import HttpResponse
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis hash per metric; fields are '<label values>\x1e<slot>' with slot a bucket index, 'sum' or 'count'
+REDIS_KEY = 'metrics:{}'
+LABEL_SEP = '\x1f'
+FIELD_SEP = '\x1e'
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Prometheus histogram keyed by label values. observe() is a bisect and three
+    additions under a lock; buckets are stored per slot and made cumulative on export.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-slot counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[slot] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def drain(self):
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def to_fields(self, series):
+        fields = {}
+        for labels, values in series.items():
+            prefix = LABEL_SEP.join(labels) + FIELD_SEP
+            for slot, count in enumerate(values[:-2]):
+                if count:
+                    fields[f'{prefix}{slot}'] = count
+            fields[f'{prefix}sum'] = values[-2]
+            fields[f'{prefix}count'] = values[-1]
+        return fields
+
+    def from_fields(self, fields):
+        series = {}
+        for field, value in fields.items():
+            labels, slot = field.rsplit(FIELD_SEP, 1)
+            values = series.setdefault(tuple(labels.split(LABEL_SEP)) if labels else (), [0] * (len(self.buckets) + 1) + [0.0, 0])
+            if slot == 'sum':
+                values[-2] = float(value)
+            elif slot == 'count':
+                values[-1] = int(float(value))
+            else:
+                values[int(slot)] = int(float(value))
+        return series
+
+    def render(self, series):
+        lines = []
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-2]):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(values[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {values[-1]}')
+        return lines
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def drain(self):
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def to_fields(self, series):
+        return {LABEL_SEP.join(labels) + FIELD_SEP + 'value': value for labels, value in series.items()}
+
+    def from_fields(self, fields):
+        series = {}
+        for field, value in fields.items():
+            labels = field.rsplit(FIELD_SEP, 1)[0]
+            series[tuple(labels.split(LABEL_SEP)) if labels else ()] = int(float(value))
+        return series
+
+    def render(self, series):
+        return [f'{self.name}_total{_format_labels(self.labelnames, labels)} {_format_number(value)}' for labels, value in sorted(series.items())]
+
+
+class MetricsRegistry:
+    """
+    Request metrics of every web process.
+
+    Observations accumulate in process memory. With Redis configured they are added to
+    shared hashes at most every METRICS_FLUSH_SECONDS (one pipelined round trip), so
+    /metrics reports the whole deployment whichever worker a scrape lands on. Without
+    Redis, /metrics reports the process that serves it.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self._accumulated = {}  # metric name -> series, when there is no Redis to flush to
+        self.before_flush = []  # callables folding deferred observations into the metrics
+        self._flushed_at = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if not self._flush_lock.acquire(blocking=False):
+            return  # another thread is flushing
+        try:
+            self._flushed_at = time.monotonic()
+            for fold in self.before_flush:
+                fold()
+            client = get_redis()
+            pipe = client.pipeline(transaction=False) if client is not None else None
+            for metric in self.metrics:
+                series = metric.drain()
+                if not series:
+                    continue
+                if pipe is None:
+                    self._merge(metric, series)
+                    continue
+                key = REDIS_KEY.format(metric.name)
+                for field, value in metric.to_fields(series).items():
+                    pipe.hincrbyfloat(key, field, value)
+            if pipe is not None:
+                try:
+                    pipe.execute()
+                except Exception:
+                    # Metrics are best-effort: this interval's observations are dropped, the request is not failed
+                    logger.warning("Could not flush request metrics to Redis", exc_info=True)
+        finally:
+            self._flush_lock.release()
+
+    def _merge(self, metric, series):
+        accumulated = self._accumulated.setdefault(metric.name, {})
+        for labels, values in series.items():
+            current = accumulated.get(labels)
+            if current is None:
+                accumulated[labels] = values
+            elif isinstance(values, list):
+                accumulated[labels] = [a + b for a, b in zip(current, values)]
+            else:
+                accumulated[labels] = current + values
+
+    def collect(self):
+        """
+        :return: list of (metric, series) with everything observed so far
+        """
+        self.flush()
+        client = get_redis()
+        if client is None:
+            return [(metric, self._accumulated.get(metric.name, {})) for metric in self.metrics]
+        pipe = client.pipeline(transaction=False)
+        for metric in self.metrics:
+            pipe.hgetall(REDIS_KEY.format(metric.name))
+        collected = []
+        for metric, fields in zip(self.metrics, pipe.execute()):
+            decoded = {field.decode(): value.decode() for field, value in fields.items()}
+            collected.append((metric, metric.from_fields(decoded)))
+        return collected
+
+    def render(self):
+        lines = []
+        for metric, series in self.collect():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render(series))
+        return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """
+    The per-request histograms. record() only appends a tuple to a deque, so the
+    request pays no bucket search or lock; observations are folded into the
+    histograms when the registry flushes.
+    """
+    labelnames = ('method', 'route')
+
+    def __init__(self, registry):
+        self.requests = registry.register(Counter(
+            'http_requests', 'Requests handled, by status code.', self.labelnames + ('status',)
+        ))
+        self.duration = registry.register(Histogram(
+            'http_request_duration_seconds', 'Wall time from the first middleware to the rendered response.', self.labelnames
+        ))
+        self.db_queries = registry.register(Histogram(
+            'http_request_db_queries', 'Database queries run per request.', self.labelnames, COUNT_BUCKETS
+        ))
+        self.db_duration = registry.register(Histogram(
+            'http_request_db_duration_seconds', 'Time per request spent in database queries.', self.labelnames
+        ))
+        self.lock_wait = registry.register(Histogram(
+            'http_request_lock_wait_seconds', 'Time per request spent in SELECT ... FOR UPDATE, i.e. waiting for row locks.', self.labelnames
+        ))
+        self.serialization = registry.register(Histogram(
+            'http_request_serialization_seconds', 'Time per request spent rendering the response body.', self.labelnames
+        ))
+        self._pending = deque()
+        registry.before_flush.append(self.fold)
+
+    def record(self, method, route, status, duration, db_queries, db_duration, lock_wait, serialization):
+        self._pending.append((method, route, status, duration, db_queries, db_duration, lock_wait, serialization))
+
+    def fold(self):
+        pending = self._pending
+        while pending:
+            method, route, status, duration, db_queries, db_duration, lock_wait, serialization = pending.popleft()
+            labels = (method, route)
+            self.requests.inc(labels + (status,))
+            self.duration.observe(labels, duration)
+            self.db_queries.observe(labels, db_queries)
+            self.db_duration.observe(labels, db_duration)
+            self.lock_wait.observe(labels, lock_wait)
+            self.serialization.observe(labels, serialization)
+
+
+registry = MetricsRegistry()
+request_metrics = RequestMetrics(registry)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Scrapes must send METRICS_TOKEN as a bearer token; until a
+    token is configured the metrics (per-route traffic and latency) are not served at all.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return HttpResponse('Metrics are disabled until METRICS_TOKEN is set', status=403, content_type='text/plain')
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
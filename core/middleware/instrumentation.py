@@ -0,0 +1,143 @@
+import logging
+import os
+import random
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from core.metrics import registry, request_metrics
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+# cProfile (sys.monitoring on 3.12+) allows one active profiler per process
+_profiler_lock = threading.Lock()
+
+
+class RequestTimings:
+    """
+    Per-request counters, installed as the database connection's execute wrapper.
+    A query whose SQL takes row locks (SELECT ... FOR UPDATE) counts as lock wait.
+    """
+    __slots__ = ('queries', 'db_time', 'lock_wait', 'render_started', 'render_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.lock_wait = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if ' FOR UPDATE' in sql:
+                self.lock_wait += elapsed
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records per request: wall time, query count, database time, time waiting on row
+    locks and response rendering time, as Prometheus histograms served at /metrics.
+    Requests slower than METRICS_SLOW_REQUEST_MS are logged with that breakdown.
+
+    Optionally a METRICS_PROFILE_SAMPLE_RATE fraction of requests runs under a profiler
+    (cProfile, or pyinstrument if installed and selected); the profile is written to
+    METRICS_PROFILE_DIR when the request turns out slower than METRICS_PROFILE_SLOW_MS.
+
+    Place it first in MIDDLEWARE so the wall time covers the other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_request = settings.METRICS_SLOW_REQUEST_MS / 1000
+        self.profile_rate = settings.METRICS_PROFILE_SAMPLE_RATE
+        self.profile_slow = settings.METRICS_PROFILE_SLOW_MS / 1000
+
+    def __call__(self, request):
+        timings = request._timings = RequestTimings()
+        profiler = self._start_profiler() if self.profile_rate and random.random() < self.profile_rate else None
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                self._stop_profiler(profiler, request, elapsed)
+
+        # The URL pattern, not the path, so label cardinality stays bounded
+        route = (getattr(request.resolver_match, 'route', None) or UNMATCHED_ROUTE).lstrip('^').rstrip('$')
+        request_metrics.record(
+            request.method, route, str(response.status_code), elapsed,
+            timings.queries, timings.db_time, timings.lock_wait, timings.render_time,
+        )
+        registry.maybe_flush()
+
+        if elapsed >= self.slow_request:
+            logger.warning(
+                "Slow request %s %s: %.1fms total, %d queries in %.1fms, %.1fms lock wait, %.1fms rendering",
+                request.method, request.path, elapsed * 1000, timings.queries, timings.db_time * 1000,
+                timings.lock_wait * 1000, timings.render_time * 1000,
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time it from here to the post-render callback
+        timings = request._timings
+        timings.render_started = time.perf_counter()
+        response.add_post_render_callback(timings.rendered)
+        return response
+
+    def _start_profiler(self):
+        if not _profiler_lock.acquire(blocking=False):
+            return None  # another request is being profiled
+        try:
+            if settings.METRICS_PROFILER == 'pyinstrument':
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                profiler.start()
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception:
+            _profiler_lock.release()
+            logger.warning("Could not start the request profiler", exc_info=True)
+            return None
+
+    def _stop_profiler(self, profiler, request, elapsed):
+        try:
+            if hasattr(profiler, 'dump_stats'):
+                profiler.disable()
+            else:
+                profiler.stop()
+            if elapsed < self.profile_slow:
+                return
+            os.makedirs(settings.METRICS_PROFILE_DIR, exist_ok=True)
+            slug = request.path.strip('/').replace('/', '_') or 'root'
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug[:80]}-{elapsed * 1000:.0f}ms"
+            path = os.path.join(settings.METRICS_PROFILE_DIR, name)
+            if hasattr(profiler, 'dump_stats'):
+                profiler.dump_stats(f'{path}.prof')
+            else:
+                with open(f'{path}.html', 'w') as f:
+                    f.write(profiler.output_html())
+            logger.info("Profiled slow request %s %s into %s", request.method, request.path, path)
+        except Exception:
+            logger.warning("Could not write the request profile", exc_info=True)
+        finally:
+            _profiler_lock.release()
@@ -0,0 +1,18 @@
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """
+    Returns the process-wide Redis client for REDIS_URL, or None when Redis is not
+    configured (local development and tests then fall back to in-process state).
+    """
+    global _client
+    url = getattr(settings, 'REDIS_URL', '')
+    if not url:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(url)
+    return _client
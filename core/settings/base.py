@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',  # Added for CORS support
     'rest_framework',
     'apps.ledger',
@@ -32,6 +33,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'core.middleware.instrumentation.RequestInstrumentationMiddleware', # First, so its timings cover everything below
     'corsheaders.middleware.CorsMiddleware', # Added (Highest priority)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -88,11 +90,179 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 
+# Uploaded files (statement imports)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# --- LEDGER ---
+# Seconds a cached FX rate series is trusted before it is reloaded from the FxRate table
+FX_RATE_CACHE_TTL = config('FX_RATE_CACHE_TTL', default=300, cast=int)
+# Cross-currency legs must net out at the cached rate to within one minor unit per currency; this
+# relative residual is allowed on top for every posting, so it stays 0 while users can post their own legs
+FX_RATE_TOLERANCE = config('FX_RATE_TOLERANCE', default='0')
+# Clearing accounts subscription charges are spread over, so billing workers don't contend on one row
+SUBSCRIPTION_CLEARING_SHARDS = config('SUBSCRIPTION_CLEARING_SHARDS', default=8, cast=int)
+# Averaging window (days) of the rolling contribution rate used for goal projections
+GOAL_CONTRIBUTION_WINDOW_DAYS = config('GOAL_CONTRIBUTION_WINDOW_DAYS', default=30, cast=int)
+# Idempotency keys, settled/released card holds and published outbox events older than this are deleted by the archival task
+LEDGER_ARCHIVE_AFTER_DAYS = config('LEDGER_ARCHIVE_AFTER_DAYS', default=90, cast=int)
+# Accounts per task when ledger maintenance fans out over all accounts
+LEDGER_MAINTENANCE_CHUNK_SIZE = config('LEDGER_MAINTENANCE_CHUNK_SIZE', default=500, cast=int)
+# Posting phase spans (validate, lock acquire, inserts, balance update, commit) and per-account lock waits.
+# Fraction of postings traced (0 = off); comma-separated exporters: 'ring' (in-process ring buffer, shared
+# through Redis when configured), 'log' (JSON log lines) or dotted paths to classes with export(span)
+LEDGER_TRACE_SAMPLE_RATE = config('LEDGER_TRACE_SAMPLE_RATE', default=1.0, cast=float)
+LEDGER_TRACE_EXPORTERS = config('LEDGER_TRACE_EXPORTERS', default='ring')
+LEDGER_TRACE_BUFFER_SIZE = config('LEDGER_TRACE_BUFFER_SIZE', default=10000, cast=int)
+# Lock traced postings' accounts one row per query, to time each lock separately (a round trip per account)
+LEDGER_TRACE_ROW_LOCKS = config('LEDGER_TRACE_ROW_LOCKS', default=False, cast=bool)
+# Decimal places per currency for postings, as 'JPY:0,KWD:3' (at most 4, what JournalEntry.amount stores);
+# amounts are checked against them and held as integer minor units while a posting is validated. Default 4
+LEDGER_CURRENCY_SCALES = config('LEDGER_CURRENCY_SCALES', default='')
+# Transactions per COPY round when LedgerService.ingest_transactions bulk-loads history
+LEDGER_INGEST_CHUNK_SIZE = config('LEDGER_INGEST_CHUNK_SIZE', default=50000, cast=int)
+# Outbox relay: events of one account always land in the same partition, so they stay in order
+OUTBOX_PARTITIONS = config('OUTBOX_PARTITIONS', default=16, cast=int)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=1000, cast=int)
+# Comma-separated sinks: 'broker' (Redis stream, or in-process when REDIS_URL is empty), 'webhook'
+# (POST to OUTBOX_WEBHOOK_URL) or dotted paths to sink classes. The integrations sink queues
+# deliveries to subscribers' webhook endpoints.
+OUTBOX_SINK = config('OUTBOX_SINK', default='broker,apps.integrations.webhooks.WebhookDeliverySink')
+OUTBOX_STREAM = config('OUTBOX_STREAM', default='ledger:events')
+OUTBOX_WEBHOOK_URL = config('OUTBOX_WEBHOOK_URL', default='')
+# The relay pauses while consumers are this many events behind
+OUTBOX_MAX_BACKLOG = config('OUTBOX_MAX_BACKLOG', default=100000, cast=int)
+
+# --- CACHE ---
+# Holds per-user response caches, version counters and lookup indexes. It must be shared by every
+# process (Redis), so a write handled by one worker invalidates what the others cached.
+# Empty CACHE_URL = per-process locmem, for tests and single-process runs.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'wallet',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Seconds a cached per-user API response is kept; any write for the user makes it unreachable sooner
+RESPONSE_CACHE_TTL = config('RESPONSE_CACHE_TTL', default=300, cast=int)
+
+# --- SPENDING ANALYTICS ---
+# Seconds a spending report stays cached; postings invalidate it earlier by bumping the user's version
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=3600, cast=int)
+ANALYTICS_MAX_PERIOD_DAYS = config('ANALYTICS_MAX_PERIOD_DAYS', default=3660, cast=int)
+
+# --- REAL-TIME EVENTS ---
+# Server-Sent Events of the user's postings, served by the ASGI entry point (uvicorn core.asgi:application)
+# Prefix of the stream URL handed to clients, e.g. 'https://events.example.com'; empty = same origin,
+# which only works when the ASGI entry point also serves the API
+REALTIME_STREAM_BASE_URL = config('REALTIME_STREAM_BASE_URL', default='')
+# Seconds a stream token can be used to connect
+REALTIME_TOKEN_MAX_AGE = config('REALTIME_TOKEN_MAX_AGE', default=300, cast=int)
+# Events buffered per connection; a client that falls further behind is disconnected and resyncs
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=256, cast=int)
+REALTIME_HEARTBEAT_SECONDS = config('REALTIME_HEARTBEAT_SECONDS', default=20, cast=int)
+REALTIME_MAX_CONNECTIONS = config('REALTIME_MAX_CONNECTIONS', default=60000, cast=int)
+
+# --- METRICS & PROFILING ---
+# Per-request timings exported as Prometheus histograms at /metrics
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Scrapes must send 'Authorization: Bearer <METRICS_TOKEN>'; /metrics is not served while it is empty
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Seconds between flushes of a worker's observations into the shared Redis hashes
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5.0, cast=float)
+# Requests slower than this are logged with their DB / lock / rendering breakdown
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=1000, cast=int)
+# Fraction of requests run under the profiler (0 = off); profiles of those slower than
+# METRICS_PROFILE_SLOW_MS are written to METRICS_PROFILE_DIR
+METRICS_PROFILE_SAMPLE_RATE = config('METRICS_PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+METRICS_PROFILE_SLOW_MS = config('METRICS_PROFILE_SLOW_MS', default=500, cast=int)
+# 'cprofile' (.prof files, for pstats/snakeviz) or 'pyinstrument' (.html, needs pyinstrument installed)
+METRICS_PROFILER = config('METRICS_PROFILER', default='cprofile')
+METRICS_PROFILE_DIR = config('METRICS_PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+
+# --- LOGGING ---
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default'},
+    },
+    'loggers': {
+        'apps': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+        'core': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# --- WEBHOOKS ---
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=8, cast=int)
+# Retry n waits about WEBHOOK_BACKOFF_BASE * 2^(n-1) seconds, at most WEBHOOK_BACKOFF_MAX
+WEBHOOK_BACKOFF_BASE = config('WEBHOOK_BACKOFF_BASE', default=10, cast=int)
+WEBHOOK_BACKOFF_MAX = config('WEBHOOK_BACKOFF_MAX', default=3600, cast=int)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=5.0, cast=float)
+# Per dispatcher process: pooled connections, concurrent claim/send lanes and deliveries per claim
+WEBHOOK_MAX_CONNECTIONS = config('WEBHOOK_MAX_CONNECTIONS', default=500, cast=int)
+WEBHOOK_DISPATCH_LANES = config('WEBHOOK_DISPATCH_LANES', default=4, cast=int)
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=1000, cast=int)
+# Allow endpoints on loopback, private and link-local addresses (local development and benchmarks only)
+WEBHOOK_ALLOW_PRIVATE_ADDRESSES = config('WEBHOOK_ALLOW_PRIVATE_ADDRESSES', default=False, cast=bool)
+
+# --- STATEMENT IMPORTS ---
+# Rows posted (and checkpointed) per database transaction
+STATEMENT_IMPORT_BATCH_SIZE = config('STATEMENT_IMPORT_BATCH_SIZE', default=1000, cast=int)
+# Seconds an import task runs before re-queueing itself, so one huge file never holds a worker
+STATEMENT_IMPORT_SLICE_SECONDS = config('STATEMENT_IMPORT_SLICE_SECONDS', default=60, cast=int)
+
+# --- CATEGORISATION ---
+# Hash buckets for description features (weights are buckets x categories float32)
+CATEGORISER_FEATURES = config('CATEGORISER_FEATURES', default=2 ** 16, cast=int)
+# Normalised descriptions whose prediction is kept in memory per worker
+CATEGORISER_CACHE_SIZE = config('CATEGORISER_CACHE_SIZE', default=50000, cast=int)
+CATEGORISER_BATCH_SIZE = config('CATEGORISER_BATCH_SIZE', default=2000, cast=int)
+# Predictions less likely than this are stored as 'Uncategorised'
+CATEGORISER_MIN_CONFIDENCE = config('CATEGORISER_MIN_CONFIDENCE', default=0.5, cast=float)
+CATEGORISER_MIN_TRAINING_SAMPLES = config('CATEGORISER_MIN_TRAINING_SAMPLES', default=50, cast=int)
+CATEGORISER_MAX_TRAINING_SAMPLES = config('CATEGORISER_MAX_TRAINING_SAMPLES', default=200000, cast=int)
+
+# --- RECURRING PAYMENTS ---
+# Journal entries folded into the recurring-payment groups per database transaction
+RECURRING_SCAN_CHUNK_SIZE = config('RECURRING_SCAN_CHUNK_SIZE', default=20000, cast=int)
+# Seconds a scan task runs before re-queueing itself
+RECURRING_SCAN_SLICE_SECONDS = config('RECURRING_SCAN_SLICE_SECONDS', default=60, cast=int)
+# Entries younger than this (seconds) wait for the next scan, so postings still committing are not passed over
+RECURRING_SCAN_LAG = config('RECURRING_SCAN_LAG', default=300, cast=int)
+
+# --- RISK SCORING ---
+# Dotted path to the scorer run on user-initiated postings and card spends; empty disables scoring
+RISK_SCORER = config('RISK_SCORER', default='apps.ai_engine.risk.StatisticalRiskScorer')
+# Time a posting waits for its risk score; past it the posting is handled per RISK_FAIL_MODE
+RISK_BUDGET_MS = config('RISK_BUDGET_MS', default=2.0, cast=float)
+# 'open' lets postings through when scoring is unavailable or late, 'closed' refuses them
+RISK_FAIL_MODE = config('RISK_FAIL_MODE', default='open')
+RISK_BLOCK_THRESHOLD = config('RISK_BLOCK_THRESHOLD', default=0.95, cast=float)
+# Spends an account needs before its amounts and counterparties are judged against its history
+RISK_MIN_HISTORY = config('RISK_MIN_HISTORY', default=10, cast=int)
+# Velocity is a count of spends decaying with this half-life (seconds); above the limit it adds risk
+RISK_VELOCITY_HALF_LIFE = config('RISK_VELOCITY_HALF_LIFE', default=60, cast=int)
+RISK_VELOCITY_LIMIT = config('RISK_VELOCITY_LIMIT', default=10, cast=float)
+
 # --- SECURITY & CORS - HOTFIX ---
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -1,5 +1,8 @@
 from .base import *
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+from celery.schedules import crontab
+from kombu import Queue
 
 DEBUG = True
 
@@ -20,3 +23,78 @@ DATABASES = {
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Ledger tasks are fire-and-forget: no result backend, results never stored
+CELERY_TASK_IGNORE_RESULT = True
+# Run tasks inline (CELERY_TASK_ALWAYS_EAGER=True), or use CELERY_BROKER_URL=memory:// with an
+# in-process worker, to exercise the whole pipeline without Redis
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Priority queues: critical (settlement) > default (billing) > bulk (rollups, integrity, archival)
+CELERY_TASK_QUEUES = (
+    Queue('ledger.critical'),
+    Queue('ledger.default'),
+    Queue('ledger.bulk'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'ledger.default'
+CELERY_TASK_ROUTES = {
+    'apps.ledger.tasks.settle_card_holds': {'queue': 'ledger.critical'},
+    'apps.ledger.tasks.*billing*': {'queue': 'ledger.default'},
+    'apps.ledger.tasks.bill_subscription_chunk': {'queue': 'ledger.default'},
+    'apps.ledger.tasks.*': {'queue': 'ledger.bulk'},
+    'apps.transactions.tasks.*': {'queue': 'ledger.bulk'},
+    'apps.ai_engine.tasks.*': {'queue': 'ledger.bulk'},
+}
+# Priorities within a queue (0 = highest) on the Redis transport
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+# Ledger tasks are short and idempotent: take one at a time and ack after running,
+# so a busy worker never sits on prefetched work and a crashed one hands it back
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+CELERY_TASK_ACKS_LATE = True
+
+CELERY_BEAT_SCHEDULE = {
+    'settle-card-holds': {
+        'task': 'apps.ledger.tasks.settle_card_holds',
+        'schedule': 60.0,
+    },
+    'run-subscription-billing': {
+        'task': 'apps.ledger.tasks.run_subscription_billing',
+        'schedule': crontab(minute=5, hour=0),
+    },
+    'run-daily-rollup': {
+        'task': 'apps.ledger.tasks.run_daily_rollup',
+        'schedule': crontab(minute=30, hour=0),
+    },
+    'check-ledger-integrity': {
+        'task': 'apps.ledger.tasks.check_ledger_integrity',
+        'schedule': crontab(minute=0, hour=2),
+    },
+    'archive-ledger-records': {
+        'task': 'apps.ledger.tasks.archive_ledger_records',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    'categorise-transactions': {
+        'task': 'apps.ai_engine.tasks.categorise_transactions',
+        'schedule': 60.0,
+    },
+    'train-category-model': {
+        'task': 'apps.ai_engine.tasks.train_category_model',
+        'schedule': crontab(minute=0, hour=4),
+    },
+    'detect-recurring-payments': {
+        'task': 'apps.ai_engine.tasks.detect_recurring_payments',
+        'schedule': crontab(minute=0, hour=5),
+    },
+}
+
+# Redis for hot ledger state (card authorizations). Empty = in-process fallback.
+REDIS_URL = config('REDIS_URL', default='redis://redis:6379/1')
+# With Redis, the ledger runs as several processes (web, workers, events): the response cache and its
+# version counters must be shared by all of them, or postings in one never invalidate what another cached
+if REDIS_URL and not CACHE_URL:
+    raise ImproperlyConfigured("CACHE_URL must be set when REDIS_URL is (e.g. redis://redis:6379/2).")
@@ -17,10 +17,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from core.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/ledger/', include('apps.ledger.urls')),
+    path('api/integrations/', include('apps.integrations.urls')),
+    path('api/transactions/', include('apps.transactions.urls')),
+    path('api/ai/', include('apps.ai_engine.urls')),
+    path('metrics', metrics_view, name='metrics'),
     
     # --- DOCUMENTATION ENDPOINTS ---
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
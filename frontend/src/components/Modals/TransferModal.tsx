@@ -42,59 +42,35 @@ export function TransferModal({ children, accounts, onSuccess, mode = 'send' }:
 
         setLoading(true);
         try {
-            // Logic:
-            // Send: Debit Selected Account -> Credit External/Other (Simulated by checking for other account or failing)
-            // Request: Credit Selected Account -> Debit External/Other (Simulated)
-
-            // For Demo:
-            // If Send: Debit `selectedAccountId`, Credit `targetAccount` (Self transfer logic for now)
-            // If Request: Credit `selectedAccountId`, Debit `targetAccount` (Simulated "Incoming" transfer)
-
-            // Finding a target account for the double-entry (User's other account)
-            const targetAccount = accounts.find(a => a.id !== selectedAccountId);
-
-            // If no other account exists, we can't do a valid ledger entry without a System account.
-            // For the sake of the demo, if we are Requesting (Simulating Inflow), maybe just Credit the account and Debit the SAME account? No that's net zero.
-            // Only if > 1 account.
-            if (!targetAccount) {
-                alert("Need at least 2 accounts to simulate transfer/request for now.");
-                setLoading(false);
-                return;
-            }
-
-            const entries = [];
-
-            if (isRequest) {
-                // Request: Money COMES IN to Selected Account (Credit), Money LEAVES Target (Debit - simulating external payment source)
-                entries.push({
-                    account_id: selectedAccountId,
-                    amount: parseFloat(amount),
-                    type: "CREDIT"
-                });
-                entries.push({
-                    account_id: targetAccount.id,
-                    amount: parseFloat(amount),
-                    type: "DEBIT"
+            if (!isRequest) {
+                // Send: the backend resolves the recipient's account from their email and posts both legs
+                await api.post("/ledger/transfers/", {
+                    from_account_id: selectedAccountId,
+                    email: recipient,
+                    amount: amount,
+                    description: description || `Transfer to ${recipient}`,
                 });
             } else {
-                // Send: Money LEAVES Selected Account (Debit), Money GOES TO Target (Credit)
-                entries.push({
-                    account_id: selectedAccountId,
-                    amount: parseFloat(amount),
-                    type: "DEBIT"
-                });
-                entries.push({
-                    account_id: targetAccount.id,
-                    amount: parseFloat(amount),
-                    type: "CREDIT"
+                // Request: Credit `selectedAccountId`, Debit `targetAccount` (Simulated "Incoming" transfer)
+                const targetAccount = accounts.find(a => a.id !== selectedAccountId);
+
+                // If no other account exists, we can't do a valid ledger entry without a System account.
+                if (!targetAccount) {
+                    alert("Need at least 2 accounts to simulate a request for now.");
+                    setLoading(false);
+                    return;
+                }
+
+                await api.post("/api/ledger/transactions/create/", {
+                    description: description || `Request from ${recipient}`,
+                    entries: [
+                        // Money COMES IN to Selected Account (Credit), Money LEAVES Target (Debit - simulating external payment source)
+                        { account_id: selectedAccountId, amount: parseFloat(amount), type: "CREDIT" },
+                        { account_id: targetAccount.id, amount: parseFloat(amount), type: "DEBIT" },
+                    ],
                 });
             }
 
-            await api.post("/api/ledger/transactions/create/", {
-                description: description || `${isRequest ? 'Request from' : 'Transfer to'} ${recipient}`,
-                entries: entries
-            });
-
             setOpen(false);
             setAmount("");
             setRecipient("");
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import uuid
+import django
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from apps.ledger.models import LedgerAccount, Card
+from apps.ledger.cards import CardAuthorizationService
+from apps.ledger.card_state import get_card_state_store, AUTHORIZED
+from apps.ledger.money import to_minor_units
+
+User = get_user_model()
+
+TARGET_RATE = 10_000  # authorizations per second
+NUM_AUTHORIZATIONS = 50_000
+NUM_CARDS = 100
+
+def run():
+    print("--- Card Authorization Benchmark ---")
+    store = get_card_state_store()
+    print(f"State store: {type(store).__name__}")
+
+    user, _ = User.objects.get_or_create(email="card_bench@example.com")
+    account, _ = LedgerAccount.objects.get_or_create(
+        name="Card Bench Checking", type=LedgerAccount.Type.ASSET, user=user,
+        defaults={'balance': Decimal('100000000')}
+    )
+    cards = list(Card.objects.filter(user=user)[:NUM_CARDS])
+    for _ in range(NUM_CARDS - len(cards)):
+        cards.append(Card.objects.create(
+            user=user, account=account, name="Bench", last_4="0000", type="VIRTUAL",
+            spending_limit=Decimal('9999999999'), daily_limit=Decimal('500000'),
+            weekly_limit=Decimal('2000000'), monthly_limit=Decimal('5000000')
+        ))
+
+    # Warm the hot state so the loop measures the check-and-decrement only
+    for card in cards:
+        store.invalidate_card(card.id)
+        CardAuthorizationService.load_state(card, store)
+
+    plans = [
+        (card.id, card.account_id, CardAuthorizationService.window_limits(card))
+        for card in cards
+    ]
+    amount = to_minor_units('1.25')
+
+    latencies = []
+    declined = 0
+    start = time.perf_counter()
+    for i in range(NUM_AUTHORIZATIONS):
+        card_id, account_id, limits = plans[i % NUM_CARDS]
+        t0 = time.perf_counter()
+        result = store.authorize(card_id, account_id, amount, limits, time.time())
+        latencies.append(time.perf_counter() - t0)
+        if result != AUTHORIZED:
+            declined += 1
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    rate = NUM_AUTHORIZATIONS / duration
+    print(f"Authorizations: {NUM_AUTHORIZATIONS} in {duration:.2f}s ({rate:,.0f}/s), declined: {declined}")
+    print(f"Latency p50: {latencies[len(latencies) // 2] * 1e6:.0f}us  "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us  "
+          f"max: {latencies[-1] * 1e6:.0f}us")
+
+    if rate >= TARGET_RATE:
+        print(f"SUCCESS: Sustained >= {TARGET_RATE:,} authorizations/s.")
+    else:
+        print(f"FAILURE: Below target of {TARGET_RATE:,} authorizations/s.")
+
+    # Put the benchmark cards' state back to what Postgres says
+    for card in cards:
+        store.invalidate_card(card.id)
+    store.invalidate_accounts([account.id])
+
+if __name__ == '__main__':
+    run()
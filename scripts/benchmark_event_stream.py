@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+import tracemalloc
+import django
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.conf import settings
+from apps.ledger.realtime import EVENT_STREAM_PATH, event_stream, hub, make_stream_token, PING
+
+TARGET_CONNECTIONS = 50_000
+# Idle connections held; the hub and per-connection handler are measured, not the socket layer
+NUM_CONNECTIONS = TARGET_CONNECTIONS
+NUM_EVENTS = 10_000
+MAX_BYTES_PER_CONNECTION = 8 * 1024
+
+class Client:
+    """
+    Stands in for the ASGI server side of one connection: collects what the app sends.
+    """
+    __slots__ = ('frames', 'disconnected', 'received')
+
+    def __init__(self):
+        self.frames = 0
+        self.received = asyncio.Event()
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.body' and message.get('body'):
+            self.frames += 1
+            self.received.set()
+
+def scope(user_id):
+    return {'type': 'http', 'path': EVENT_STREAM_PATH, 'query_string': f"token={make_stream_token(user_id)}".encode()}
+
+async def run():
+    print("--- Event Stream Fan-out Benchmark ---")
+    settings.REALTIME_MAX_CONNECTIONS = NUM_CONNECTIONS + 1
+    clients = [Client() for _ in range(NUM_CONNECTIONS)]
+    scopes = [scope(user_id) for user_id in range(NUM_CONNECTIONS)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(event_stream(scopes[i], clients[i].receive, clients[i].send)) for i in range(NUM_CONNECTIONS)]
+    while hub.count < NUM_CONNECTIONS:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.1)
+    connect_time = time.perf_counter() - start
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / NUM_CONNECTIONS
+    tracemalloc.stop()
+    print(f"Opened {NUM_CONNECTIONS:,} idle streams in {connect_time:.2f}s, ~{per_connection / 1024:.1f} KiB each (Python heap)")
+
+    # 1. Events for individual users: routed with one dict lookup each
+    for client in clients:
+        client.received.clear()
+    messages = [
+        {'id': i, 'type': 'ledger.posting', 'account_id': 'a', 'user_id': i * 7 % NUM_CONNECTIONS, 'created_at': '', 'data': {'balance': '1.00'}}
+        for i in range(NUM_EVENTS)
+    ]
+    start = time.perf_counter()
+    hub.dispatch(messages)
+    targets = {message['user_id'] for message in messages}
+    await asyncio.gather(*(clients[user_id].received.wait() for user_id in targets))
+    fanout = time.perf_counter() - start
+    print(f"Delivered {NUM_EVENTS:,} events to their users in {fanout * 1000:.0f}ms ({NUM_EVENTS / fanout:,.0f} events/s)")
+
+    # 2. One keep-alive round over every connection
+    for client in clients:
+        client.received.clear()
+    start = time.perf_counter()
+    hub.broadcast(PING)
+    await asyncio.gather(*(client.received.wait() for client in clients))
+    heartbeat = time.perf_counter() - start
+    print(f"Keep-alive round over {NUM_CONNECTIONS:,} connections: {heartbeat * 1000:.0f}ms")
+
+    for client in clients:
+        client.disconnected.set()
+    await asyncio.gather(*tasks)
+    print(f"Closed all streams, {hub.count} left registered")
+
+    if per_connection <= MAX_BYTES_PER_CONNECTION and hub.count == 0:
+        print(f"SUCCESS: {TARGET_CONNECTIONS:,} idle connections at <= {MAX_BYTES_PER_CONNECTION // 1024} KiB each.")
+    else:
+        print(f"FAILURE: Over {MAX_BYTES_PER_CONNECTION // 1024} KiB per connection or streams leaked.")
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import random
+import django
+from datetime import timedelta
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Sum, Q
+from django.utils import timezone
+from apps.ledger.models import LedgerAccount, Transaction
+from apps.ledger.services import LedgerService
+
+User = get_user_model()
+
+NUM_TRANSACTIONS = 20000
+ORM_BATCH_SIZE = 1000  # transactions per create_transactions_batch call
+NUM_ACCOUNTS = 50
+MIN_SPEEDUP = 10  # on PostgreSQL, where rows go through COPY
+
+def make_history(accounts, income, prefix, n):
+    rng = random.Random(0)
+    start = timezone.now() - timedelta(days=365)
+    history = []
+    for i in range(n):
+        amount = Decimal(rng.randrange(100, 100000)).scaleb(-2)
+        history.append({
+            'reference': f"{prefix}-{i}",
+            'description': 'Imported spend',
+            'created_at': start + timedelta(seconds=rng.randrange(365 * 86400)),
+            'category': 'Shopping',
+            'entries': [
+                {'account_id': rng.choice(accounts).id, 'amount': amount, 'type': 'DEBIT'},
+                {'account_id': income.id, 'amount': amount, 'type': 'CREDIT'},
+            ],
+        })
+    return history
+
+def mismatched_balances(accounts):
+    mismatched = 0
+    for account in LedgerAccount.objects.filter(id__in=[a.id for a in accounts]).annotate(
+        debits=Sum('entries__amount', filter=Q(entries__type='DEBIT')),
+        credits=Sum('entries__amount', filter=Q(entries__type='CREDIT')),
+    ):
+        debits, credits = account.debits or Decimal('0'), account.credits or Decimal('0')
+        expected = debits - credits if account.type == LedgerAccount.Type.ASSET else credits - debits
+        if abs(account.balance - expected) > Decimal('0.0001'):
+            mismatched += 1
+    return mismatched
+
+def run():
+    print("--- Bulk Ingestion Benchmark (COPY vs ORM batches) ---")
+    user, _ = User.objects.get_or_create(email="ingestion_bench@example.com")
+    Transaction.objects.filter(reference__startswith='ingest-bench-').delete()
+    LedgerAccount.objects.filter(user=user).delete()
+    accounts = LedgerAccount.objects.bulk_create([
+        LedgerAccount(user=user, name=f"Ingest Bench {i}", type=LedgerAccount.Type.ASSET) for i in range(NUM_ACCOUNTS)
+    ])
+    income = LedgerService.get_system_account('Ingest Bench Income', LedgerAccount.Type.INCOME)
+    LedgerAccount.objects.filter(id=income.id).update(balance=Decimal('0'))  # earlier runs' entries were deleted
+
+    # 1. ORM path: create_transactions_batch (bulk_create per batch)
+    history = make_history(accounts, income, 'ingest-bench-orm', NUM_TRANSACTIONS)
+    start = time.perf_counter()
+    for i in range(0, len(history), ORM_BATCH_SIZE):
+        LedgerService.create_transactions_batch(history[i:i + ORM_BATCH_SIZE])
+    orm = time.perf_counter() - start
+    print(f"create_transactions_batch: {NUM_TRANSACTIONS} transactions in {orm:.2f}s ({NUM_TRANSACTIONS / orm:,.0f}/s)")
+
+    # 2. Bulk path: ingest_transactions (COPY on PostgreSQL)
+    history = make_history(accounts, income, 'ingest-bench-copy', NUM_TRANSACTIONS)
+    start = time.perf_counter()
+    stats = LedgerService.ingest_transactions(history, rebuild_analytics=False)
+    bulk = time.perf_counter() - start
+    print(f"ingest_transactions:       {stats['transactions']} transactions in {bulk:.2f}s ({NUM_TRANSACTIONS / bulk:,.0f}/s)")
+
+    speedup = orm / bulk
+    print(f"Speedup: {speedup:.1f}x on {connection.vendor}")
+
+    mismatched = mismatched_balances(accounts + [income])
+    Transaction.objects.filter(reference__startswith='ingest-bench-').delete()
+    if mismatched:
+        print(f"FAILURE: {mismatched} account balances differ from their entries.")
+    elif connection.vendor != 'postgresql':
+        print("SUCCESS: Balances match their entries (COPY is PostgreSQL-only; run there for the speedup target).")
+    elif speedup >= MIN_SPEEDUP:
+        print(f"SUCCESS: Bulk ingestion is at least {MIN_SPEEDUP}x faster than ORM batches.")
+    else:
+        print(f"FAILURE: Bulk ingestion is less than {MIN_SPEEDUP}x faster than ORM batches.")
+
+if __name__ == '__main__':
+    run()
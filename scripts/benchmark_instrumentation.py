@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import statistics
+import django
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from apps.ledger.models import LedgerAccount
+from core.middleware.instrumentation import RequestInstrumentationMiddleware
+
+User = get_user_model()
+
+MAX_OVERHEAD = 0.02  # of a typical request's wall time
+NUM_REQUESTS = 2000
+ROUNDS = 5
+ENDPOINT = '/api/ledger/accounts/'
+INSTRUMENTATION = 'core.middleware.instrumentation.RequestInstrumentationMiddleware'
+
+def time_requests(client, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(ENDPOINT)
+    return (time.perf_counter() - start) / n
+
+def run():
+    print("--- Request Instrumentation Overhead Benchmark ---")
+    user, _ = User.objects.get_or_create(email="metrics_bench@example.com")
+    for i in range(5):
+        LedgerAccount.objects.get_or_create(
+            name=f"Metrics Bench {i}", type=LedgerAccount.Type.ASSET, user=user,
+            defaults={'balance': Decimal('100.00')}
+        )
+
+    # 1. Cost of the middleware itself, around a view that does nothing
+    request = RequestFactory().get(ENDPOINT)
+    response = HttpResponse()
+    bare = RequestInstrumentationMiddleware(lambda request: response)
+    start = time.perf_counter()
+    for _ in range(NUM_REQUESTS * 10):
+        bare(request)
+    per_request = (time.perf_counter() - start) / (NUM_REQUESTS * 10)
+    print(f"Middleware cost: {per_request * 1e6:.1f}us per request")
+
+    # 2. A real read endpoint through the full stack, with and without the middleware (interleaved rounds)
+    without = [m for m in settings.MIDDLEWARE if m != INSTRUMENTATION]
+    timings = {'on': [], 'off': []}
+    for _ in range(ROUNDS):
+        for mode, middleware in (('on', settings.MIDDLEWARE), ('off', without)):
+            with override_settings(MIDDLEWARE=middleware):
+                client = Client()
+                client.force_login(user)
+                client.get(ENDPOINT)  # warm up
+                timings[mode].append(time_requests(client, NUM_REQUESTS // ROUNDS))
+    on, off = statistics.median(timings['on']), statistics.median(timings['off'])
+    print(f"{ENDPOINT}: {off * 1000:.3f}ms without, {on * 1000:.3f}ms with instrumentation ({(on - off) / off:+.1%})")
+
+    overhead = per_request / off
+    print(f"Middleware cost relative to the endpoint: {overhead:.2%}")
+    if overhead < MAX_OVERHEAD:
+        print(f"SUCCESS: Instrumentation overhead below {MAX_OVERHEAD:.0%}.")
+    else:
+        print(f"FAILURE: Instrumentation overhead above {MAX_OVERHEAD:.0%}.")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import random
+import django
+from collections import defaultdict
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from apps.ledger.models import JournalEntry, LedgerAccount
+from apps.ledger.money import MINOR_UNIT_EXPONENT, to_minor_units, from_minor_units
+from apps.ledger.services import LedgerService, DEBIT, CREDIT, DEBIT_NORMAL_TYPES
+
+User = get_user_model()
+
+NUM_CONVERSIONS = 200_000
+NUM_LOOP_ENTRIES = 200_000
+LOOP_REPEATS = 5
+NUM_POSTINGS = 300
+TYPES = ('ASSET', 'LIABILITY', 'EQUITY', 'INCOME', 'EXPENSE')
+
+def random_amount(rng, places):
+    # The shapes amounts arrive in: strings from JSON, Decimals from serializers, ints and floats from scripts
+    units = rng.randrange(1, 10 ** 12)
+    text = str(Decimal(units).scaleb(-places))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return text if rng.randrange(2) else f" {text}\n"  # Decimal() ignores surrounding whitespace
+    if kind == 1:
+        return Decimal(text)
+    if kind == 2 and places == 0:
+        return units
+    return float(text) if units < 10 ** 9 else text
+
+def check_conversions(rng):
+    # Round trips are exact, and an amount is rejected exactly when it has more places than the scale
+    mismatches = 0
+    for _ in range(NUM_CONVERSIONS):
+        scale = rng.randrange(MINOR_UNIT_EXPONENT + 1)
+        places = rng.randrange(MINOR_UNIT_EXPONENT + 2)
+        amount = random_amount(rng, places)
+        reference = Decimal(str(amount))
+        fits = reference == reference.quantize(Decimal(1).scaleb(-scale))
+        try:
+            minor = to_minor_units(amount, scale=scale)
+        except ValidationError:
+            mismatches += fits
+            continue
+        if not fits or from_minor_units(minor, scale=scale) != reference:
+            mismatches += 1
+    return mismatches
+
+def apply_to_balance(account, entry_type, amount):
+    # LedgerService._apply_to_balance before minor units
+    if account.type in [LedgerAccount.Type.ASSET, LedgerAccount.Type.EXPENSE]:
+        if entry_type == JournalEntry.EntryType.DEBIT:
+            account.balance += amount
+        else:
+            account.balance -= amount
+    else:
+        if entry_type == JournalEntry.EntryType.DEBIT:
+            account.balance -= amount
+        else:
+            account.balance += amount
+
+# The posting loops of create_transactions_batch before and after minor units, over unsaved accounts;
+# building the JournalEntry instances costs the same in both and is left out
+
+def decimal_loop(entries, accounts):
+    totals = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+    stored = []
+    for account_id, amount, entry_type in entries:
+        account = accounts[account_id]
+        amount = Decimal(str(amount))
+        if amount <= 0:
+            raise ValidationError("Amount must be positive.")
+        if entry_type == JournalEntry.EntryType.DEBIT:
+            totals[account.currency][0] += amount
+        elif entry_type == JournalEntry.EntryType.CREDIT:
+            totals[account.currency][1] += amount
+        stored.append(amount)
+        apply_to_balance(account, entry_type, amount)
+    return dict(totals), {account_id: account.balance for account_id, account in accounts.items()}, stored
+
+def minor_unit_loop(entries, accounts):
+    totals = defaultdict(lambda: [0, 0])
+    deltas = defaultdict(int)
+    stored = []
+    for account_id, amount, entry_type in entries:
+        account = accounts[account_id]
+        currency = account.currency
+        minor = to_minor_units(amount, currency)
+        if minor <= 0:
+            raise ValidationError("Amount must be positive.")
+        if entry_type == DEBIT:
+            totals[currency][0] += minor
+        elif entry_type == CREDIT:
+            totals[currency][1] += minor
+        stored.append(amount if type(amount) is Decimal else from_minor_units(minor, currency))
+        deltas[account_id] += minor if (entry_type == DEBIT) == (account.type in DEBIT_NORMAL_TYPES) else -minor
+    for account_id, delta in deltas.items():
+        accounts[account_id].balance += from_minor_units(delta, accounts[account_id].currency)
+    return (
+        {currency: [from_minor_units(d, currency), from_minor_units(c, currency)] for currency, (d, c) in totals.items()},
+        {account_id: account.balance for account_id, account in accounts.items()},
+        stored,
+    )
+
+def new_accounts():
+    return {i: LedgerAccount(name=f"Loop {i}", type=TYPES[i % len(TYPES)], balance=Decimal('0')) for i in range(100)}
+
+def compare_loops(entries):
+    # Interleaved and repeated, keeping the fastest run of each
+    decimal_time = minor_time = float('inf')
+    for _ in range(LOOP_REPEATS):
+        accounts = new_accounts()
+        start = time.perf_counter()
+        decimal_results = decimal_loop(entries, accounts)
+        decimal_time = min(decimal_time, time.perf_counter() - start)
+        accounts = new_accounts()
+        start = time.perf_counter()
+        minor_results = minor_unit_loop(entries, accounts)
+        minor_time = min(minor_time, time.perf_counter() - start)
+    return decimal_time, minor_time, decimal_results == minor_results
+
+def check_postings(rng):
+    # Postings through LedgerService end with the balances Decimal arithmetic gives
+    user, _ = User.objects.get_or_create(email="minor_units_bench@example.com")
+    accounts = [
+        LedgerAccount.objects.create(user=user, name=f"Minor Units {i}", type=TYPES[i % len(TYPES)])
+        for i in range(8)
+    ]
+    expected = {account.id: account.balance for account in accounts}
+    for _ in range(NUM_POSTINGS):
+        legs = rng.randrange(1, 4)
+        amounts = [Decimal(rng.randrange(1, 10 ** 8)).scaleb(-rng.randrange(MINOR_UNIT_EXPONENT + 1)) for _ in range(legs)]
+        entries = [{'account_id': rng.choice(accounts).id, 'amount': str(amount), 'type': 'DEBIT'} for amount in amounts]
+        entries.append({'account_id': rng.choice(accounts).id, 'amount': str(sum(amounts)), 'type': 'CREDIT'})
+        LedgerService.create_transaction(user, 'Minor units check', entries, score_risk=False)
+        by_id = {account.id: account for account in accounts}
+        for entry in entries:
+            account = by_id[entry['account_id']]
+            amount = Decimal(entry['amount'])
+            expected[account.id] += amount if (entry['type'] == 'DEBIT') == (account.type in DEBIT_NORMAL_TYPES) else -amount
+    return sum(
+        1 for account in LedgerAccount.objects.filter(id__in=expected)
+        if account.balance != expected[account.id]
+    )
+
+def run():
+    print("--- Minor Unit Arithmetic: Exactness and Hot Loop Benchmark ---")
+    rng = random.Random(0)
+
+    conversion_errors = check_conversions(rng)
+    print(f"Conversions: {NUM_CONVERSIONS:,} random amounts, {conversion_errors} inexact or wrongly rejected")
+
+    samples = {
+        # What DRF serializers hand to the services: Decimals quantized to the field's decimal places
+        'Decimal amounts': [
+            Decimal(rng.randrange(1, 10 ** 10)).scaleb(-rng.randrange(MINOR_UNIT_EXPONENT + 1)).quantize(Decimal(1).scaleb(-MINOR_UNIT_EXPONENT))
+            for _ in range(NUM_LOOP_ENTRIES)
+        ],
+        'mixed amounts': [random_amount(rng, rng.randrange(MINOR_UNIT_EXPONENT + 1)) for _ in range(NUM_LOOP_ENTRIES)],
+    }
+    loops_exact = True
+    decimal_speedup = 0
+    for label, amounts in samples.items():
+        entries = [(rng.randrange(100), amount, rng.choice(('DEBIT', 'CREDIT'))) for amount in amounts]
+        decimal_time, minor_time, exact = compare_loops(entries)
+        loops_exact = loops_exact and exact
+        if label == 'Decimal amounts':
+            decimal_speedup = decimal_time / minor_time
+        print(f"Posting loop over {NUM_LOOP_ENTRIES:,} entries, {label}: Decimal {decimal_time:.2f}s, "
+              f"minor units {minor_time:.2f}s ({decimal_time / minor_time:.2f}x); results identical: {exact}")
+
+    posting_errors = check_postings(rng)
+    print(f"LedgerService: {NUM_POSTINGS} postings, {posting_errors} balances differ from Decimal arithmetic")
+
+    if conversion_errors or posting_errors or not loops_exact:
+        print("FAILURE: Minor unit arithmetic differs from Decimal arithmetic.")
+    elif decimal_speedup <= 1:
+        print(f"FAILURE: The minor unit posting loop is not faster for Decimal amounts ({decimal_speedup:.2f}x).")
+    else:
+        print("SUCCESS: Minor unit arithmetic matches Decimal arithmetic exactly.")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import random
+import django
+from array import array
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from apps.ledger.memory import InMemoryLedger
+
+NUM_ACCOUNTS = 100_000
+NUM_POSTINGS = 10_000_000
+CHUNK_SIZE = 1_000_000  # postings per replay() call
+NUM_API_POSTINGS = 100_000  # through create_transaction, for comparison
+ZIPF = 1.1
+TARGET_PER_MINUTE = 10_000_000
+
+def make_traffic(rng, n, weights):
+    # Zipfian account activity like production: a few accounts take most postings
+    debits = array('q', rng.choices(range(NUM_ACCOUNTS), cum_weights=weights, k=n))
+    credits = array('q', rng.choices(range(NUM_ACCOUNTS), cum_weights=weights, k=n))
+    amounts = array('q', (rng.randrange(100, 1_000_000) for _ in range(n)))
+    return debits, credits, amounts
+
+def run():
+    print("--- In-Memory Ledger Replay Benchmark ---")
+    rng = random.Random(0)
+    ledger = InMemoryLedger()
+    for i in range(NUM_ACCOUNTS):
+        ledger.open_account(f"Replay {i}", 'ASSET' if i % 2 else 'LIABILITY')
+    weights, total = [], 0.0
+    for rank in range(NUM_ACCOUNTS):
+        total += 1 / (rank + 1) ** ZIPF
+        weights.append(total)
+
+    # Traffic is generated up front so only replay() is timed
+    chunks = [make_traffic(rng, min(CHUNK_SIZE, NUM_POSTINGS - i), weights) for i in range(0, NUM_POSTINGS, CHUNK_SIZE)]
+    print(f"Generated {NUM_POSTINGS:,} postings over {NUM_ACCOUNTS:,} accounts.")
+
+    start = time.perf_counter()
+    for debits, credits, amounts in chunks:
+        ledger.replay(debits, credits, amounts)
+    elapsed = time.perf_counter() - start
+    per_minute = NUM_POSTINGS / elapsed * 60
+    print(f"replay(): {NUM_POSTINGS:,} postings in {elapsed:.2f}s, {per_minute:,.0f} postings/minute "
+          f"({len(ledger.entry_amount):,} journal entries)")
+
+    # Every posting moves the same amount in and out, so the trial balance over all accounts is even
+    debit_total, credit_total = sum(ledger._debits), sum(ledger._credits)
+    print(f"Debits {debit_total:,} == Credits {credit_total:,}: {debit_total == credit_total}")
+
+    accounts = [ledger.accounts[i].id for i in range(NUM_ACCOUNTS)]
+    start = time.perf_counter()
+    for i in range(NUM_API_POSTINGS):
+        amount = rng.randrange(100, 100000) / 100
+        ledger.create_transaction(None, 'Replay', [
+            {'account_id': accounts[i % NUM_ACCOUNTS], 'amount': amount, 'type': 'DEBIT'},
+            {'account_id': accounts[(i * 7 + 1) % NUM_ACCOUNTS], 'amount': amount, 'type': 'CREDIT'},
+        ])
+    api_elapsed = time.perf_counter() - start
+    print(f"create_transaction(): {NUM_API_POSTINGS / api_elapsed * 60:,.0f} postings/minute")
+
+    if debit_total != credit_total:
+        print("FAILURE: Replayed ledger does not balance.")
+    elif per_minute >= TARGET_PER_MINUTE:
+        print(f"SUCCESS: Replay runs at {TARGET_PER_MINUTE:,} postings/minute or more.")
+    else:
+        print(f"FAILURE: Replay is slower than {TARGET_PER_MINUTE:,} postings/minute.")
+
+if __name__ == '__main__':
+    run()
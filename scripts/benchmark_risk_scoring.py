@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import random
+import django
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from apps.ledger.models import LedgerAccount, JournalEntry
+from apps.ledger.services import LedgerService
+from apps.ai_engine.risk import RiskService, get_risk_state_store
+
+User = get_user_model()
+
+NUM_SCORES = 20_000
+NUM_POSTINGS = 500
+NUM_ACCOUNTS = 200
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return (latencies[len(latencies) // 2] * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6, latencies[-1] * 1e6)
+
+def post_all(user, source, merchants, rng):
+    """
+    Posts NUM_POSTINGS transactions, alternating scoring off and on so both see the same
+    database state. Returns (latencies without scoring, latencies with scoring).
+    """
+    scorer_setting = settings.RISK_SCORER
+    latencies = ([], [])
+    for i in range(NUM_POSTINGS):
+        scored = i % 2
+        settings.RISK_SCORER = scorer_setting if scored else ''
+        amount = Decimal(f"{rng.uniform(5, 60):.2f}")
+        t0 = time.perf_counter()
+        LedgerService.create_transaction(user, f"Risk bench {i}", [
+            {'account_id': source.id, 'amount': amount, 'type': JournalEntry.EntryType.CREDIT},
+            {'account_id': rng.choice(merchants).id, 'amount': amount, 'type': JournalEntry.EntryType.DEBIT},
+        ])
+        latencies[scored].append(time.perf_counter() - t0)
+    settings.RISK_SCORER = scorer_setting
+    return latencies
+
+def run():
+    print("--- Risk Scoring Benchmark ---")
+    print(f"State store: {type(get_risk_state_store()).__name__}, budget {settings.RISK_BUDGET_MS}ms, fail mode {settings.RISK_FAIL_MODE}")
+    rng = random.Random(7)
+    # Spread the benchmark's spends out in time so velocity stays normal
+    settings.RISK_VELOCITY_LIMIT = float('inf')
+
+    user, _ = User.objects.get_or_create(email="risk_bench@example.com")
+    accounts = list(LedgerAccount.objects.filter(user=user, name__startswith="Risk Bench")[:NUM_ACCOUNTS])
+    for i in range(NUM_ACCOUNTS - len(accounts)):
+        accounts.append(LedgerAccount.objects.create(
+            user=user, name=f"Risk Bench {i}", type=LedgerAccount.Type.ASSET, balance=Decimal('100000000')
+        ))
+    merchants = [
+        LedgerService.get_system_account(f"Risk Bench Merchant {i}", LedgerAccount.Type.INCOME) for i in range(10)
+    ]
+
+    # 1. Scoring alone, on accounts with a history of ordinary spends
+    def spend(account):
+        amount = Decimal(f"{rng.uniform(5, 60):.2f}")
+        return [
+            {'account_id': account.id, 'amount': amount, 'type': JournalEntry.EntryType.CREDIT},
+            {'account_id': rng.choice(merchants).id, 'amount': amount, 'type': JournalEntry.EntryType.DEBIT},
+        ]
+
+    scorer = RiskService.get_scorer()
+    for account in accounts:
+        for _ in range(50):
+            scorer.observe(RiskService.posting_signals(user, spend(account)), time.time())
+    signals = [RiskService.posting_signals(user, spend(account)) for account in accounts]
+
+    latencies = []
+    over_budget = 0
+    for i in range(NUM_SCORES):
+        t0 = time.perf_counter()
+        RiskService.check(signals[i % NUM_ACCOUNTS])
+        elapsed = time.perf_counter() - t0
+        latencies.append(elapsed)
+        over_budget += elapsed * 1000 > settings.RISK_BUDGET_MS
+    p50, p99, worst = percentiles(latencies)
+    print(f"Scoring: {NUM_SCORES} checks, p50 {p50:.0f}us  p99 {p99:.0f}us  max {worst:.0f}us, over budget: {over_budget}")
+
+    # 2. Latency added to create_transaction
+    off, on = post_all(user, accounts[0], merchants, rng)
+    off_p50, off_p99, _ = percentiles(off)
+    on_p50, on_p99, _ = percentiles(on)
+    print(f"create_transaction without scoring: p50 {off_p50:.0f}us  p99 {off_p99:.0f}us")
+    print(f"create_transaction with scoring:    p50 {on_p50:.0f}us  p99 {on_p99:.0f}us  (+{on_p50 - off_p50:.0f}us at p50)")
+
+    if p99 / 1000 <= settings.RISK_BUDGET_MS:
+        print(f"SUCCESS: p99 scoring latency within the {settings.RISK_BUDGET_MS}ms budget.")
+    else:
+        print(f"FAILURE: p99 scoring latency over the {settings.RISK_BUDGET_MS}ms budget.")
+
+if __name__ == '__main__':
+    run()
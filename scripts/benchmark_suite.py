@@ -0,0 +1,361 @@
+"""
+Ledger benchmark suite.
+
+Runs a fixed set of benchmarks against a seeded synthetic dataset, writes the results
+as JSON and compares them with a stored baseline; any regression, or a missing baseline
+for the scale, seed and database engine, makes it exit 1.
+
+    python scripts/benchmark_suite.py --scale 1e5                  # run, compare with the baseline
+    python scripts/benchmark_suite.py --scale 1e5 --save-baseline  # record this run as the baseline
+    python scripts/benchmark_suite.py --scale 1e6 --only trial_balance,list_queries
+
+Benchmarks:
+  posting_throughput  postings/s and latency at each concurrency level, spread over many accounts
+  hot_account         the same with every posting locking one account; also checks no update was lost
+  trial_balance       trial balance latency for the dataset's heaviest user (scales with entry count)
+  statement_depth     account statement latency at increasing page depth
+  list_queries        queries run by each list endpoint on a cold response cache
+
+Datasets are written by apps.ledger.synthetic (COPY on PostgreSQL), identified by
+scale and seed and reused by later runs; the same scale and seed always produce the
+same rows. Posting benchmarks write to separate
+accounts, so they never change a dataset.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import threading
+import django
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.ledger.models import LedgerAccount, Transaction, JournalEntry
+from apps.ledger.services import LedgerService
+from apps.ledger.synthetic import SyntheticLedgerGenerator
+from apps.ledger.response_cache import bump_user_versions
+
+User = get_user_model()
+
+SCALES = {'1e4': 10_000, '1e5': 100_000, '1e6': 1_000_000, '1e7': 10_000_000, '1e8': 100_000_000}
+BENCHMARKS = ('posting_throughput', 'hot_account', 'trial_balance', 'statement_depth', 'list_queries')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+ENTRIES_PER_USER = 10_000
+CONCURRENCY_LEVELS = (1, 2, 4, 8)
+POSTING_USERS = 64
+# Tail latencies come from few samples; they only fail on a large change
+P99_TOLERANCE = 0.5
+POSTING_PREFIX = 'Bench posting'
+STATEMENT_PAGES = (1, 10, 100, 1000)
+LIST_ENDPOINTS = (
+    '/api/ledger/accounts/',
+    '/api/ledger/transactions/',
+    '/api/ledger/cards/',
+    '/api/ledger/subscriptions/',
+    '/api/ledger/goals/',
+    '/api/ledger/contacts/',
+    '/api/ledger/dashboard/data/',
+    '/api/ledger/trial-balance/',
+)
+
+# --- Dataset ---
+
+class Dataset:
+    """
+    A synthetic ledger from SyntheticLedgerGenerator: users with Checking and Savings
+    accounts (some with a Credit Card), Zipfian activity, so the first user is the
+    heaviest, and a year of daily-cycle postings against shared merchant accounts.
+    """
+
+    def __init__(self, scale, seed):
+        self.scale = scale
+        self.seed = seed
+        self.entries = SCALES[scale]
+        self.num_users = max(10, self.entries // ENTRIES_PER_USER)
+        self.prefix = f"bench-{scale}-s{seed}"
+
+    @property
+    def heavy_user(self):
+        return User.objects.get(email=SyntheticLedgerGenerator.user_email(self.prefix, 0))
+
+    def accounts_of(self, user):
+        return {account.name: account for account in LedgerAccount.objects.filter(user=user)}
+
+    def existing_entries(self):
+        return JournalEntry.objects.filter(transaction__reference__startswith=f"{self.prefix}-").count()
+
+    def ensure(self):
+        found = self.existing_entries()
+        if found == self.entries and User.objects.filter(email=SyntheticLedgerGenerator.user_email(self.prefix, 0)).exists():
+            print(f"Dataset {self.prefix}: {found:,} entries present, reusing it")
+            return
+        if found:
+            print(f"Dataset {self.prefix} is incomplete or outdated ({found:,} entries); rebuilding it")
+        SyntheticLedgerGenerator.clear(self.prefix)
+        generator = SyntheticLedgerGenerator(
+            self.entries // 2, users=self.num_users, seed=self.seed, prefix=self.prefix,
+            progress=lambda message: print(f"  {message}"),
+        )
+        stats = generator.run()
+        print(f"Seeded {stats['entries']:,} entries for {stats['users']:,} users in {stats['seconds']:.1f}s")
+
+# --- Measurements ---
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+def timed(fn, repeat):
+    fn()  # warm up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def post_concurrently(pairs_for_thread, concurrency, postings):
+    """
+    Posts `postings` deposits split over `concurrency` threads, each with its own database
+    connection. pairs_for_thread(i) -> list of (user, debit account, credit account).
+    :return: (elapsed seconds, per-posting latencies, successful postings)
+    """
+    latencies, succeeded = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency)
+
+    def worker(index):
+        rng = random.Random(index)
+        pairs = pairs_for_thread(index)
+        mine, ok = [], 0
+        barrier.wait()
+        try:
+            for i in range(postings // concurrency):
+                user, debit, credit = rng.choice(pairs)
+                start = time.perf_counter()
+                try:
+                    LedgerService.create_transaction(user, f"{POSTING_PREFIX} {index}-{i}", [
+                        {'account_id': debit.id, 'amount': '1.00', 'type': JournalEntry.EntryType.DEBIT},
+                        {'account_id': credit.id, 'amount': '1.00', 'type': JournalEntry.EntryType.CREDIT},
+                    ])
+                    ok += 1
+                except Exception as e:
+                    print(f"  posting failed: {e}")
+                mine.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(mine)
+            succeeded.append(ok)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, sum(succeeded)
+
+def posting_accounts(count):
+    """
+    (user, Checking, Salary) for `count` users kept apart from the datasets, so posting
+    benchmarks never change a dataset. Postings left by an earlier run are deleted first.
+    """
+    Transaction.objects.filter(description__startswith=POSTING_PREFIX).delete()
+    pairs = []
+    for i in range(count):
+        user, _ = User.objects.get_or_create(email=f"bench-postings-u{i}@bench.local")
+        checking, _ = LedgerAccount.objects.get_or_create(user=user, name='Checking', type=LedgerAccount.Type.ASSET)
+        salary, _ = LedgerAccount.objects.get_or_create(user=user, name='Salary', type=LedgerAccount.Type.INCOME)
+        pairs.append((user, checking, salary))
+    LedgerAccount.objects.filter(user__email__startswith='bench-postings-').update(balance=Decimal('0'))
+    return pairs
+
+def bench_posting_throughput(dataset, args, results):
+    pairs = posting_accounts(POSTING_USERS)
+    for concurrency in CONCURRENCY_LEVELS:
+        # Threads post for disjoint users, so no two postings wait on the same row
+        elapsed, latencies, ok = post_concurrently(lambda i: pairs[i::concurrency], concurrency, args.postings)
+        summary = latency_summary(latencies)
+        record(results, f'posting_throughput.c{concurrency}.postings_per_s', ok / elapsed, 'postings/s', 'higher')
+        record(results, f'posting_throughput.c{concurrency}.p99_ms', summary['p99'], 'ms', 'lower', tolerance=P99_TOLERANCE)
+        print(f"  concurrency {concurrency}: {ok / elapsed:,.0f} postings/s, p50 {summary['p50']:.1f}ms, p99 {summary['p99']:.1f}ms")
+
+def bench_hot_account(dataset, args, results):
+    pairs = posting_accounts(max(CONCURRENCY_LEVELS))
+    user, hot, _ = pairs[0]
+    incomes = [salary for _, _, salary in pairs]
+    consistent = True
+    for concurrency in CONCURRENCY_LEVELS:
+        hot.refresh_from_db()
+        before = hot.balance
+        elapsed, latencies, ok = post_concurrently(lambda i: [(user, hot, incomes[i])], concurrency, args.postings)
+        hot.refresh_from_db()
+        # Every posting serialises on the hot row's lock; a lost update would show as a balance gap
+        consistent &= hot.balance - before == Decimal(ok)
+        summary = latency_summary(latencies)
+        record(results, f'hot_account.c{concurrency}.postings_per_s', ok / elapsed, 'postings/s', 'higher')
+        record(results, f'hot_account.c{concurrency}.p99_ms', summary['p99'], 'ms', 'lower', tolerance=P99_TOLERANCE)
+        print(f"  concurrency {concurrency}: {ok / elapsed:,.0f} postings/s, p50 {summary['p50']:.1f}ms, p99 {summary['p99']:.1f}ms")
+    record(results, 'hot_account.balance_consistent', int(consistent), 'bool', 'higher')
+    print(f"  hot account balance consistent: {consistent}")
+
+def bench_trial_balance(dataset, args, results):
+    user = dataset.heavy_user
+    entries = JournalEntry.objects.filter(account__user=user).count()
+
+    def trial_balance():
+        report = LedgerService.get_trial_balance(user)
+        list(report['accounts'])
+
+    summary = latency_summary(timed(trial_balance, args.repeat))
+    record(results, 'trial_balance.p50_ms', summary['p50'], 'ms', 'lower')
+    record(results, 'trial_balance.p99_ms', summary['p99'], 'ms', 'lower', tolerance=P99_TOLERANCE)
+    print(f"  {entries:,} entries: p50 {summary['p50']:.1f}ms, p99 {summary['p99']:.1f}ms")
+
+def bench_statement_depth(dataset, args, results):
+    user = dataset.heavy_user
+    account = dataset.accounts_of(user)['Checking']
+    client = APIClient()
+    client.force_authenticate(user=user)
+    pages = -(-JournalEntry.objects.filter(account=account).count() // 20)
+    for page in STATEMENT_PAGES:
+        if page > pages:
+            break
+        url = f'/api/ledger/accounts/{account.id}/statement/?page={page}'
+        summary = latency_summary(timed(lambda: client.get(url), args.repeat))
+        record(results, f'statement_depth.page{page}.p50_ms', summary['p50'], 'ms', 'lower')
+        print(f"  page {page} of {pages}: p50 {summary['p50']:.1f}ms, p99 {summary['p99']:.1f}ms")
+
+def bench_list_queries(dataset, args, results):
+    user = dataset.heavy_user
+    client = APIClient()
+    client.force_authenticate(user=user)
+    for url in LIST_ENDPOINTS:
+        bump_user_versions([user.id])  # cold response cache
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        name = url.strip('/').split('/', 2)[-1].replace('/', '_')
+        record(results, f'list_queries.{name}', len(queries), 'queries', 'lower', tolerance=0)
+        print(f"  {url}: {len(queries)} queries (HTTP {response.status_code})")
+
+# --- Results ---
+
+def record(results, name, value, unit, better, tolerance=None):
+    results[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+    if tolerance is not None:
+        results[name]['tolerance'] = tolerance
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """
+    :return: list of regression messages; a metric regresses when it is worse than the baseline
+             by more than its tolerance (relative; query counts allow none)
+    """
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None:
+            continue
+        allowed = base.get('tolerance', tolerance)
+        if base['better'] == 'higher':
+            worse = current['value'] < base['value'] * (1 - allowed)
+        else:
+            worse = current['value'] > base['value'] * (1 + allowed)
+        change = (current['value'] - base['value']) / base['value'] if base['value'] else 0.0
+        marker = 'REGRESSION' if worse else 'ok'
+        print(f"  {name:<48} {base['value']:>12,.3f} -> {current['value']:>12,.3f} {base['unit']:<11} {change:+7.1%}  {marker}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+def run():
+    parser = argparse.ArgumentParser(description="Ledger benchmark suite")
+    parser.add_argument('--scale', choices=sorted(SCALES, key=SCALES.get), default='1e4', help="Journal entries in the dataset.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="Comma-separated benchmarks to run.")
+    parser.add_argument('--postings', type=int, default=400, help="Postings per concurrency level.")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed repetitions of each read.")
+    parser.add_argument('--output', help="Results file (default: benchmark-<scale>-s<seed>.json).")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative slowdown allowed before a timing counts as a regression.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline for its scale.")
+    args = parser.parse_args()
+
+    print("--- Ledger Benchmark Suite ---")
+    dataset = Dataset(args.scale, args.seed)
+    dataset.ensure()
+
+    results = {}
+    for name in args.only.split(','):
+        name = name.strip()
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}; choose from {', '.join(BENCHMARKS)}")
+        print(f"[{name}]")
+        globals()[f'bench_{name}'](dataset, args, results)
+
+    report = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'entries': dataset.entries,
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+    output = args.output or f"benchmark-{args.scale}-s{args.seed}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    # Timings from one database engine say nothing about another, so each keeps its own baseline
+    key = f"{args.scale}-s{args.seed}-{connection.vendor}"
+
+    if args.save_baseline:
+        baselines[key] = report
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline for {key} saved to {args.baseline}")
+        return 0
+
+    if key not in baselines:
+        print(f"FAILURE: No baseline for {key} in {args.baseline}; run with --save-baseline to record one.")
+        return 1
+    print(f"Compared with baseline {baselines[key]['revision']} ({baselines[key]['created_at']}):")
+    regressions = compare(results, baselines[key]['results'], args.tolerance)
+    if regressions:
+        print(f"FAILURE: {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("SUCCESS: No regressions against the baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import asyncio
+import django
+from asgiref.sync import sync_to_async
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from apps.integrations.models import WebhookEndpoint, WebhookDelivery
+from apps.integrations.dispatcher import WebhookDispatcher
+from webhook_stub_server import StubWebhookServer
+
+User = get_user_model()
+
+TARGET_RATE = 10_000  # deliveries per second per dispatcher
+NUM_DELIVERIES = 50_000
+NUM_ENDPOINTS = 20
+FAIL_RATE = 0.01  # share of requests the stub answers with 503, to exercise retries
+
+# The stub listens on loopback, which real endpoints may not use
+settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES = True
+
+def queue_deliveries(user, url):
+    endpoints = [
+        WebhookEndpoint.objects.create(user=user, url=url, max_concurrency=50)
+        for _ in range(NUM_ENDPOINTS)
+    ]
+    WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(
+            endpoint=endpoints[i % NUM_ENDPOINTS],
+            event_id=i,
+            event_type='ledger.posting',
+            payload={'amount': '12.50', 'balance': '1000.00', 'reference': f'BENCH-{i}'}
+        )
+        for i in range(NUM_DELIVERIES)
+    ], batch_size=5000)
+
+async def dispatch_all(user):
+    server = await StubWebhookServer(fail_rate=FAIL_RATE).start()
+    await sync_to_async(queue_deliveries)(user, server.url)
+    print(f"Queued {NUM_DELIVERIES} deliveries to {NUM_ENDPOINTS} endpoints on {server.url}")
+
+    # Drain everything that is due, all lanes in parallel, then stop
+    # The stub answers instantly, so a small pool already saturates the CPU. Against real
+    # endpoints size WEBHOOK_MAX_CONNECTIONS as rate x latency (10k/s at 50ms = 500).
+    dispatcher = WebhookDispatcher(max_connections=64)
+    async with dispatcher.client() as client:
+        start = time.perf_counter()
+        while sum(await asyncio.gather(*(dispatcher.dispatch_batch(client) for _ in range(dispatcher.lanes)))):
+            pass
+        duration = time.perf_counter() - start
+
+    await server.stop()
+    return server, duration
+
+def run():
+    print("--- Webhook Delivery Benchmark ---")
+    user, _ = User.objects.get_or_create(email="webhook_bench@example.com")
+    WebhookEndpoint.objects.filter(user=user).delete()
+
+    server, duration = asyncio.run(dispatch_all(user))
+
+    statuses = dict(
+        WebhookDelivery.objects.filter(endpoint__user=user).values_list('status').annotate(n=Count('id'))
+    )
+    rate = NUM_DELIVERIES / duration
+    print(f"Attempts: {sum(server.stats[k] for k in ('ok', 'failed'))} in {duration:.2f}s ({rate:,.0f} deliveries/s)")
+    print(f"Stub server: {dict(server.stats)}")
+    print(f"Delivery statuses: {statuses} (failed attempts stay PENDING until their backoff is due)")
+
+    if rate >= TARGET_RATE:
+        print(f"SUCCESS: Sustained >= {TARGET_RATE:,} deliveries/s.")
+    else:
+        print(f"FAILURE: Below target of {TARGET_RATE:,} deliveries/s.")
+
+    WebhookEndpoint.objects.filter(user=user).delete()
+
+if __name__ == '__main__':
+    run()
@@ -80,6 +80,7 @@ def run():
                 # Create Transaction Container
                 tx = Transaction.objects.create(
                     description=name,
+                    category=cat,
                     posted=True # We want COMPLETED transactions
                 )
                 
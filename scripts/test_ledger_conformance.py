@@ -0,0 +1,245 @@
+import os
+import sys
+import uuid
+import django
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.test import override_settings
+from apps.ledger.fx import fx_rates
+from apps.ledger.memory import InMemoryLedger
+from apps.ledger.models import FxRate, LedgerAccount
+from apps.ledger.services import LedgerService
+
+User = get_user_model()
+
+CENT = Decimal('0.0001')
+
+# The same scenarios run against the Django ledger and the in-memory one; each returns what it observed,
+# and both backends must observe the same things (and what the scenario expects).
+
+class DjangoBackend:
+    name = 'LedgerService'
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.user = User.objects.create(email=f"conformance-{run_id}@example.com")
+
+    def open(self, name, account_type, currency='USD'):
+        return LedgerAccount.objects.create(user=self.user, name=name, type=account_type, currency=currency).id
+
+    def post(self, entries, reference=None):
+        return LedgerService.create_transaction(self.user, 'Conformance', entries, reference=reference, score_risk=False)
+
+    def batch(self, transactions_data):
+        return LedgerService.create_transactions_batch(transactions_data)
+
+    def balance(self, account_id):
+        return LedgerService.get_balance(account_id)
+
+    def trial_balance(self):
+        return LedgerService.get_trial_balance(self.user)
+
+
+class MemoryBackend:
+    name = 'InMemoryLedger'
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.ledger = InMemoryLedger(fx_rates=fx_rates)
+
+    def open(self, name, account_type, currency='USD'):
+        return self.ledger.open_account(name, account_type, currency, user_id=self.run_id).id
+
+    def post(self, entries, reference=None):
+        return self.ledger.create_transaction(None, 'Conformance', entries, reference=reference)
+
+    def batch(self, transactions_data):
+        return self.ledger.create_transactions_batch(transactions_data)
+
+    def balance(self, account_id):
+        return self.ledger.get_balance(account_id)
+
+    def trial_balance(self):
+        return self.ledger.get_trial_balance(self.run_id)
+
+
+def leg(account_id, amount, entry_type):
+    return {'account_id': account_id, 'amount': amount, 'type': entry_type}
+
+def outcome(action):
+    try:
+        action()
+        return 'ok'
+    except (ValidationError, IntegrityError) as e:
+        return type(e).__name__
+
+def balances(backend, *account_ids):
+    return tuple(backend.balance(account_id).quantize(CENT) for account_id in account_ids)
+
+
+def simple_posting(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    result = outcome(lambda: backend.post([leg(cash, '100.00', 'DEBIT'), leg(sales, '100.00', 'CREDIT')]))
+    return (result,) + balances(backend, cash, sales), ('ok', Decimal('100'), Decimal('100'))
+
+def account_types(backend):
+    cash = backend.open('Cash', 'ASSET')
+    card = backend.open('Card', 'LIABILITY')
+    food = backend.open('Food', 'EXPENSE')
+    equity = backend.open('Owner', 'EQUITY')
+    backend.post([leg(cash, '500', 'DEBIT'), leg(equity, '500', 'CREDIT')])
+    backend.post([leg(food, '25.5', 'DEBIT'), leg(card, '25.5', 'CREDIT')])
+    backend.post([leg(card, '10', 'DEBIT'), leg(cash, '10', 'CREDIT')])
+    return balances(backend, cash, card, food, equity), (Decimal('490'), Decimal('15.5'), Decimal('25.5'), Decimal('500'))
+
+def multi_leg(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    tax = backend.open('Sales Tax', 'LIABILITY')
+    backend.post([leg(cash, '120.0001', 'DEBIT'), leg(sales, '100.0001', 'CREDIT'), leg(tax, '20', 'CREDIT')])
+    return balances(backend, cash, sales, tax), (Decimal('120.0001'), Decimal('100.0001'), Decimal('20'))
+
+def unbalanced(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    result = outcome(lambda: backend.post([leg(cash, '100', 'DEBIT'), leg(sales, '90', 'CREDIT')]))
+    return (result,) + balances(backend, cash, sales), ('ValidationError', Decimal('0'), Decimal('0'))
+
+def non_positive(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    results = tuple(
+        outcome(lambda: backend.post([leg(cash, amount, 'DEBIT'), leg(sales, amount, 'CREDIT')]))
+        for amount in ('0', '-5')
+    )
+    return results + balances(backend, cash), ('ValidationError', 'ValidationError', Decimal('0'))
+
+def too_few_entries(backend):
+    cash = backend.open('Cash', 'ASSET')
+    results = (
+        outcome(lambda: backend.post([])),
+        outcome(lambda: backend.post([leg(cash, '10', 'DEBIT')])),
+        outcome(lambda: backend.batch([{'description': 'Empty', 'entries': []}])),
+    )
+    return results + balances(backend, cash), ('ValidationError', 'ValidationError', 'ValidationError', Decimal('0'))
+
+def excess_precision(backend):
+    with override_settings(LEDGER_CURRENCY_SCALES='JPY:0'):
+        cash = backend.open('Cash', 'ASSET')
+        sales = backend.open('Sales', 'INCOME')
+        yen = backend.open('Cash JPY', 'ASSET', 'JPY')
+        yen_sales = backend.open('Sales JPY', 'INCOME', 'JPY')
+        results = (
+            outcome(lambda: backend.post([leg(cash, '1.00001', 'DEBIT'), leg(sales, '1.00001', 'CREDIT')])),
+            outcome(lambda: backend.post([leg(yen, '150.5', 'DEBIT'), leg(yen_sales, '150.5', 'CREDIT')])),
+            outcome(lambda: backend.post([leg(yen, '150', 'DEBIT'), leg(yen_sales, '150', 'CREDIT')])),
+        )
+    return results + balances(backend, cash, yen), ('ValidationError', 'ValidationError', 'ok', Decimal('0'), Decimal('150'))
+
+def unknown_account(backend):
+    cash = backend.open('Cash', 'ASSET')
+    results = tuple(
+        outcome(lambda: backend.post([leg(cash, '1', 'DEBIT'), leg(account_id, '1', 'CREDIT')]))
+        for account_id in (uuid.uuid4(), 'not-an-account')
+    )
+    return results + balances(backend, cash), ('ValidationError', 'ValidationError', Decimal('0'))
+
+def duplicate_reference(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    reference = f"conformance-{backend.run_id}-{backend.name}-dup"
+    entries = [leg(cash, '1', 'DEBIT'), leg(sales, '1', 'CREDIT')]
+    results = (outcome(lambda: backend.post(entries, reference)), outcome(lambda: backend.post(entries, reference)))
+    return results + balances(backend, cash), ('ok', 'IntegrityError', Decimal('1'))
+
+def batch_atomic(backend):
+    cash = backend.open('Cash', 'ASSET')
+    sales = backend.open('Sales', 'INCOME')
+    good = {'description': 'Good', 'entries': [leg(cash, '10', 'DEBIT'), leg(sales, '10', 'CREDIT')]}
+    bad = {'description': 'Bad', 'entries': [leg(cash, '10', 'DEBIT'), leg(sales, '9', 'CREDIT')]}
+    rejected = outcome(lambda: backend.batch([good, bad]))
+    after_rejected = balances(backend, cash)
+    accepted = outcome(lambda: backend.batch([good, good, good]))
+    return (rejected,) + after_rejected + (accepted,) + balances(backend, cash, sales), (
+        'ValidationError', Decimal('0'), 'ok', Decimal('30'), Decimal('30')
+    )
+
+def batch_single_currency(backend):
+    usd = backend.open('Cash USD', 'ASSET', 'USD')
+    eur = backend.open('Sales EUR', 'INCOME', 'EUR')
+    result = outcome(lambda: backend.batch([{'entries': [leg(usd, '10', 'DEBIT'), leg(eur, '10', 'CREDIT')]}]))
+    return (result,) + balances(backend, usd, eur), ('ValidationError', Decimal('0'), Decimal('0'))
+
+def cross_currency(backend):
+    eur = backend.open('Wallet EUR', 'ASSET', 'EUR')
+    usd = backend.open('Wallet USD', 'ASSET', 'USD')
+    rate = fx_rates.get_rate('EUR', 'USD')
+    converted = (Decimal('100') * rate).quantize(CENT)
+    accepted = outcome(lambda: backend.post([leg(eur, '100', 'DEBIT'), leg(usd, converted, 'CREDIT')]))
+    rejected = outcome(lambda: backend.post([leg(eur, '100', 'DEBIT'), leg(usd, converted * 2, 'CREDIT')]))
+    # Legs off by more than rounding would let the poster keep the difference
+    skimmed = outcome(lambda: backend.post([leg(usd, converted + CENT * 10, 'DEBIT'), leg(eur, '100', 'CREDIT')]))
+    return (accepted, rejected, skimmed) + balances(backend, eur, usd), (
+        'ok', 'ValidationError', 'ValidationError', Decimal('100'), -converted
+    )
+
+def trial_balance(backend):
+    trial = backend.trial_balance()
+    rows = tuple(
+        (row['currency'], row['debits'].quantize(CENT), row['credits'].quantize(CENT), row['is_balanced'])
+        for row in trial['currencies']
+    )
+    return (trial['is_balanced'],) + rows, None  # only compared between backends
+
+SCENARIOS = (
+    simple_posting, account_types, multi_leg, unbalanced, non_positive, too_few_entries, excess_precision, unknown_account,
+    duplicate_reference, batch_atomic, batch_single_currency, cross_currency, trial_balance,
+)
+
+
+def run():
+    print("--- Ledger Conformance: LedgerService vs InMemoryLedger ---")
+    # A rate both backends convert with (they share the FX rate cache)
+    FxRate.objects.get_or_create(
+        base_currency='EUR', quote_currency='USD', effective_at=datetime(2000, 1, 1, tzinfo=dt_timezone.utc),
+        defaults={'rate': Decimal('1.1')}
+    )
+    fx_rates.invalidate('EUR', 'USD')
+
+    run_id = uuid.uuid4().hex[:12]
+    backends = (DjangoBackend(run_id), MemoryBackend(run_id))
+    failures = 0
+    for scenario in SCENARIOS:
+        observed = []
+        for backend in backends:
+            try:
+                observed.append(scenario(backend))
+            except Exception as e:
+                observed.append((f"raised {type(e).__name__}: {e}", None))
+        (django_seen, expected), (memory_seen, _) = observed
+        if django_seen != memory_seen:
+            failures += 1
+            print(f"[FAIL] {scenario.__name__}: LedgerService {django_seen} != InMemoryLedger {memory_seen}")
+        elif expected is not None and django_seen != expected:
+            failures += 1
+            print(f"[FAIL] {scenario.__name__}: both observed {django_seen}, expected {expected}")
+        else:
+            print(f"[OK] {scenario.__name__}")
+
+    if failures:
+        print(f"FAILURE: {failures} of {len(SCENARIOS)} scenarios differ.")
+    else:
+        print(f"SUCCESS: Both ledgers pass all {len(SCENARIOS)} scenarios.")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,108 @@
+"""
+Minimal asyncio HTTP/1.1 server that stands in for subscriber endpoints in local runs and
+benchmarks. Keeps connections alive, verifies delivery signatures when given the secret,
+and can be told to fail a share of requests to exercise retries.
+
+    python scripts/webhook_stub_server.py --port 9000 --secret <endpoint secret> --fail-rate 0.1
+"""
+import os
+import sys
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.integrations.signing import verify, SIGNATURE_HEADER, DELIVERY_HEADER
+
+
+class StubWebhookServer:
+    def __init__(self, host='127.0.0.1', port=0, secret=None, fail_rate=0.0, fail_status=503, delay=0.0):
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.delay = delay
+        self.stats = Counter()
+        self.delivery_ids = set()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/webhooks"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _status_for(self, headers, body):
+        if self.secret and not verify(self.secret, headers.get(SIGNATURE_HEADER.lower(), ''), body):
+            self.stats['bad_signature'] += 1
+            return 401
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.stats['failed'] += 1
+            return self.fail_status
+        self.stats['ok'] += 1
+        delivery_id = headers.get(DELIVERY_HEADER.lower())
+        if delivery_id in self.delivery_ids:
+            self.stats['duplicates'] += 1
+        self.delivery_ids.add(delivery_id)
+        return 200
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                status = self._status_for(headers, body)
+                writer.write(f"HTTP/1.1 {status} Stub\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(args):
+    server = await StubWebhookServer(args.host, args.port, args.secret, args.fail_rate, delay=args.delay).start()
+    print(f"Stub webhook server listening on {server.url}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(dict(server.stats))
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--secret')
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before answering.")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass